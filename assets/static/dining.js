@@ -20,3 +20,121 @@ window.addEventListener('load', function () {
         })
     }
 });
+
+/*
+ * Add the `data-check-all` attribute to a button to check all checkboxes with the given name.
+ */
+window.addEventListener('load', function () {
+    document.querySelectorAll('[data-check-all]').forEach(function (button) {
+        button.addEventListener('click', function () {
+            let name = button.dataset.checkAll;
+            document.querySelectorAll('input[type="checkbox"][name="' + name + '"]').forEach(function (box) {
+                box.checked = true;
+            });
+        });
+    });
+});
+
+/*
+ * Progressive enhancement: add the `data-fragment-target` attribute to a form to submit it in the
+ * background. The server then responds with a fragment of HTML instead of a redirect, which
+ * replaces the target element. The target is a selector, matched against the ancestors of the
+ * form first and the whole page second.
+ *
+ * With `data-fragment-mode="append"` the fragment is added to the end of the target and the form
+ * is reset, with `data-fragment-mode="remove"` the target is removed. A validation error (400) is
+ * shown in the replaced fragment, or in the other modes by submitting the form the normal way.
+ * When the request fails otherwise, an error is shown below the form and the user can try again.
+ * Submitting the normal way then could perform the action twice.
+ *
+ * Elements in the fragment with a `data-fragment-key` that is already on the page are skipped, see
+ * insertFragment().
+ */
+function insertFragment(target, html) {
+    let template = document.createElement('template');
+    template.innerHTML = html;
+    template.content.querySelectorAll('[data-fragment-key]').forEach(function (element) {
+        if (document.querySelector('[data-fragment-key="' + element.dataset.fragmentKey + '"]')) {
+            element.remove();
+        }
+    });
+    target.appendChild(template.content);
+}
+
+document.addEventListener('submit', function (event) {
+    let form = event.target;
+    // Also skips forms of which the submit is cancelled, e.g. by a confirm()
+    if (!form.dataset.fragmentTarget || event.defaultPrevented || !window.fetch) {
+        return;
+    }
+    let selector = form.dataset.fragmentTarget;
+    let target = form.closest(selector) || document.querySelector(selector);
+    if (!target) {
+        return;
+    }
+    event.preventDefault();
+
+    let mode = form.dataset.fragmentMode || 'replace';
+    let data = new FormData(form);
+    if (event.submitter && event.submitter.name) {
+        data.append(event.submitter.name, event.submitter.value);
+    }
+
+    let error = form.nextElementSibling;
+    if (error && 'fragmentError' in error.dataset) {
+        error.remove();
+    }
+
+    // Shows the validation errors on a full page. The action was not performed, so it is safe to
+    // submit the form again.
+    function submitWithoutFetch() {
+        // form.submit() does not include the value of the submit button
+        if (event.submitter && event.submitter.name) {
+            let input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = event.submitter.name;
+            input.value = event.submitter.value;
+            form.appendChild(input);
+        }
+        form.submit();
+    }
+
+    function showError() {
+        let error = document.createElement('div');
+        error.className = 'alert alert-danger mt-2';
+        error.dataset.fragmentError = '';
+        error.textContent = 'Something went wrong, please try again.';
+        form.after(error);
+        // Allows submitting again, see the double submission check of the comment form
+        delete form.dataset.submitted;
+    }
+
+    fetch(form.action, {
+        method: 'POST',
+        body: data,
+        headers: {'X-Requested-With': 'XMLHttpRequest'},
+        credentials: 'same-origin',
+    }).then(function (response) {
+        if (response.status === 400 && mode !== 'replace') {
+            submitWithoutFetch();
+            return;
+        }
+        // A replaced fragment can show the validation errors itself
+        if (!response.ok && response.status !== 400) {
+            showError();
+            return;
+        }
+        return response.text().then(function (html) {
+            if (mode === 'remove') {
+                target.remove();
+            } else if (mode === 'append') {
+                insertFragment(target, html);
+                form.reset();
+                // Allows submitting again, see the double submission check of the comment form
+                delete form.dataset.submitted;
+            } else {
+                target.outerHTML = html;
+            }
+        });
+    }, showError);
+});
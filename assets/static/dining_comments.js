@@ -0,0 +1,86 @@
+/*
+ * Incremental loading of the comments on the dining list info page (see SlotCommentsView).
+ *
+ * The "Show older comments" link loads the previous page in place. On the latest page, new
+ * comments are loaded when a comment event arrives (see dining_events.js). The comments on the
+ * page that were changed since, e.g. pinned or deleted, are replaced in place.
+ */
+(function () {
+    let thread = document.getElementById('comment-thread');
+    if (!thread || !window.fetch) {
+        return;
+    }
+    let url = thread.dataset.commentsUrl;
+
+    function fetchComments(query) {
+        return fetch(url + '?' + new URLSearchParams(query), {
+            credentials: 'same-origin',
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error('Loading comments failed');
+            }
+            return response.text();
+        });
+    }
+
+    thread.addEventListener('click', function (event) {
+        let link = event.target.closest('[data-older-comments] a');
+        if (!link) {
+            return;
+        }
+        event.preventDefault();
+        fetchComments({before: link.dataset.cursor}).then(function (html) {
+            // The fragment contains the next link, if there are more comments
+            link.closest('[data-older-comments]').outerHTML = html;
+        }).catch(function () {
+            window.location = link.href;
+        });
+    });
+
+    if (!('live' in thread.dataset)) {
+        return;
+    }
+    let loading = false;
+
+    function loadNewComments() {
+        if (loading) {
+            return;
+        }
+        loading = true;
+        fetchComments({
+            after: thread.dataset.cursor,
+            changed: thread.dataset.changeCursor,
+        }).then(function (html) {
+            let template = document.createElement('template');
+            template.innerHTML = html;
+            let changed = template.content.querySelector('[data-changed-comments]');
+            if (changed) {
+                thread.dataset.changeCursor = changed.dataset.changeCursor;
+                // Comments that are not on the page, e.g. on an older page, are skipped
+                Array.from(changed.children).forEach(function (comment) {
+                    let current = document.querySelector('[data-comment="' + comment.dataset.comment + '"]');
+                    if (current) {
+                        current.replaceWith(comment);
+                    }
+                });
+                changed.remove();
+            }
+            let cursors = template.content.querySelectorAll('[data-cursor]');
+            if (cursors.length) {
+                // Only comments loaded here move the cursor, a comment posted by the user
+                // (see dining.js) might be newer than comments that are not loaded yet.
+                thread.dataset.cursor = cursors[cursors.length - 1].dataset.cursor;
+            }
+            insertFragment(thread, template.innerHTML);
+        }).catch(function () {
+            // Tried again on the next comment
+        }).finally(function () {
+            loading = false;
+        });
+    }
+
+    document.addEventListener('dining:comment', function (event) {
+        event.preventDefault();
+        loadNewComments();
+    });
+})();
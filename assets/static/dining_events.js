@@ -0,0 +1,59 @@
+/*
+ * Live updates using server-sent events (see dining/events.py).
+ *
+ * Looks for an element with a `data-events-url` attribute, which is shown as a notice when an
+ * event arrives with a type listed in its `data-reload-on` attribute. The diner count is updated
+ * in place in all elements with a `data-diner-count` attribute equal to the dining list id.
+ *
+ * Each event is also dispatched on the document as a cancelable `dining:<type>` event. Other
+ * scripts can apply the change in place and cancel it, so that no notice is shown (see
+ * dining_comments.js).
+ *
+ * The server closes the stream right away, after which the browser reconnects with the last
+ * event ID after the `retry` delay.
+ */
+(function () {
+    let notice = document.querySelector('[data-events-url]');
+    if (!notice || !window.EventSource) {
+        return;
+    }
+    let reloadOn = notice.dataset.reloadOn.split(' ');
+    let source = new EventSource(notice.dataset.eventsUrl);
+
+    function showNotice() {
+        notice.classList.remove('d-none');
+    }
+
+    function dispatch(type, data) {
+        let event = new CustomEvent('dining:' + type, {detail: data, cancelable: true});
+        if (document.dispatchEvent(event) && reloadOn.includes(type)) {
+            showNotice();
+        }
+    }
+
+    source.addEventListener('diners', function (event) {
+        let data = JSON.parse(event.data);
+        let elements = document.querySelectorAll('[data-diner-count="' + data.dining_list + '"]');
+        elements.forEach(function (element) {
+            element.textContent = data.diner_count;
+        });
+        // The page might already show the change, e.g. after removing a diner row (see dining.js)
+        if (document.querySelectorAll('[data-diner-row]').length === data.diner_count) {
+            return;
+        }
+        dispatch('diners', data);
+    });
+    ['comment', 'info', 'allergens'].forEach(function (type) {
+        source.addEventListener(type, function (event) {
+            dispatch(type, JSON.parse(event.data));
+        });
+    });
+    // Sent when events were missed
+    source.addEventListener('reload', showNotice);
+    source.addEventListener('error', function () {
+        // The browser gives up on an error response, e.g. when the dining list was deleted
+        if (source.readyState === EventSource.CLOSED) {
+            showNotice();
+        }
+    });
+})();
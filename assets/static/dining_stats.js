@@ -0,0 +1,72 @@
+/*
+ * Batches changes of the work and paid stats on the diners page (see SlotStatsView).
+ *
+ * Without JavaScript each button submits its own form. With JavaScript a click toggles the
+ * button right away, and all changes are sent together in one request after a short delay.
+ */
+(function () {
+    let list = document.querySelector('[data-stats-url]');
+    if (!list || !window.fetch) {
+        return;
+    }
+    // Rendered on the list, because the list might not contain any forms
+    let token = list.dataset.csrfToken;
+    // Pending changes by entry and field, so that toggling twice only sends the last value
+    let pending = new Map();
+    let timer = null;
+
+    function render(button, value) {
+        button.dataset.value = value ? '1' : '';
+        button.classList.toggle('btn-primary', value);
+        button.classList.toggle('btn-outline-primary', !value);
+    }
+
+    function flush() {
+        clearTimeout(timer);
+        timer = null;
+        if (pending.size === 0) {
+            return;
+        }
+        let changes = Array.from(pending.values());
+        pending.clear();
+        fetch(list.dataset.statsUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': token},
+            body: JSON.stringify({changes: changes}),
+            credentials: 'same-origin',
+            // Allows the request to outlive the page
+            keepalive: true,
+        }).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.json();
+        }).then(function (data) {
+            // Show the stored state
+            data.entries.forEach(function (entry) {
+                let selector = 'form[data-entry="' + entry.id + '"] [data-stat]';
+                list.querySelectorAll(selector).forEach(function (button) {
+                    render(button, entry[button.dataset.stat]);
+                });
+            });
+        }).catch(function () {
+            // Show the actual state
+            window.location.reload();
+        });
+    }
+
+    list.addEventListener('click', function (event) {
+        let button = event.target.closest('[data-stat]');
+        if (!button) {
+            return;
+        }
+        event.preventDefault();
+        let entry = button.closest('form').dataset.entry;
+        let value = !button.dataset.value;
+        render(button, value);
+        pending.set(entry + ':' + button.dataset.stat, {entry: entry, field: button.dataset.stat, value: value});
+        clearTimeout(timer);
+        timer = setTimeout(flush, 1000);
+    });
+    window.addEventListener('pagehide', flush);
+})();
@@ -13,6 +13,23 @@ from userdetails.models import Association, User
 
 
 class AccountManager(models.Manager):
+    # Process-wide cache of the special accounts, these never change
+    _special_accounts = {}
+
+    def get_special(self, special: str) -> "Account":
+        """Returns the special account with given type, cached in the process."""
+        try:
+            return self._special_accounts[special]
+        except KeyError:
+            account = self.get(special=special)
+            self._special_accounts[special] = account
+            return account
+
+    @classmethod
+    def clear_special_cache(cls):
+        """Clears the cache of get_special, needed when the database is flushed."""
+        cls._special_accounts.clear()
+
     def get_by_natural_key(self, type, name=None):
         # See https://docs.djangoproject.com/en/4.1/topics/serialization/#natural-keys
         if type.lower() == "user":
@@ -55,16 +72,14 @@ class Account(models.Model):
     objects = AccountManager()
 
     def get_balance(self) -> Decimal:
-        qs = Transaction.objects.all()
-        # 2 separate queries for the source and target sums
-        # If there are no rows, the value will be made 0.00
-        source_sum = qs.filter(source=self).aggregate(sum=Sum("amount"))[
-            "sum"
-        ] or Decimal("0.00")
-        target_sum = qs.filter(target=self).aggregate(sum=Sum("amount"))[
-            "sum"
-        ] or Decimal("0.00")
-        return target_sum - source_sum
+        # Both sums in a single query, if there are no rows the value is 0.00
+        sums = Transaction.objects.filter_account(self).aggregate(
+            increase=Sum("amount", filter=Q(target=self)),
+            reduction=Sum("amount", filter=Q(source=self)),
+        )
+        return (sums["increase"] or Decimal("0.00")) - (
+            sums["reduction"] or Decimal("0.00")
+        )
 
     @cached_property
     def balance(self) -> Decimal:
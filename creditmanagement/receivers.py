@@ -24,6 +24,8 @@ def create_special_accounts(sender, **kwargs):
     try:
         for name, label in Account.SPECIAL_ACCOUNTS:
             Account.objects.get_or_create(special=name)
+        # The accounts might have been recreated, e.g. after a database flush
+        Account.objects.clear_special_cache()
     except DatabaseError:
         # Database error might arise when migrating backwards
         print("Failed to create special accounts")
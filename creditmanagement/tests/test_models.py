@@ -38,3 +38,16 @@ class CreditTestCase(TestCase):
         tx.reversal(self.u).save()
         self.assertEqual(self.a1.get_balance(), Decimal("0.00"))
         self.assertEqual(self.a2.get_balance(), Decimal("0.00"))
+
+    def test_balance_self_transaction(self):
+        """Tests that a transaction to the same account does not change the balance."""
+        Transaction.objects.create(
+            source=self.a1, target=self.a1, amount=Decimal("1.00"), created_by=self.u
+        )
+        self.assertEqual(self.a1.get_balance(), Decimal("0.00"))
+
+    def test_get_special(self):
+        """Tests that special accounts are cached."""
+        account = Account.objects.get_special("kitchen_cost")
+        with self.assertNumQueries(0):
+            self.assertEqual(Account.objects.get_special("kitchen_cost"), account)
@@ -1,6 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
+from dining.forms import cancel_dining_lists
 from dining.models import (
+    ClosurePeriod,
     DeletedList,
     DiningComment,
     DiningDayAnnouncement,
@@ -59,6 +63,61 @@ class DiningDayAnnouncementAdmin(admin.ModelAdmin):
     list_display = ("title", "date", "slots_occupy")
     list_filter = ("date", "slots_occupy")
     ordering = ("-date",)
+    actions = ["cancel_dining_lists"]
+
+    def has_cancel_permission(self, request):
+        return request.user.has_perm("dining.delete_dininglist")
+
+    @admin.action(
+        description="Cancel all dining lists on the selected days",
+        permissions=["cancel"],
+    )
+    def cancel_dining_lists(self, request, queryset):
+        """Cancels the dining lists after confirmation, e.g. when the kitchen is closed.
+
+        The announcement titles are used as cancellation reason.
+        """
+        dates = set(queryset.values_list("date", flat=True))
+        dining_lists = [
+            dl
+            for dl in DiningList.objects.filter(date__in=dates)
+            .select_related("association")
+            .prefetch_related("owners")
+            .order_by("date", "serve_time")
+            if dl.is_adjustable()
+        ]
+        if not dining_lists:
+            self.message_user(
+                request,
+                "There are no dining lists to cancel on the selected days.",
+                messages.WARNING,
+            )
+            return None
+
+        if request.POST.get("post"):
+            reason = "; ".join(sorted(set(queryset.values_list("title", flat=True))))
+            cancel_dining_lists(dining_lists, request.user, reason, request=request)
+            self.message_user(
+                request,
+                f"Cancelled {len(dining_lists)} dining list(s).",
+                messages.SUCCESS,
+            )
+            return None
+
+        # Ask for confirmation
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Are you sure?",
+            "opts": self.model._meta,
+            "queryset": queryset,
+            "dining_lists": dining_lists,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request,
+            "admin/dining/diningdayannouncement/cancel_dining_lists.html",
+            context,
+        )
 
 
 @admin.register(DiningComment)
@@ -82,3 +141,10 @@ class DeletedListAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ClosurePeriod)
+class ClosurePeriodAdmin(admin.ModelAdmin):
+    list_display = ("reason", "start", "end", "hidden")
+    list_filter = ("hidden",)
+    ordering = ("-start",)
@@ -0,0 +1,196 @@
+"""Read-only JSON API for days and dining lists.
+
+All responses have ETag and Last-Modified headers. Conditional requests
+(If-None-Match or If-Modified-Since) are answered with 304 Not Modified
+without querying the dining list data, which makes polling very cheap. The
+version of a day is kept in the cache (see dining/cache.py) and the version of
+a dining list is its `updated_at` stamp.
+
+The event stream views push changes using server-sent events, see
+dining/events.py.
+
+Only stored data is returned. Time-dependent state, like whether the dining
+list is still open, must be derived by the client from `sign_up_deadline`,
+otherwise a cached response could become incorrect without a version change.
+"""
+
+from datetime import date
+from functools import wraps
+
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from dining import events
+from dining.cache import get_day_modified, get_day_versions
+from dining.models import DiningDayAnnouncement, DiningList
+
+
+def api_login_required(view):
+    """Like login_required, but gives an error response instead of a redirect."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"detail": "Authentication required"}, status=403)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _get_date(year, month, day) -> date:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        raise Http404("Invalid date")
+
+
+def _dining_lists():
+    """Returns a QuerySet with the data needed for serialize_dining_list."""
+    return DiningList.objects.select_related("association").annotate(
+        diner_count=Count("dining_entries"),
+        guest_count=Count(
+            "dining_entries", filter=~Q(dining_entries__external_name="")
+        ),
+    )
+
+
+def serialize_dining_list(dining_list: DiningList) -> dict:
+    """Serializes a dining list from the _dining_lists() QuerySet."""
+    association = dining_list.association
+    return {
+        "id": dining_list.pk,
+        "date": dining_list.date,
+        "association": {
+            "slug": association.slug,
+            "name": association.name,
+            "short_name": association.get_short_name(),
+        },
+        "dish": dining_list.dish,
+        "dish_kind": dining_list.dish_kind,
+        "serve_time": dining_list.serve_time,
+        "sign_up_deadline": dining_list.sign_up_deadline,
+        "max_diners": dining_list.max_diners,
+        "diner_count": dining_list.diner_count,
+        "guest_count": dining_list.guest_count,
+        "url": dining_list.get_absolute_url(),
+        "api_url": reverse("api_dining_list", kwargs={"pk": dining_list.pk}),
+        "updated_at": dining_list.updated_at,
+    }
+
+
+def allergen_summary(dining_list: DiningList) -> dict:
+    """Serializes the allergen summary of the dining list.
+
+    Returns:
+        A dictionary with per allergen the number of diners (using the model
+        field name without prefix as key), the distinct other allergies and
+        the distinct food preferences.
+    """
+    summary = dining_list.allergen_summary()
+    return {
+        "allergens": {
+            a.model_field.removeprefix("allergen_"): count
+            for a, count in summary["allergens"]
+        },
+        "other_allergies": summary["other_allergies"],
+        "food_preferences": summary["food_preferences"],
+    }
+
+
+def _day_etag(request, year, month, day):
+    return get_day_versions([_get_date(year, month, day)])[0]
+
+
+def _day_last_modified(request, year, month, day):
+    return get_day_modified(_get_date(year, month, day))
+
+
+@require_safe
+@api_login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_day_etag, last_modified_func=_day_last_modified)
+def day_view(request, year, month, day):
+    """Returns the dining lists and announcements of a date."""
+    d = _get_date(year, month, day)
+    dining_lists = _dining_lists().filter(date=d).order_by("serve_time", "pk")
+    announcements = DiningDayAnnouncement.objects.filter(date=d).order_by("pk")
+    return JsonResponse(
+        {
+            "date": d,
+            "announcements": [
+                {"title": a.title, "text": a.text, "slots_occupy": a.slots_occupy}
+                for a in announcements
+            ],
+            "dining_lists": [serialize_dining_list(dl) for dl in dining_lists],
+        }
+    )
+
+
+def _dining_list_modified(request, pk):
+    # Memoized on the request, because `condition` calls both the ETag and the
+    # last modified function.
+    if not hasattr(request, "_dining_list_modified"):
+        request._dining_list_modified = (
+            DiningList.objects.filter(pk=pk)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+    return request._dining_list_modified
+
+
+def _dining_list_etag(request, pk):
+    modified = _dining_list_modified(request, pk)
+    return f"{pk}-{modified.timestamp()}" if modified else None
+
+
+@require_safe
+@api_login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_dining_list_etag, last_modified_func=_dining_list_modified)
+def dining_list_view(request, pk):
+    """Returns the details of a dining list, including an allergen summary."""
+    dining_list = get_object_or_404(_dining_lists(), pk=pk)
+    data = serialize_dining_list(dining_list)
+    data.update(
+        {
+            "owners": [o.get_full_name() for o in dining_list.owners.all()],
+            "kitchen_cost": dining_list.kitchen_cost,
+            "dining_cost": dining_list.dining_cost,
+            "payment_link": dining_list.payment_link,
+            **allergen_summary(dining_list),
+        }
+    )
+    return JsonResponse(data)
+
+
+def _event_stream(request, channel):
+    """Returns a short-lived server-sent events response for the channel."""
+    try:
+        last_id = int(request.headers["Last-Event-ID"])
+    except (KeyError, ValueError):
+        last_id = None
+    return HttpResponse(
+        events.stream_body(channel, last_id), content_type="text/event-stream"
+    )
+
+
+@require_safe
+@api_login_required
+@cache_control(private=True, no_cache=True)
+def day_events_view(request, year, month, day):
+    """Sends the new events of all dining lists on a date."""
+    return _event_stream(request, events.day_channel(_get_date(year, month, day)))
+
+
+@require_safe
+@api_login_required
+@cache_control(private=True, no_cache=True)
+def dining_list_events_view(request, pk):
+    """Sends the new events of a dining list."""
+    if not DiningList.objects.filter(pk=pk).exists():
+        raise Http404("Dining list does not exist")
+    return _event_stream(request, events.dining_list_channel(pk))
@@ -5,5 +5,5 @@ class DiningConfig(AppConfig):
     name = "dining"
 
     def ready(self):
-        # Put receivers here
-        pass
+        # noinspection PyUnresolvedReferences
+        import dining.receivers  # noqa: F401
@@ -0,0 +1,68 @@
+"""Cache versioning for data derived from the dining lists on a date.
+
+Every date has a version token in the cache. The token changes whenever a
+dining list, dining entry or announcement on that date changes (see
+dining/receivers.py). A cache key that includes the tokens of all dates it
+covers can therefore be cached without a timeout, it is never served stale.
+
+The token is the timestamp of the change, which makes it usable as
+Last-Modified value as well.
+"""
+
+import time
+from datetime import date, datetime, timezone
+from hashlib import md5
+from typing import Iterable
+
+from django.core.cache import cache
+
+
+def _day_key(d: date) -> str:
+    return f"dining:day:{d.isoformat()}"
+
+
+def _new_token() -> str:
+    return f"{time.time():.6f}"
+
+
+def bump_day_version(d: date):
+    """Invalidates all cache entries that depend on the given date."""
+    cache.set(_day_key(d), _new_token(), None)
+
+
+def get_day_versions(dates: Iterable[date]) -> list[str]:
+    """Returns the current version token for each of the given dates."""
+    keys = [_day_key(d) for d in dates]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Initialize the token. We use add() so that we don't overwrite a
+            # token that was set concurrently.
+            #
+            # When a token got evicted, the new one has a later timestamp than
+            # the actual last change, which is safe.
+            token = _new_token()
+            if not cache.add(key, token, None):
+                token = cache.get(key, token)
+            versions[key] = token
+    return [versions[key] for key in keys]
+
+
+def get_day_modified(d: date) -> datetime:
+    """Returns the (aware) moment of the latest change on the given date."""
+    return datetime.fromtimestamp(float(get_day_versions([d])[0]), tz=timezone.utc)
+
+
+def make_days_key(prefix: str, dates: Iterable[date], *parts) -> str:
+    """Constructs a cache key that changes when any of the dates changes.
+
+    Args:
+        prefix: Identifies the kind of cached data.
+        dates: All dates the cached data depends on.
+        *parts: Additional key parts, e.g. a user id.
+    """
+    dates = list(dates)
+    # The versions are hashed to keep the key short (memcached allows 250 chars)
+    digest = md5("".join(get_day_versions(dates)).encode()).hexdigest()
+    span = f"{dates[0].isoformat()}:{dates[-1].isoformat()}" if dates else ""
+    return ":".join([prefix, span, *(str(p) for p in parts), digest])
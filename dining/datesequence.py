@@ -1,4 +1,12 @@
+import threading
+import time
+from bisect import bisect_right
 from datetime import date, timedelta
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
 
 
 class BaseSequencedDate(date):
@@ -34,6 +42,14 @@ class BaseSequencedDate(date):
         """Returns True if the given date is in the sequence of this class, False otherwise."""
         return cls.upcoming(d) == d
 
+    @classmethod
+    def range(cls, start: date, end: date) -> Iterator["BaseSequencedDate"]:
+        """Yields the dates in the sequence from start up to and including end."""
+        d = cls.upcoming(start)
+        while d <= end:
+            yield d
+            d = d.next()
+
     @classmethod
     def fromdate(cls, d):
         """Creates an instance using any date instance, raises ValueError when given date is not in the sequence."""
@@ -41,6 +57,14 @@ class BaseSequencedDate(date):
             raise ValueError("Date is not in the sequence")
         return cls(d.year, d.month, d.day)
 
+    @classmethod
+    def cache_version(cls) -> str:
+        """Returns a token that changes when the sequence changes.
+
+        Cache keys for data that depends on the sequence should include this.
+        """
+        return ""
+
     def allow_dining_list_creation(self) -> bool:
         return True
 
@@ -75,6 +99,147 @@ class DoNotAllowWeekendDiningListCreationSequencedDate(BaseSequencedDate):
         return super().help_text()
 
 
-# Date sequence class that is in use in the application. Can change this into a Django setting to have it
-# deployment specific (could e.g. exclude summer holiday)
-sequenced_date = DoNotAllowWeekendDiningListCreationSequencedDate
+class ClosureCalendar:
+    """The closure periods, compiled into sorted lists of merged date ranges.
+
+    Dates are stored as ordinals. Periods that overlap or are adjacent are
+    merged, so a date that is found in a range can skip the whole range at
+    once. Lookups are a binary search and therefore O(log n).
+    """
+
+    def __init__(self, periods):
+        """Compiles the calendar.
+
+        Args:
+            periods: Iterable of ClosurePeriod instances.
+        """
+        periods = sorted(periods, key=lambda p: p.start)
+        self.hidden_starts, self.hidden_ends, _ = self._merge(
+            p for p in periods if p.hidden
+        )
+        self.closed_starts, self.closed_ends, self.reasons = self._merge(
+            p for p in periods if not p.hidden
+        )
+
+    @staticmethod
+    def _merge(periods):
+        starts, ends, reasons = [], [], []
+        for p in periods:
+            start, end = p.start.toordinal(), p.end.toordinal()
+            if ends and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+                reasons.append(p.reason)
+        return starts, ends, reasons
+
+    @staticmethod
+    def _find(starts, ends, ordinal) -> int:
+        """Returns the index of the range containing the ordinal, or -1."""
+        i = bisect_right(starts, ordinal) - 1
+        return i if i >= 0 and ordinal <= ends[i] else -1
+
+    def skip_hidden(self, ordinal: int, reverse=False) -> int:
+        """Returns the closest ordinal from given ordinal that is not hidden."""
+        i = self._find(self.hidden_starts, self.hidden_ends, ordinal)
+        if i < 0:
+            return ordinal
+        return self.hidden_starts[i] - 1 if reverse else self.hidden_ends[i] + 1
+
+    def closure_reason(self, ordinal: int) -> Optional[str]:
+        """Returns the reason when dining is closed on the date, else None."""
+        i = self._find(self.closed_starts, self.closed_ends, ordinal)
+        return self.reasons[i] if i >= 0 else None
+
+    def visible(self, start: int, end: int) -> Iterator[int]:
+        """Yields the ordinals from start up to and including end that are not hidden."""
+        n = self.skip_hidden(start)
+        # Index of the next hidden range after n
+        i = bisect_right(self.hidden_starts, n)
+        while n <= end:
+            if i < len(self.hidden_starts) and n == self.hidden_starts[i]:
+                n = self.hidden_ends[i] + 1
+                i += 1
+                continue
+            yield n
+            n += 1
+
+
+CLOSURE_VERSION_KEY = "dining:closures:version"
+
+# The compiled calendar of this process as (version, calendar) tuple
+_calendar = None
+# Whether the version has been checked during the current request
+_checked = threading.local()
+
+
+def get_closure_calendar() -> tuple[str, ClosureCalendar]:
+    """Returns the version and compiled calendar of the closure periods.
+
+    The calendar is kept in memory. Its version is compared with the version in
+    the (shared) cache once per request, see reset_closure_check().
+    """
+    global _calendar
+    if _calendar is None or not getattr(_checked, "value", False):
+        version = cache.get(CLOSURE_VERSION_KEY)
+        if version is None:
+            # Evicted or never set, all processes will reload
+            cache.add(CLOSURE_VERSION_KEY, str(time.time_ns()), None)
+            version = cache.get(CLOSURE_VERSION_KEY)
+        if _calendar is None or _calendar[0] != version:
+            from dining.models import ClosurePeriod
+
+            _calendar = (version, ClosureCalendar(ClosurePeriod.objects.all()))
+        _checked.value = True
+    return _calendar
+
+
+def reset_closure_check(**kwargs):
+    """Makes the next get_closure_calendar() call check the version again."""
+    _checked.value = False
+
+
+def invalidate_closures():
+    """Makes all processes reload the closure calendar."""
+    cache.set(CLOSURE_VERSION_KEY, str(time.time_ns()), None)
+    reset_closure_check()
+
+
+class ClosureCalendarSequencedDate(DoNotAllowWeekendDiningListCreationSequencedDate):
+    """Sequence that leaves out the hidden closure periods.
+
+    In closure periods that are not hidden, dining lists can't be created.
+    """
+
+    @classmethod
+    def upcoming(cls, from_date=None, reverse=False):
+        d = super().upcoming(from_date, reverse)
+        ordinal = get_closure_calendar()[1].skip_hidden(d.toordinal(), reverse)
+        return d if ordinal == d.toordinal() else cls.fromordinal(ordinal)
+
+    @classmethod
+    def range(cls, start, end):
+        calendar = get_closure_calendar()[1]
+        for ordinal in calendar.visible(start.toordinal(), end.toordinal()):
+            yield cls.fromordinal(ordinal)
+
+    @classmethod
+    def cache_version(cls) -> str:
+        return get_closure_calendar()[0]
+
+    def closure_reason(self) -> Optional[str]:
+        return get_closure_calendar()[1].closure_reason(self.toordinal())
+
+    def allow_dining_list_creation(self) -> bool:
+        return self.closure_reason() is None and super().allow_dining_list_creation()
+
+    def help_text(self) -> str:
+        reason = self.closure_reason()
+        if reason is not None:
+            return f"There is no dining: {reason}"
+        return super().help_text()
+
+
+# Date sequence class that is in use in the application, see the DATE_SEQUENCE setting
+sequenced_date = import_string(settings.DATE_SEQUENCE)
@@ -0,0 +1,110 @@
+"""Publish/subscribe of live events for dining lists, used for server-sent events.
+
+Events are published from the receivers (see dining/receivers.py) to a channel
+for the dining list and a channel for its date. Each channel is a numbered log
+in the cache, which requires a cache that is shared between processes (see
+CACHES setting).
+
+The event stream responses are short-lived: they contain the events after the
+Last-Event-ID that the browser sends and are closed right away. The `retry`
+field makes the browser reconnect after RECONNECT_DELAY seconds, so a stream
+never occupies a worker while it waits for new events.
+"""
+
+import json
+from datetime import date
+from typing import Optional
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+# How long events are kept, should be well above RECONNECT_DELAY
+EVENT_TIMEOUT = 60 * 10
+
+# The maximum number of events that are sent in one go. A client that is
+# further behind needs to reload.
+MAX_BACKLOG = 100
+
+# Seconds after which the browser reconnects to get the next events
+RECONNECT_DELAY = 10
+
+
+def day_channel(d: date) -> str:
+    return f"day:{d.isoformat()}"
+
+
+def dining_list_channel(pk) -> str:
+    return f"list:{pk}"
+
+
+def _counter_key(channel: str) -> str:
+    return f"dining:events:{channel}"
+
+
+def _event_key(channel: str, n: int) -> str:
+    return f"dining:events:{channel}:{n}"
+
+
+def get_last_id(channel: str) -> int:
+    """Returns the ID of the last event published on the channel."""
+    return cache.get(_counter_key(channel), 0)
+
+
+def publish(channel: str, event: str, data: dict):
+    """Publishes an event on the channel.
+
+    Args:
+        channel: The channel name, see day_channel() and dining_list_channel().
+        event: The event type.
+        data: The event data, must be serializable to JSON.
+    """
+    key = _counter_key(channel)
+    # The counter is not expired, otherwise the IDs would restart
+    cache.add(key, 0, None)
+    n = cache.incr(key)
+    cache.set(_event_key(channel, n), (event, data), EVENT_TIMEOUT)
+
+
+def read(channel: str, last_id: int) -> list[tuple[int, str, dict]]:
+    """Returns the events published after the given ID.
+
+    Returns:
+        A list of events, each a tuple of the ID, type and data. When events
+        were lost, a single `reload` event is returned instead.
+    """
+    current = get_last_id(channel)
+    if last_id == current:
+        return []
+    reload = [(current, "reload", {})]
+    if last_id > current or current - last_id > MAX_BACKLOG:
+        # Either the counter got lost, or the client is too far behind
+        return reload
+
+    ids = range(last_id + 1, current + 1)
+    found = cache.get_many([_event_key(channel, n) for n in ids])
+    if len(found) < len(ids):
+        # Some events have expired
+        return reload
+    return [(n, *found[_event_key(channel, n)]) for n in ids]
+
+
+def format_event(event_id: int, event: str, data: dict) -> str:
+    """Formats an event in the server-sent events format."""
+    data = json.dumps(data, cls=DjangoJSONEncoder)
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def stream_body(channel: str, last_id: Optional[int] = None) -> str:
+    """Returns the body of a short-lived event stream response.
+
+    Args:
+        channel: The channel to read.
+        last_id: The last event ID the client has seen. When None, only the
+            current ID is sent, so that the next request gets the new events.
+    """
+    # Tells the browser when to reconnect (in milliseconds)
+    body = f"retry: {RECONNECT_DELAY * 1000}\n\n"
+    if last_id is None:
+        # A message with only an ID sets the Last-Event-ID of the browser
+        return body + f"id: {get_last_id(channel)}\n\n"
+    return body + "".join(format_event(*e) for e in read(channel, last_id))
@@ -1,15 +1,15 @@
 from datetime import timedelta
 from decimal import Decimal
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional, Tuple
 
 from dal_select2.widgets import ModelSelect2, ModelSelect2Multiple
 from django import forms
 from django.conf import settings
-from django.core import mail
+from django.core.exceptions import PermissionDenied
 from django.core.mail import EmailMessage
 from django.core.serializers import serialize
 from django.db import transaction
-from django.db.models import Exists, OuterRef, QuerySet
+from django.db.models import Count, Exists, OuterRef
 from django.forms import ValidationError
 from django.utils import timezone
 
@@ -21,8 +21,9 @@ from dining.models import (
     DiningList,
     PaymentReminderLock,
 )
+from dining.receivers import bulk_changes
 from general.forms import ConcurrenflictFormMixin
-from general.mail_control import construct_templated_mail
+from general.mail_control import construct_templated_mail, queue_mail, send_on_commit
 from general.util import SelectWithDisabled
 from scaladining.fields import DateTimeControlField
 from userdetails.models import Association, User, UserMembership
@@ -33,8 +34,11 @@ __all__ = [
     "DiningPaymentForm",
     "DiningEntryInternalForm",
     "DiningEntryExternalForm",
+    "join_dining_lists",
     "DiningEntryDeleteForm",
     "DiningListDeleteForm",
+    "delete_dining_lists",
+    "cancel_dining_lists",
     "DiningCommentForm",
     "SendReminderForm",
 ]
@@ -253,12 +257,28 @@ class DiningInfoForm(ConcurrenflictFormMixin, ServeTimeCheckMixin, forms.ModelFo
 class DiningPaymentForm(ConcurrenflictFormMixin, forms.ModelForm):
     class Meta:
         model = DiningList
-        fields = ["dining_cost", "payment_link"]
+        fields = ["dining_cost", "auto_pay", "payment_link"]
+        labels = {"auto_pay": "Pay automatically"}
+        help_texts = {
+            "auto_pay": "Charge the dinner cost from the balance of the diners after"
+            " the meal. Guests are charged to the user who added them.",
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields["payment_link"].widget.input_type = "url"
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("auto_pay") and not cleaned_data.get("dining_cost"):
+            self.add_error(
+                "dining_cost",
+                ValidationError(
+                    "Dinner cost is required for automatic payment.", code="required"
+                ),
+            )
+        return cleaned_data
+
 
 class DiningEntryInternalForm(forms.ModelForm):
     """This form can be used to create internal dining entries."""
@@ -273,6 +293,12 @@ class DiningEntryInternalForm(forms.ModelForm):
             )
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if "user" in self.fields:
+            # The account is needed for the balance check
+            self.fields["user"].queryset = User.objects.select_related("account")
+
     def get_user(self):
         """Returns the user responsible for the kitchen cost (not necessarily creator)."""
         user = self.cleaned_data.get("user")
@@ -280,12 +306,44 @@ class DiningEntryInternalForm(forms.ModelForm):
             raise ValidationError("User not provided")
         return user
 
+    def get_validation_data(self, user: User) -> dict:
+        """Fetches the data needed for validation in a single query.
+
+        Returns:
+            A dictionary with whether the creator is owner, the number of
+            diners, whether the user is a verified member of the dining list
+            association and whether the user has a minimum balance exception.
+        """
+        dining_list = self.instance.dining_list
+        creator = self.instance.created_by
+        verified_memberships = UserMembership.objects.filter(
+            related_user=user, is_verified=True
+        )
+        return (
+            DiningList.objects.filter(pk=dining_list.pk)
+            .annotate(diner_count=Count("dining_entries"))
+            .values(
+                "diner_count",
+                creator_is_owner=Exists(
+                    DiningList.owners.through.objects.filter(
+                        dininglist=OuterRef("pk"), user=creator
+                    )
+                ),
+                user_is_member=Exists(
+                    verified_memberships.filter(association=OuterRef("association"))
+                ),
+                has_min_balance_exception=Exists(
+                    verified_memberships.filter(association__has_min_exception=True)
+                ),
+            )
+            .get()
+        )
+
     def clean(self):
         cleaned_data = super().clean()
 
         dining_list = self.instance.dining_list
         user = self.get_user()
-        creator = self.instance.created_by
 
         # Adjustable
         if not dining_list.is_adjustable():
@@ -293,26 +351,29 @@ class DiningEntryInternalForm(forms.ModelForm):
                 "Dining list can no longer be adjusted", code="closed"
             )
 
+        data = self.get_validation_data(user)
+
         # Closed (exception for owner)
-        if not dining_list.is_owner(creator) and not dining_list.is_open():
+        if not data["creator_is_owner"] and not dining_list.is_open():
             raise ValidationError("Dining list is closed", code="closed")
 
         # Full (exception for owner)
-        if not dining_list.is_owner(creator) and not dining_list.has_room():
+        if (
+            not data["creator_is_owner"]
+            and data["diner_count"] >= dining_list.max_diners
+        ):
             raise ValidationError("Dining list is full", code="full")
 
         if dining_list.limit_signups_to_association_only:
             # User should be verified association member, except when the entry creator is owner
-            if not dining_list.is_owner(creator) and not user.is_verified_member_of(
-                dining_list.association
-            ):
+            if not data["creator_is_owner"] and not data["user_is_member"]:
                 raise ValidationError(
                     "Dining list is limited to members only", code="members_only"
                 )
 
         # User balance check
         if (
-            not user.has_min_balance_exception()
+            not data["has_min_balance_exception"]
             and user.account.get_balance() < settings.MINIMUM_BALANCE_FOR_DINING_SIGN_UP
         ):
             raise ValidationError(
@@ -325,15 +386,18 @@ class DiningEntryInternalForm(forms.ModelForm):
         """Creates a kitchen cost transaction and saves the entry."""
         instance = super().save(commit=False)  # type: DiningEntry
         if commit:
+            amount = instance.dining_list.kitchen_cost
+            # Resolved before the atomic block, to keep it short
+            kitchen_account = Account.objects.get_special("kitchen_cost")
+            description = "Kitchen cost for {}".format(instance.dining_list)
             with transaction.atomic():
-                amount = instance.dining_list.kitchen_cost
                 # Skip transaction if dining list is free
                 if amount != Decimal("0.00"):
                     tx = Transaction.objects.create(
                         source=instance.user.account,
-                        target=Account.objects.get(special="kitchen_cost"),
+                        target=kitchen_account,
                         amount=amount,
-                        description="Kitchen cost for {}".format(instance.dining_list),
+                        description=description,
                         created_by=instance.created_by,
                     )
                     instance.transaction = tx
@@ -362,6 +426,116 @@ class DiningEntryExternalForm(DiningEntryInternalForm):
         return self.instance.user
 
 
+def _get_join_error(dining_list: DiningList, balance_too_low: bool) -> Optional[str]:
+    """Validates a dining list annotated by join_dining_lists, see there."""
+    if dining_list.joined:
+        return "You are already on the dining list"
+    if not dining_list.is_adjustable():
+        return "Dining list can no longer be adjusted"
+    if not dining_list.is_owner and not dining_list.is_open():
+        return "Dining list is closed"
+    if not dining_list.is_owner and dining_list.diner_count >= dining_list.max_diners:
+        return "Dining list is full"
+    if (
+        dining_list.limit_signups_to_association_only
+        and not dining_list.is_owner
+        and not dining_list.user_is_member
+    ):
+        return "Dining list is limited to members only"
+    if balance_too_low:
+        return "Your balance is too low"
+    return None
+
+
+def join_dining_lists(
+    dining_lists: List[DiningList], user: User
+) -> Dict[int, Optional[str]]:
+    """Signs the user up for several dining lists at once.
+
+    Performs the same checks as DiningEntryInternalForm, but for all dining
+    lists together using a fixed number of queries. The kitchen cost
+    transactions and entries are each created with a single bulk insert. A
+    dining list that fails validation does not prevent joining the others.
+
+    Returns:
+        A dictionary with for each dining list id the error message, or None
+        when the user has joined the dining list.
+    """
+    pks = [dl.pk for dl in dining_lists]
+    errors = {}
+    with transaction.atomic():
+        # Lock the dining lists, so that the capacity checks stay valid
+        list(DiningList.objects.select_for_update().filter(pk__in=pks).values("pk"))
+        dining_lists = (
+            DiningList.objects.filter(pk__in=pks)
+            .select_related("association")
+            .annotate(
+                diner_count=Count("dining_entries"),
+                is_owner=Exists(
+                    DiningList.owners.through.objects.filter(
+                        dininglist=OuterRef("pk"), user=user
+                    )
+                ),
+                joined=Exists(
+                    DiningEntry.objects.internal().filter(
+                        dining_list=OuterRef("pk"), user=user
+                    )
+                ),
+                user_is_member=Exists(
+                    UserMembership.objects.filter(
+                        related_user=user,
+                        is_verified=True,
+                        association=OuterRef("association"),
+                    )
+                ),
+            )
+        )
+        has_min_balance_exception = UserMembership.objects.filter(
+            related_user=user, is_verified=True, association__has_min_exception=True
+        ).exists()
+        # The balance after paying for the dining lists accepted so far, so that
+        # joining many at once can't go further below the minimum than joining
+        # them one by one.
+        balance = None if has_min_balance_exception else user.account.get_balance()
+
+        valid = []
+        for dining_list in dining_lists.order_by("date", "serve_time", "pk"):
+            balance_too_low = (
+                balance is not None
+                and balance < settings.MINIMUM_BALANCE_FOR_DINING_SIGN_UP
+            )
+            errors[dining_list.pk] = _get_join_error(dining_list, balance_too_low)
+            if errors[dining_list.pk] is None:
+                valid.append(dining_list)
+                if balance is not None:
+                    balance -= dining_list.kitchen_cost
+
+        if valid:
+            kitchen_account = Account.objects.get_special("kitchen_cost")
+            entries = [
+                DiningEntry(dining_list=dl, user=user, created_by=user) for dl in valid
+            ]
+            paid = [e for e in entries if e.dining_list.kitchen_cost != Decimal("0.00")]
+            transactions = Transaction.objects.bulk_create(
+                Transaction(
+                    source=user.account,
+                    target=kitchen_account,
+                    amount=e.dining_list.kitchen_cost,
+                    description="Kitchen cost for {}".format(e.dining_list),
+                    created_by=user,
+                )
+                for e in paid
+            )
+            for entry, tx in zip(paid, transactions):
+                entry.transaction = tx
+            with bulk_changes(*valid):
+                DiningEntry.objects.bulk_create(entries)
+    # Dining lists that no longer exist
+    for pk in pks:
+        errors.setdefault(pk, "Dining list does not exist")
+    return errors
+
+
 class DiningEntryDeleteForm(forms.Form):
     def __init__(self, entry: DiningEntry, deleter: User, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -409,6 +583,106 @@ class DiningEntryDeleteForm(forms.Form):
         # Todo: Inform other of removal logic here instead of in the view
 
 
+def _check_delete_dining_lists(dining_lists: List[DiningList], user: User):
+    """Checks whether the user may delete all given dining lists.
+
+    The checks are done once for the whole batch: the user needs to own each
+    dining list or have the permission to delete dining lists, and all lists
+    need to be adjustable.
+    """
+    if any(not dl.is_adjustable() for dl in dining_lists):
+        raise ValidationError(
+            "The dining list is locked, changes can no longer be made",
+            code="locked",
+        )
+    not_owned = DiningList.objects.filter(
+        pk__in=[dl.pk for dl in dining_lists]
+    ).exclude(owners=user)
+    if not_owned.exists() and not user.has_perm("dining.delete_dininglist"):
+        raise PermissionDenied
+
+
+def delete_dining_lists(dining_lists: List[DiningList], deleted_by: User, reason: str):
+    """Deletes the dining lists and refunds the kitchen costs.
+
+    This uses a fixed number of queries, regardless of the number of dining
+    lists and entries. Should be run in a transaction.
+
+    Raises:
+        PermissionDenied: When the user does not own all dining lists and has
+            no permission to delete dining lists.
+        ValidationError: When a dining list is no longer adjustable.
+    """
+    _check_delete_dining_lists(dining_lists, deleted_by)
+
+    entries = list(
+        DiningEntry.objects.filter(dining_list__in=dining_lists).select_related(
+            "transaction__source", "transaction__target"
+        )
+    )
+    entries_per_list = {}
+    for entry in entries:
+        entries_per_list.setdefault(entry.dining_list_id, []).append(entry)
+
+    # Create audit log entries
+    DeletedList.objects.bulk_create(
+        DeletedList(
+            deleted_by=deleted_by,
+            reason=reason,
+            json_list=serialize("json", [dining_list]),
+            json_diners=serialize("json", entries_per_list.get(dining_list.pk, [])),
+        )
+        for dining_list in dining_lists
+    )
+
+    # Refund and delete entries
+    Transaction.objects.bulk_create(
+        [e.transaction.reversal(deleted_by) for e in entries if e.transaction]
+    )
+    with bulk_changes(*dining_lists):
+        DiningEntry.objects.filter(pk__in=[e.pk for e in entries]).delete()
+        # Delete dining lists (cascades to the comments)
+        DiningList.objects.filter(pk__in=[dl.pk for dl in dining_lists]).delete()
+
+
+def cancel_dining_lists(
+    dining_lists: List[DiningList], cancelled_by: User, reason: str, request=None
+):
+    """Deletes the dining lists and notifies the diners.
+
+    Each internal diner receives a single mail listing all of their cancelled
+    dining lists. The mails are queued in the same transaction and sent by the
+    send_queued_mail command, so that a large batch doesn't block the request.
+    """
+    dining_lists = list(dining_lists)
+    lists_per_user = {}
+    for entry in (
+        DiningEntry.objects.internal()
+        .filter(dining_list__in=dining_lists)
+        .select_related("user")
+    ):
+        lists_per_user.setdefault(entry.user, set()).add(entry.dining_list_id)
+
+    messages = []
+    for user, dining_list_ids in lists_per_user.items():
+        if user == cancelled_by:
+            continue
+        messages += construct_templated_mail(
+            "mail/dining_lists_cancelled",
+            user,
+            {
+                "dining_lists": [dl for dl in dining_lists if dl.pk in dining_list_ids],
+                "cancelled_by": cancelled_by,
+                "reason": reason,
+            },
+            request=request,
+        )
+
+    with transaction.atomic():
+        delete_dining_lists(dining_lists, cancelled_by, reason)
+        queue_mail(messages)
+
+
 class DiningListDeleteForm(forms.ModelForm):
     """Allows deletion of a dining list with its entries.
 
@@ -435,36 +709,23 @@ class DiningListDeleteForm(forms.ModelForm):
         return cleaned_data
 
     def execute(self, deleted_by):
-        """Deletes the dining list."""
+        """Deletes the dining list and refunds the kitchen costs.
+
+        See delete_dining_lists().
+        """
         if self.errors:
             raise ValueError("Form didn't validate")
 
         with transaction.atomic():
-            # Create audit log entry
-            DeletedList.objects.create(
-                deleted_by=deleted_by,
-                reason=self.cleaned_data["reason"],
-                json_list=serialize(
-                    "json", DiningList.objects.filter(pk=self.instance.pk)
-                ),
-                json_diners=serialize("json", self.instance.dining_entries.all()),
+            delete_dining_lists(
+                [self.instance], deleted_by, self.cleaned_data["reason"]
             )
 
-            # Delete entries
-            for entry in self.instance.dining_entries.all():
-                form = DiningEntryDeleteForm(entry, deleted_by, {})
-                if not form.is_valid():
-                    raise RuntimeError(
-                        "Could not validate dining entry while deleting a dining list"
-                    )
-                form.execute()
-
-            # Delete dining list
-            self.instance.delete()
-
     def execute_and_notify(self, request, day_view_url):
         """Deletes the dining list and notifies diners.
 
+        The mails are sent after the transaction is committed.
+
         Args:
             request: The request user is used as deletion user.
             day_view_url: This URL is used in the email body.
@@ -474,7 +735,7 @@ class DiningListDeleteForm(forms.ModelForm):
         # Construct mails
         recipients = [
             x.user
-            for x in self.instance.internal_dining_entries()
+            for x in self.instance.internal_dining_entries().select_related("user")
             if x.user != deleted_by
         ]
         messages = construct_templated_mail(
@@ -492,7 +753,7 @@ class DiningListDeleteForm(forms.ModelForm):
         with transaction.atomic():
             # Delete and inform the diners
             self.execute(deleted_by)
-            mail.get_connection().send_messages(messages)
+            send_on_commit(messages)
 
 
 class DiningCommentForm(forms.ModelForm):
@@ -584,16 +845,33 @@ class SendReminderForm(forms.Form):
                 "There was no payment url defined", code="payment_url_missing"
             )
 
-    def get_user_recipients(self) -> QuerySet:
-        """Returns the users that need to pay themselves, excluding external entries.
+    def get_recipients(self) -> Tuple[List[User], Dict[User, List[str]]]:
+        """Returns the users who need to pay for themselves or for their guests.
+
+        Both are resolved using a single query.
 
         Returns:
-            A QuerySet of User instances.
+            A tuple of the users with an unpaid internal entry and a dictionary
+            from User to a list of unpaid guest names who were added by the
+            user.
         """
-        unpaid_user_entries = self.dining_list.internal_dining_entries().filter(
-            has_paid=False
+        unpaid_entries = (
+            self.dining_list.dining_entries.filter(has_paid=False)
+            .select_related("user")
+            .order_by("user_id", "pk")
         )
-        return User.objects.filter(diningentry__in=unpaid_user_entries)
+        users = []
+        guests = {}
+        for entry in unpaid_entries:
+            if entry.is_external():
+                guests.setdefault(entry.user, []).append(entry.get_name())
+            else:
+                users.append(entry.user)
+        return users, guests
+
+    def get_user_recipients(self) -> List[User]:
+        """Returns the users that need to pay themselves, excluding external entries."""
+        return self.get_recipients()[0]
 
     def get_guest_recipients(self) -> Dict[User, List[str]]:
         """Returns external diners who have not yet paid.
@@ -602,18 +880,7 @@ class SendReminderForm(forms.Form):
             A dictionary from User to a list of guest names who were added by
             the user.
         """
-        unpaid_guest_entries = self.dining_list.external_dining_entries().filter(
-            has_paid=False
-        )
-
-        recipients = {}
-        for user in User.objects.filter(
-            diningentry__in=unpaid_guest_entries
-        ).distinct():
-            recipients[user] = [
-                e.get_name() for e in unpaid_guest_entries.filter(user=user)
-            ]
-        return recipients
+        return self.get_recipients()[1]
 
     def construct_messages(self, request) -> List[EmailMessage]:
         """Constructs the emails to send."""
@@ -621,11 +888,13 @@ class SendReminderForm(forms.Form):
 
         is_reminder = timezone.now().date() > self.dining_list.date
 
+        users, guest_recipients = self.get_recipients()
+
         # Mail for internal diners
         messages.extend(
             construct_templated_mail(
                 "mail/dining_payment_reminder",
-                self.get_user_recipients(),
+                users,
                 context={
                     "dining_list": self.dining_list,
                     "reminder": request.user,
@@ -637,7 +906,7 @@ class SendReminderForm(forms.Form):
         )
 
         # Mail for external diners
-        for user, guests in self.get_guest_recipients().items():
+        for user, guests in guest_recipients.items():
             messages.extend(
                 construct_templated_mail(
                     "mail/dining_payment_reminder_external",
@@ -668,6 +937,10 @@ class SendReminderForm(forms.Form):
             True on success. False when a mail was already sent too recently
             for this dining list.
         """
+        # The messages are rendered before acquiring the lock, so that the lock
+        # is only held for the rate limit check.
+        messages = self.construct_messages(request)
+
         # We use a critical section to prevent multiple emails from being sent
         # simultaneously. The critical section is implemented using the
         # database locking mechanism. However, SQLite does not support locking.
@@ -685,8 +958,8 @@ class SendReminderForm(forms.Form):
                 # A mail was sent too recently.
                 return False
             else:
-                # Update the lock and send the emails.
+                # Update the lock and send the emails after the lock is released.
                 lock.sent = timezone.now()
                 lock.save()
-                mail.get_connection().send_messages(self.construct_messages(request))
+                send_on_commit(messages)
                 return True
@@ -0,0 +1,251 @@
+"""Personal iCalendar feeds of the dining lists a user joined or owns.
+
+Calendar apps poll the feed every few minutes, which is why it is cheap to
+check whether it changed. The ETag is derived from a stamp of the user's own
+feed: the number of dining lists in it and the latest `updated_at` of these
+lists. The stamp is computed in the query that checks the token, so a
+conditional request for an unchanged feed is answered with 304 Not Modified
+after a single query, regardless of changes to the feeds of other users.
+Otherwise the feed is generated using one more query.
+
+There is no Last-Modified header, because the latest modification time can go
+back when a dining list leaves the feed.
+
+The feed URL contains a signed token instead of requiring a login, because
+calendar apps can't log in. The token includes the feed version of the user,
+which is incremented to revoke it (see CalendarResetView).
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from hashlib import md5
+from typing import Optional
+
+from django.core import signing
+from django.db.models import (
+    DateTimeField,
+    Exists,
+    Func,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.timezone import localdate, localtime, make_aware
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from dining.models import DiningEntry, DiningList
+from userdetails.models import User
+
+# The range of dates in the feed, relative to today
+PAST_DAYS = 7
+FUTURE_DAYS = 90
+
+# Events are shown with this duration, the end time is not known
+EVENT_DURATION = timedelta(hours=1)
+
+_TOKEN_SALT = "dining.ical"
+
+
+def get_feed_token(user) -> str:
+    """Returns the token in the feed URL of the user."""
+    return signing.Signer(salt=_TOKEN_SALT).sign(f"{user.pk}:{user.ical_feed_version}")
+
+
+def _parse_token(token: str) -> Optional[tuple[int, int]]:
+    """Returns the user id and feed version of a token, or None if invalid."""
+    try:
+        value = signing.Signer(salt=_TOKEN_SALT).unsign(token)
+        # Tokens from before the feed version was added have version 0
+        pk, _, version = value.partition(":")
+        return int(pk), int(version or 0)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def get_feed_stamp(
+    token: str, start: date, end: date
+) -> Optional[tuple[int, int, Optional[datetime]]]:
+    """Checks the token and returns the stamp of the user's feed in one query.
+
+    The stamp changes whenever the feed changes. A changed dining list gets a
+    new `updated_at`. A dining list that leaves the feed changes the count,
+    or when another one is added at the same time, the latest `updated_at`.
+
+    Returns:
+        A tuple of the user id, the number of dining lists in the feed and the
+        latest `updated_at` of these (None when there are none). None when the
+        token is invalid or revoked, or when the user is inactive.
+    """
+    parsed = _parse_token(token)
+    if parsed is None:
+        return None
+    pk, version = parsed
+    lists = _filter_feed(DiningList.objects.order_by(), pk, start, end)
+
+    def aggregate(function, field, output_field):
+        # An aggregate over the whole subquery, without a GROUP BY
+        return Subquery(
+            lists.annotate(value=Func(field, function=function)).values("value"),
+            output_field=output_field,
+        )
+
+    return (
+        User.objects.filter(pk=pk, ical_feed_version=version, is_active=True)
+        .annotate(
+            feed_count=aggregate("COUNT", "pk", IntegerField()),
+            feed_modified=aggregate("MAX", "updated_at", DateTimeField()),
+        )
+        .values_list("pk", "feed_count", "feed_modified")
+        .first()
+    )
+
+
+def get_feed_range() -> tuple[date, date]:
+    today = localdate()
+    return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+
+def _filter_feed(dining_lists, user_id: int, start: date, end: date):
+    """Filters the dining lists in the range that the user joined or owns."""
+    entries = DiningEntry.objects.internal().filter(user=user_id)
+    owned = DiningList.owners.through.objects.filter(user=user_id)
+    return dining_lists.filter(date__range=(start, end)).filter(
+        Q(pk__in=entries.values("dining_list")) | Q(pk__in=owned.values("dininglist"))
+    )
+
+
+def get_feed_dining_lists(user_id: int, start: date, end: date):
+    """Returns the dining lists in the range that the user joined or owns.
+
+    Each dining list is annotated with `is_owner`.
+    """
+    owned = DiningList.owners.through.objects.filter(user=user_id)
+    return (
+        _filter_feed(DiningList.objects.all(), user_id, start, end)
+        .select_related("association")
+        .annotate(is_owner=Exists(owned.filter(dininglist=OuterRef("pk"))))
+        .order_by("date", "serve_time")
+    )
+
+
+def _escape(text: str) -> str:
+    """Escapes a TEXT value, see RFC 5545 section 3.3.11."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Folds a content line into lines of at most 75 octets."""
+    parts = []
+    current = ""
+    size = 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > 75:
+            parts.append(current)
+            # Continuation lines start with a space, which counts as well
+            current = " "
+            size = 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts)
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def build_feed(dining_lists, request) -> str:
+    """Returns the iCalendar text for the dining lists.
+
+    Args:
+        dining_lists: Dining lists from get_feed_dining_lists().
+        request: Used for the domain in the event UIDs and URLs.
+    """
+    host = request.get_host()
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Scala Dining//Dining lists//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:Scala Dining",
+    ]
+    for dl in dining_lists:
+        start = make_aware(datetime.combine(dl.date, dl.serve_time))
+        name = dl.association.get_short_name()
+        description = [
+            "Sign-up deadline: "
+            + localtime(dl.sign_up_deadline).strftime("%Y-%m-%d %H:%M")
+        ]
+        if dl.dish:
+            description.insert(0, f"Dish: {dl.dish}")
+        if dl.is_owner:
+            description.append("You are an owner of this dining list.")
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:dining-list-{dl.pk}@{host}",
+            f"DTSTAMP:{_format_datetime(dl.updated_at)}",
+            f"LAST-MODIFIED:{_format_datetime(dl.updated_at)}",
+            f"DTSTART:{_format_datetime(start)}",
+            f"DTEND:{_format_datetime(start + EVENT_DURATION)}",
+            "SUMMARY:"
+            + _escape(f"Dining {name}" + (f": {dl.dish}" if dl.dish else "")),
+            "DESCRIPTION:" + _escape("\n".join(description)),
+            "URL:" + request.build_absolute_uri(dl.get_absolute_url()),
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def _get_stamp(request, token):
+    # Memoized on the request, because it is needed by the ETag and view
+    # functions. The feed range is stored too, so that both use the same one.
+    if not hasattr(request, "_feed_stamp"):
+        request._feed_range = get_feed_range()
+        request._feed_stamp = get_feed_stamp(token, *request._feed_range)
+    return request._feed_stamp
+
+
+def _feed_etag(request, token):
+    stamp = _get_stamp(request, token)
+    # No ETag for an invalid token, the view then responds with 404
+    if stamp is None:
+        return None
+    _, count, modified = stamp
+    start, _ = request._feed_range
+    modified = modified.isoformat() if modified else ""
+    return md5(f"{token}:{start.isoformat()}:{count}:{modified}".encode()).hexdigest()
+
+
+@require_safe
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_feed_etag)
+def feed_view(request, token):
+    """Returns the iCalendar feed of the user in the token."""
+    stamp = _get_stamp(request, token)
+    if stamp is None:
+        raise Http404("Invalid token")
+    dining_lists = get_feed_dining_lists(stamp[0], *request._feed_range)
+    response = HttpResponse(
+        build_feed(dining_lists, request),
+        content_type="text/calendar; charset=utf-8",
+    )
+    response["Content-Disposition"] = 'inline; filename="dining.ics"'
+    return response
+
+
+def get_feed_url(request, user) -> str:
+    """Returns the absolute feed URL of the user."""
+    return request.build_absolute_uri(
+        reverse("ical_feed", kwargs={"token": get_feed_token(user)})
+    )
@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.timezone import make_aware
+
+from dining.models import DiningComment, DiningList
+from dining.search import index_dining_lists, search
+from userdetails.models import Association, User
+
+DISHES = [
+    "Lasagna",
+    "Vegetable curry",
+    "Pasta pesto",
+    "Stamppot boerenkool",
+    "Chili sin carne",
+    "Pizza",
+    "Pumpkin soup",
+    "Nasi goreng",
+    "Falafel wraps",
+    "Risotto with mushrooms",
+    "Shakshuka",
+    "Burritos",
+]
+WORDS = (
+    "dinner tonight bring plates cutlery dessert vegan vegetarian allergy nuts "
+    "please sign up before kitchen cleaning late extra guests pay tikkie thanks "
+    "delicious recipe leftovers"
+).split()
+NAMES = ["Noortje", "Sem", "Lotte", "Daan", "Fleur", "Bram", "Sanne", "Jesse"]
+QUERIES = ["lasagna", "curry march", "pasta 2023", "tikkie", "soup noortje", "ris"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the search query latency on a synthetic dataset of several "
+        "years. The data is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--lists-per-day", type=int, default=3)
+        parser.add_argument("--comments-per-list", type=int, default=5)
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs of each query."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        try:
+            with transaction.atomic():
+                self.create_data(options)
+                self.run_queries(options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def create_data(self, options):
+        prefix = uuid.uuid4().hex[:8]
+        associations = [
+            Association.objects.create(
+                name=f"Benchmark {prefix} {i}", slug=f"benchmark-{prefix}-{i}"
+            )
+            for i in range(options["lists_per_day"])
+        ]
+        users = User.objects.bulk_create(
+            User(
+                username=f"benchmark-{prefix}-{i}",
+                email=f"benchmark-{prefix}-{i}@example.com",
+                first_name=random.choice(NAMES),
+                last_name=f"Tester{i}",
+            )
+            for i in range(50)
+        )
+
+        start = date.today() - timedelta(days=365 * options["years"])
+        dining_lists = DiningList.objects.bulk_create(
+            DiningList(
+                date=start + timedelta(days=day),
+                association=association,
+                dish=random.choice(DISHES),
+                sign_up_deadline=make_aware(
+                    datetime.combine(start + timedelta(days=day), dt_time(15))
+                ),
+            )
+            for day in range(365 * options["years"])
+            for association in associations
+        )
+        DiningList.owners.through.objects.bulk_create(
+            DiningList.owners.through(dininglist=dl, user=random.choice(users))
+            for dl in dining_lists
+        )
+        DiningComment.objects.bulk_create(
+            DiningComment(
+                dining_list=dl,
+                poster=random.choice(users),
+                message=" ".join(random.choices(WORDS, k=random.randint(3, 30))),
+            )
+            for dl in dining_lists
+            for _ in range(options["comments_per_list"])
+        )
+
+        t = time.perf_counter()
+        count = index_dining_lists(
+            DiningList.objects.filter(pk__in=[dl.pk for dl in dining_lists])
+        )
+        duration = time.perf_counter() - t
+        self.stdout.write(
+            f"Indexed {count} dining lists in {duration:.1f}s ({connection.vendor})"
+        )
+
+    def run_queries(self, repeat):
+        self.stdout.write(f"{'query':<20} {'page':>4} {'median':>9} {'p95':>9}")
+        for query in QUERIES:
+            # The first page and a deep page using the cursors
+            cursor = None
+            for page in range(1, 6):
+                durations = []
+                for _ in range(repeat):
+                    t = time.perf_counter()
+                    results, next_cursor = search(query, cursor)
+                    durations.append((time.perf_counter() - t) * 1000)
+                if page in (1, 5):
+                    p95 = statistics.quantiles(durations, n=20)[-1]
+                    self.stdout.write(
+                        f"{query:<20} {page:>4} {statistics.median(durations):>7.2f}ms "
+                        f"{p95:>7.2f}ms"
+                    )
+                cursor = next_cursor
+                if not cursor:
+                    break
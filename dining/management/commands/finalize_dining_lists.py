@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dining.snapshots import finalize_dining_lists
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores a snapshot of the dining lists that can no longer be adjusted. "
+        "Should be run daily."
+    )
+
+    def handle(self, *args, **options):
+        count = finalize_dining_lists()
+        self.stdout.write(f"Created {count} snapshot(s)")
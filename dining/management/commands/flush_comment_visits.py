@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dining.models import DiningCommentVisitTracker
+
+
+class Command(BaseCommand):
+    help = "Writes the buffered comment page visits to the database."
+
+    def handle(self, *args, **options):
+        count = DiningCommentVisitTracker.flush_buffer()
+        self.stdout.write(f"Flushed {count} visit(s)")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dining.models import DiningList
+from dining.search import index_dining_lists
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the search documents of all dining lists. Only needed when "
+        "dining lists or comments have been changed without using the models."
+    )
+
+    def handle(self, *args, **options):
+        count = index_dining_lists(DiningList.objects.all())
+        self.stdout.write(f"Indexed {count} dining list(s)")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dining.models import DiningList
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the comment counters of all dining lists. Only needed when "
+        "comments have been changed without using the models, e.g. in bulk."
+    )
+
+    def handle(self, *args, **options):
+        count = DiningList.objects.update_comment_counts()
+        self.stdout.write(f"Updated {count} dining list(s)")
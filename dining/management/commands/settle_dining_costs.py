@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dining.models import DiningList
+from dining.settlement import settle_dining_costs
+
+
+class Command(BaseCommand):
+    help = (
+        "Charges the dinner cost of dining lists with automatic payment after the "
+        "meal has been served. Can be run as often as needed, e.g. every hour."
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.localtime()
+        dining_lists = DiningList.objects.filter(
+            auto_pay=True,
+            dining_cost__gt=0,
+            date__lte=now.date(),
+            dining_entries__has_paid=False,
+            dining_entries__settled_at=None,
+        ).distinct()
+        count = 0
+        for dining_list in dining_lists:
+            served = (
+                dining_list.date < now.date() or dining_list.serve_time <= now.time()
+            )
+            if served and dining_list.is_adjustable():
+                count += settle_dining_costs(dining_list)
+        self.stdout.write(f"Settled {count} entries")
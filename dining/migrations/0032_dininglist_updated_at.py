@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0031_alter_dininglist_dish_kind_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dininglist",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="last modified",
+            ),
+        ),
+    ]
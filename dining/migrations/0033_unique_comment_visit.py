@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:49
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keeps only the latest visit for each user and dining list."""
+    DiningCommentVisitTracker = apps.get_model("dining", "DiningCommentVisitTracker")
+
+    duplicates = (
+        DiningCommentVisitTracker.objects.values("user", "dining_list")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+    for d in duplicates:
+        visits = DiningCommentVisitTracker.objects.filter(
+            user=d["user"], dining_list=d["dining_list"]
+        ).order_by("-timestamp")
+        visits.exclude(pk=visits.first().pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0032_dininglist_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="diningcommentvisittracker",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(
+            remove_duplicates, reverse_code=migrations.RunPython.noop, elidable=True
+        ),
+        migrations.AddConstraint(
+            model_name="diningcommentvisittracker",
+            constraint=models.UniqueConstraint(
+                fields=("user", "dining_list"), name="unique_comment_visit"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:11
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def compute_comment_counts(apps, schema_editor):
+    DiningList = apps.get_model("dining", "DiningList")
+    DiningComment = apps.get_model("dining", "DiningComment")
+
+    def aggregate(expression):
+        return Subquery(
+            DiningComment.objects.filter(dining_list=OuterRef("pk"))
+            .values("dining_list")
+            .annotate(value=expression)
+            .values("value")
+        )
+
+    DiningList.objects.update(
+        comment_count=Coalesce(aggregate(Count("id")), 0),
+        visible_comment_count=Coalesce(
+            aggregate(Count("id", filter=Q(deleted=False))), 0
+        ),
+        last_comment_at=aggregate(Max("timestamp")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0033_unique_comment_visit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dininglist",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="dininglist",
+            name="last_comment_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="dininglist",
+            name="visible_comment_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="The number of comments not deleted.",
+            ),
+        ),
+        migrations.RunPython(
+            compute_comment_counts, reverse_code=migrations.RunPython.noop
+        ),
+    ]
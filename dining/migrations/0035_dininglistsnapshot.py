@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:13
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0034_comment_counts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiningListSnapshot",
+            fields=[
+                (
+                    "dining_list",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="snapshot",
+                        serialize=False,
+                        to="dining.dininglist",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0035_dininglistsnapshot"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dininglist",
+            name="date",
+            field=models.DateField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0036_dininglist_date_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="diningcomment",
+            index=models.Index(
+                fields=["dining_list", "timestamp", "id"], name="dining_comment_thread"
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# See dining/search.py
+POSTGRESQL_SQL = [
+    """
+    ALTER TABLE dining_dininglistsearch ADD COLUMN vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED
+    """,
+    "CREATE INDEX dining_search_vector ON dining_dininglistsearch USING GIN (vector)",
+]
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX dining_search_vector",
+    "ALTER TABLE dining_dininglistsearch DROP COLUMN vector",
+]
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE dining_search_fts USING fts5(
+        document,
+        content='dining_dininglistsearch',
+        content_rowid='dining_list_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER dining_search_insert AFTER INSERT ON dining_dininglistsearch BEGIN
+        INSERT INTO dining_search_fts(rowid, document)
+        VALUES (new.dining_list_id, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER dining_search_delete AFTER DELETE ON dining_dininglistsearch BEGIN
+        INSERT INTO dining_search_fts(dining_search_fts, rowid, document)
+        VALUES ('delete', old.dining_list_id, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER dining_search_update AFTER UPDATE ON dining_dininglistsearch BEGIN
+        INSERT INTO dining_search_fts(dining_search_fts, rowid, document)
+        VALUES ('delete', old.dining_list_id, old.document);
+        INSERT INTO dining_search_fts(rowid, document)
+        VALUES (new.dining_list_id, new.document);
+    END
+    """,
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER dining_search_update",
+    "DROP TRIGGER dining_search_delete",
+    "DROP TRIGGER dining_search_insert",
+    "DROP TABLE dining_search_fts",
+]
+
+
+def create_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sql = {"postgresql": POSTGRESQL_SQL, "sqlite": SQLITE_SQL}.get(vendor, [])
+    for statement in sql:
+        schema_editor.execute(statement)
+
+
+def drop_full_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sql = {"postgresql": POSTGRESQL_REVERSE_SQL, "sqlite": SQLITE_REVERSE_SQL}.get(
+        vendor, []
+    )
+    for statement in sql:
+        schema_editor.execute(statement)
+
+
+def index_dining_lists(apps, schema_editor):
+    from dining.search import index_dining_lists
+
+    index_dining_lists(
+        apps.get_model("dining", "DiningList").objects.all(),
+        apps.get_model("dining", "DiningListSearch"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0037_comment_thread_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DiningListSearch",
+            fields=[
+                (
+                    "dining_list",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search",
+                        serialize=False,
+                        to="dining.dininglist",
+                    ),
+                ),
+                ("document", models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_full_text_index, reverse_code=drop_full_text_index),
+        migrations.RunPython(
+            index_dining_lists, reverse_code=migrations.RunPython.noop, elidable=True
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0038_dininglistsearch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClosurePeriod",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start", models.DateField()),
+                (
+                    "end",
+                    models.DateField(
+                        help_text="The last day of the period (inclusive)"
+                    ),
+                ),
+                ("reason", models.CharField(max_length=100)),
+                (
+                    "hidden",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Leave the days out of the calendar, instead of only disallowing the creation of dining lists",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("start",),
+            },
+        ),
+    ]
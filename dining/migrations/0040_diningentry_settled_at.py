@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0039_closureperiod"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="diningentry",
+            name="settled_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
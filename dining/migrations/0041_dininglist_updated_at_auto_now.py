@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0040_diningentry_settled_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dininglist",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="last modified"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:36
+
+from django.db import migrations
+
+
+def delete_snapshots(apps, schema_editor):
+    # The old snapshots have no costs and diner rows, finalize_dining_lists
+    # recreates them on the next run.
+    DiningListSnapshot = apps.get_model("dining", "DiningListSnapshot")
+    DiningListSnapshot.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0041_dininglist_updated_at_auto_now"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dining", "0042_rebuild_snapshots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="diningcomment",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="diningcomment",
+            index=models.Index(
+                fields=["dining_list", "updated_at"], name="dining_comment_changes"
+            ),
+        ),
+    ]
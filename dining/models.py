@@ -1,16 +1,22 @@
 from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
 from decimal import Decimal
+from typing import Optional
 
 from django.conf import settings
-from django.core.exceptions import MultipleObjectsReturned, ValidationError
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.utils.timezone import now
 
 from creditmanagement.models import Transaction
 from general.models import AbstractVisitTracker
+from userdetails.allergens import ALLERGENS
 from userdetails.models import Association, User
 
 
@@ -28,6 +34,29 @@ class DiningListManager(models.Manager):
         )
         return settings.MAX_SLOT_NUMBER - len(self.filter(date=date)) - announce_slots
 
+    def update_comment_counts(self) -> int:
+        """Recomputes the comment counters of the dining lists in one query.
+
+        Returns:
+            The number of updated dining lists.
+        """
+
+        def aggregate(expression):
+            return Subquery(
+                DiningComment.objects.filter(dining_list=OuterRef("pk"))
+                .values("dining_list")
+                .annotate(value=expression)
+                .values("value")
+            )
+
+        return self.update(
+            comment_count=Coalesce(aggregate(Count("id")), 0),
+            visible_comment_count=Coalesce(
+                aggregate(Count("id", filter=Q(deleted=False))), 0
+            ),
+            last_comment_at=aggregate(Max("timestamp")),
+        )
+
 
 class DiningList(models.Model):
     """A single dining list (slot) model.
@@ -35,7 +64,7 @@ class DiningList(models.Model):
     The following fields may not be changed after creation: kitchen_cost!
     """
 
-    date = models.DateField()
+    date = models.DateField(db_index=True)
 
     """Todo: the date+association combination determines the URL. This makes it impossible to have multiple dining lists
     of the same association on the same day. Probably need to change that"""
@@ -112,8 +141,40 @@ class DiningList(models.Model):
         User, through="DiningEntry", through_fields=("dining_list", "user")
     )
 
+    # Kept up to date by DiningComment, can be recomputed using the
+    # repair_comment_counts management command.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    visible_comment_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The number of comments not deleted."
+    )
+    last_comment_at = models.DateTimeField(null=True, editable=False)
+
+    # Updated on save and on changes of the entries, comments and owners (see
+    # receivers.py).
+    updated_at = models.DateTimeField("last modified", auto_now=True)
+
     objects = DiningListManager()
 
+    # Updated by DiningComment using F() expressions
+    counter_fields = {"comment_count", "visible_comment_count", "last_comment_at"}
+
+    def save(self, *args, **kwargs):
+        """Saves the dining list, without the comment counters.
+
+        A full save would overwrite the counters with the values that were
+        loaded, undoing concurrent comment changes. The counters are only saved
+        when they are explicitly listed in update_fields.
+        """
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
+        elif not self._state.adding:
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
     def is_owner(self, user: User) -> bool:
         """Returns whether given user has all rights to this dining list.
 
@@ -182,10 +243,90 @@ class DiningList(models.Model):
                     }
                 )
 
+    def allergen_summary(self) -> dict:
+        """Summarizes the allergies and food preferences of the internal diners.
+
+        This is computed in the database using two queries, no user objects are
+        loaded.
+
+        Returns:
+            A dictionary with key `allergens` containing a list of tuples
+            (allergen, number of diners) for each allergen in ALLERGENS, and
+            keys `other_allergies` and `food_preferences` containing sorted
+            lists of the distinct values of those user fields.
+        """
+        entries = self.internal_dining_entries()
+        counts = entries.aggregate(
+            **{
+                a.model_field: Count("id", filter=Q(**{f"user__{a.model_field}": True}))
+                for a in ALLERGENS
+            }
+        )
+        other_allergies = set()
+        food_preferences = set()
+        texts = entries.exclude(user__other_allergy="", user__food_preferences="")
+        for other_allergy, food_preference in texts.values_list(
+            "user__other_allergy", "user__food_preferences"
+        ):
+            if other_allergy:
+                other_allergies.add(other_allergy)
+            if food_preference:
+                food_preferences.add(food_preference)
+        return {
+            "allergens": [(a, counts[a.model_field]) for a in ALLERGENS],
+            "other_allergies": sorted(other_allergies),
+            "food_preferences": sorted(food_preferences),
+        }
+
+    def diner_allergies(self) -> list[dict]:
+        """Returns the allergies and food preferences of each internal diner.
+
+        Returns:
+            A list of dictionaries with keys `name`, `allergens` (a list of
+            Allergen), `other_allergy` and `food_preferences`, ordered by name.
+        """
+        # We only need a few fields of each user, therefore we use values()
+        # instead of loading user objects.
+        rows = (
+            self.internal_dining_entries()
+            .order_by("user__first_name", "user__last_name")
+            .values(
+                "user__first_name",
+                "user__last_name",
+                "user__username",
+                "user__other_allergy",
+                "user__food_preferences",
+                *(f"user__{a.model_field}" for a in ALLERGENS),
+            )
+        )
+        diners = []
+        for row in rows:
+            # Same as User.__str__()
+            name = f"{row['user__first_name']} {row['user__last_name']}".strip()
+            diners.append(
+                {
+                    "name": name or f"@{row['user__username']}",
+                    "allergens": [
+                        a for a in ALLERGENS if row[f"user__{a.model_field}"]
+                    ],
+                    "other_allergy": row["user__other_allergy"],
+                    "food_preferences": row["user__food_preferences"],
+                }
+            )
+        return diners
+
+    def get_snapshot(self) -> Optional["DiningListSnapshot"]:
+        """Returns the snapshot if the dining list is finalized, else None."""
+        try:
+            return self.snapshot
+        except DiningListSnapshot.DoesNotExist:
+            return None
+
     def recently_commented(self) -> bool:
         """Returns True if the last comment is posted less than 12h ago."""
-        last = self.comments.order_by("-timestamp").first()
-        return last and last.timestamp > now() - timedelta(hours=12)
+        return bool(self.last_comment_at) and self.last_comment_at > now() - timedelta(
+            hours=12
+        )
 
 
 class DiningEntryManager(models.Manager):
@@ -218,6 +359,8 @@ class DiningEntry(models.Model):
     external_name = models.CharField(max_length=100, blank=True)
 
     has_paid = models.BooleanField(default=False)
+    # Set when the dining cost was charged automatically (see dining/settlement.py)
+    settled_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Work/help stats
     has_shopped = models.BooleanField(default=False)
@@ -257,6 +400,97 @@ class DiningEntry(models.Model):
                 )
 
 
+class DiningListSearch(models.Model):
+    """The text of a dining list that is searched, see dining/search.py.
+
+    The full-text index on the document is maintained by the database: a
+    generated tsvector column on PostgreSQL, an FTS5 table on SQLite.
+    """
+
+    dining_list = models.OneToOneField(
+        DiningList, on_delete=models.CASCADE, primary_key=True, related_name="search"
+    )
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search document of {self.dining_list_id}"
+
+
+class DiningListSnapshot(models.Model):
+    """The final data of a dining list that can no longer be adjusted.
+
+    Created by finalize_dining_lists() (see dining/snapshots.py) and deleted
+    when the dining list still changes, e.g. when an owner edits the stats.
+    """
+
+    dining_list = models.OneToOneField(
+        DiningList, on_delete=models.CASCADE, primary_key=True, related_name="snapshot"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f"Snapshot of {self.dining_list_id}"
+
+    def allergen_summary(self) -> dict:
+        """Returns the allergen summary, see DiningList.allergen_summary."""
+        counts = self.data["allergens"]
+        return {
+            "allergens": [(a, counts.get(a.model_field, 0)) for a in ALLERGENS],
+            "other_allergies": self.data["other_allergies"],
+            "food_preferences": self.data["food_preferences"],
+        }
+
+    def diner_allergies(self) -> list[dict]:
+        """Returns the diner allergies, see DiningList.diner_allergies."""
+        allergens = {a.model_field: a for a in ALLERGENS}
+        return [
+            {**d, "allergens": [allergens[a] for a in d["allergens"]]}
+            for d in self.data["diners"]
+        ]
+
+    def entries(self) -> list[dict]:
+        """Returns the rows of the diners page, see snapshots.build_entry_rows."""
+        return self.data["entries"]
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def parse_comment_cursor(cursor: str) -> tuple[datetime, int]:
+    """Returns the timestamp and id of a cursor from DiningComment.get_cursor().
+
+    Raises:
+        ValueError: When the cursor is invalid.
+    """
+    micros, pk = cursor.split("-")
+    try:
+        return _EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except OverflowError:
+        raise ValueError("Cursor timestamp out of range")
+
+
+class DiningCommentQuerySet(models.QuerySet):
+    """Keyset pagination of comments, ordered by timestamp and id."""
+
+    def before(self, cursor: str):
+        timestamp, pk = parse_comment_cursor(cursor)
+        return self.filter(
+            Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk)
+        ).order_by("-timestamp", "-pk")
+
+    def after(self, cursor: str):
+        timestamp, pk = parse_comment_cursor(cursor)
+        return self.filter(
+            Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk)
+        ).order_by("timestamp", "pk")
+
+    def changed_since(self, cursor: str):
+        """Filters comments changed since a cursor from get_change_cursor()."""
+        timestamp, _ = parse_comment_cursor(cursor)
+        return self.filter(updated_at__gte=timestamp)
+
+
 class DiningComment(models.Model):
     dining_list = models.ForeignKey(
         DiningList, on_delete=models.CASCADE, related_name="comments"
@@ -270,6 +504,46 @@ class DiningComment(models.Model):
         help_text="Whether an e-mail notification was sent for this comment.",
     )
     deleted = models.BooleanField(default=False)
+    # For loading pinned and deleted comments in place, see SlotCommentsView
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DiningCommentQuerySet.as_manager()
+
+    # A change cursor starts a bit before the moment it is created, so that
+    # changes that are committed during the request are not missed.
+    CHANGE_MARGIN = timedelta(seconds=10)
+
+    class Meta:
+        indexes = [
+            # For the comment pages and unread counts, see SlotInfoView
+            models.Index(
+                fields=["dining_list", "timestamp", "id"],
+                name="dining_comment_thread",
+            ),
+            models.Index(
+                fields=["dining_list", "updated_at"],
+                name="dining_comment_changes",
+            ),
+        ]
+
+    @classmethod
+    def get_change_cursor(cls) -> str:
+        """Returns a cursor for the comments changed from now on.
+
+        See DiningCommentQuerySet.changed_since().
+        """
+        micros = (timezone.now() - cls.CHANGE_MARGIN - _EPOCH) // timedelta(
+            microseconds=1
+        )
+        return f"{micros}-0"
+
+    def get_cursor(self) -> str:
+        """Returns the position of the comment in the thread, for pagination.
+
+        See DiningCommentQuerySet.before() and after().
+        """
+        micros = (self.timestamp - _EPOCH) // timedelta(microseconds=1)
+        return f"{micros}-{self.pk}"
 
     def can_delete(self, user) -> bool:
         """Returns True if the user is the owner or poster."""
@@ -279,55 +553,204 @@ class DiningComment(models.Model):
         """Returns True if the user is owner of the dining list."""
         return self.dining_list.is_owner(user)
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                # (On SQLite Greatest is NULL when one of the values is NULL.)
+                DiningList.objects.filter(pk=self.dining_list_id).update(
+                    comment_count=F("comment_count") + 1,
+                    visible_comment_count=F("visible_comment_count")
+                    + (0 if self.deleted else 1),
+                    last_comment_at=Coalesce(
+                        Greatest("last_comment_at", Value(self.timestamp)),
+                        Value(self.timestamp),
+                    ),
+                )
+
     def mark_deleted(self):
         """Marks as deleted and saves."""
+        if self.deleted:
+            return
         self.pinned_to_top = False
         self.deleted = True
-        self.save()
+        with transaction.atomic():
+            self.save()
+            DiningList.objects.filter(pk=self.dining_list_id).update(
+                visible_comment_count=F("visible_comment_count") - 1
+            )
 
 
 class DiningCommentVisitTracker(AbstractVisitTracker):
-    """Tracks whether certain comments have been read, i.e. the last time the comments page was visited."""
+    """Tracks whether certain comments have been read, i.e. the last time the comments page was visited.
+
+    When the BUFFER_COMMENT_VISITS setting is enabled, the latest visits are
+    cached and new visits are written to the cache instead of the database, so
+    that a page view does not need a write query. The buffered visits are
+    periodically written to the database in bulk by flush_buffer().
+    """
 
     dining_list = models.ForeignKey(DiningList, on_delete=models.CASCADE)
 
+    # The buffer is flushed during a request after this many visits. It is also
+    # flushed by the flush_comment_visits command.
+    FLUSH_THRESHOLD = 100
+
+    # How long the latest visit of a user is kept in the cache.
+    CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+    _COUNTER_KEY = "dining:visits:counter"
+    _FLUSHED_KEY = "dining:visits:flushed"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "dining_list"], name="unique_comment_visit"
+            )
+        ]
+
+    @staticmethod
+    def _visit_key(dining_list_id, user_id) -> str:
+        return f"dining:visit:{dining_list_id}:{user_id}"
+
+    @staticmethod
+    def _pending_key(n: int) -> str:
+        return f"dining:visits:pending:{n}"
+
+    @staticmethod
+    def is_buffered() -> bool:
+        """Whether visits are buffered, see the BUFFER_COMMENT_VISITS setting."""
+        # The other backends can evict or cull the buffered visits before they
+        # are flushed, or are not shared between processes.
+        return (
+            settings.BUFFER_COMMENT_VISITS
+            and settings.CACHES["default"]["BACKEND"]
+            == "django.core.cache.backends.redis.RedisCache"
+        )
+
     @classmethod
     def get_latest_visit(cls, dining_list, user, update=False):
         """Gets the datetime of the latest visit.
 
-        If there isn't one it either returns None, or the current time if update is set to True.
+        Without the buffer, this reads the visit and upserts the new one, and
+        the cache is not used. With the buffer, the cache is read before the
+        database.
 
         Args:
             dining_list: The dining list the comment is part of.
             user: The user visiting the page.
-            update: Update(?)
+            update: Whether to record a visit at the current time.
+
+        Returns:
+            The datetime of the previous visit. If there isn't one it either
+            returns None, or the current time if update is set to True.
         """
-        try:
-            if update:
-                latest_visit_obj, created = cls.objects.get_or_create(
-                    user=user, dining_list=dining_list
-                )
-            else:
-                try:
-                    latest_visit_obj = cls.objects.get(
-                        user=user, dining_list=dining_list
-                    )
-                except cls.DoesNotExist:
-                    return None
-        except MultipleObjectsReturned:
-            # A race condition occured and multiple were created. Clean up the entries
-            visit_entries = cls.objects.filter(user=user, dining_list=dining_list)
-            # Store 1 object, remove the others this could result in dataloss, but the problem is not noticeable
-            latest_visit_obj = visit_entries.first()
-            visit_entries.exclude(id=latest_visit_obj.id)
-            visit_entries.delete()
-
-        timestamp = latest_visit_obj.timestamp
+        buffered = cls.is_buffered()
+        key = cls._visit_key(dining_list.pk, user.pk)
+        missing = object()
+        timestamp = cache.get(key, missing) if buffered else missing
+        if timestamp is missing:
+            timestamp = (
+                cls.objects.filter(user=user, dining_list=dining_list)
+                .values_list("timestamp", flat=True)
+                .first()
+            )
+            if buffered and not update:
+                # Also caches the absence of a visit (None)
+                cache.set(key, timestamp, cls.CACHE_TIMEOUT)
+
         if update:
-            latest_visit_obj.timestamp = timezone.now()
-            latest_visit_obj.save()
+            visit = timezone.now()
+            if buffered:
+                cache.set(key, visit, cls.CACHE_TIMEOUT)
+                cls._add_to_buffer(dining_list.pk, user.pk, visit)
+            else:
+                cls._save_visits(
+                    [cls(dining_list=dining_list, user=user, timestamp=visit)]
+                )
+            if timestamp is None:
+                timestamp = visit
         return timestamp
 
+    @classmethod
+    def _add_to_buffer(cls, dining_list_id, user_id, timestamp):
+        # Each visit gets its own numbered key. Incrementing is atomic, so
+        # concurrent requests never overwrite each other's visits. The counter
+        # is created using add(), which does not overwrite a concurrent one.
+        cache.add(cls._COUNTER_KEY, 0, None)
+        n = cache.incr(cls._COUNTER_KEY)
+        cache.set(cls._pending_key(n), (dining_list_id, user_id, timestamp), None)
+        if n % cls.FLUSH_THRESHOLD == 0:
+            cls.flush_buffer()
+
+    @classmethod
+    def flush_buffer(cls) -> int:
+        """Writes the buffered visits to the database using a single upsert.
+
+        Returns:
+            The number of visit rows that were written.
+        """
+        end = cache.get(cls._COUNTER_KEY, 0)
+        start = cache.get(cls._FLUSHED_KEY, 0)
+        if start > end:
+            # The counter was evicted and has restarted
+            start = 0
+        keys = [cls._pending_key(n) for n in range(start + 1, end + 1)]
+        if not keys:
+            return 0
+
+        values = cache.get_many(keys)
+        # A concurrent visit might have incremented the counter, but not yet
+        # stored its key. The marker therefore stops before the first missing
+        # key, unless it is still missing many visits later, in which case the
+        # request that should have stored it has failed.
+        flushed = start
+        for n in range(start + 1, end + 1):
+            if cls._pending_key(n) not in values and end - n < cls.FLUSH_THRESHOLD:
+                break
+            flushed = n
+
+        # Keep only the latest visit for each user and dining list
+        latest = {}
+        for dining_list_id, user_id, timestamp in values.values():
+            k = (dining_list_id, user_id)
+            if k not in latest or latest[k] < timestamp:
+                latest[k] = timestamp
+
+        # Skip dining lists or users that have been deleted in the meantime
+        dining_list_ids = set(
+            DiningList.objects.filter(pk__in={k[0] for k in latest}).values_list(
+                "pk", flat=True
+            )
+        )
+        user_ids = set(
+            User.objects.filter(pk__in={k[1] for k in latest}).values_list(
+                "pk", flat=True
+            )
+        )
+        visits = [
+            cls(dining_list_id=dining_list_id, user_id=user_id, timestamp=timestamp)
+            for (dining_list_id, user_id), timestamp in latest.items()
+            if dining_list_id in dining_list_ids and user_id in user_ids
+        ]
+        cls._save_visits(visits)
+        cache.set(cls._FLUSHED_KEY, flushed, None)
+        # Visits after the marker are read again by the next flush, which is
+        # harmless because they are upserted with the same timestamp.
+        cache.delete_many(keys[: flushed - start])
+        return len(visits)
+
+    @classmethod
+    def _save_visits(cls, visits: list):
+        """Inserts or updates the visits using a single query."""
+        cls.objects.bulk_create(
+            visits,
+            update_conflicts=True,
+            unique_fields=["user", "dining_list"],
+            update_fields=["timestamp"],
+        )
+
     def __str__(self):
         return "{dining_list} - {user}".format(
             dining_list=self.dining_list, user=self.user
@@ -346,6 +769,43 @@ class DiningDayAnnouncement(models.Model):
         return self.title
 
 
+class ClosurePeriod(models.Model):
+    """A period in which there is no dining, e.g. a holiday or the summer break.
+
+    The periods are compiled into the date sequence, see
+    dining.datesequence.ClosureCalendarSequencedDate.
+    """
+
+    start = models.DateField()
+    end = models.DateField(help_text="The last day of the period (inclusive)")
+    reason = models.CharField(max_length=100)
+    hidden = models.BooleanField(
+        default=False,
+        help_text="Leave the days out of the calendar, instead of only "
+        "disallowing the creation of dining lists",
+    )
+
+    class Meta:
+        ordering = ("start",)
+
+    def __str__(self):
+        return self.reason
+
+    def clean(self):
+        if self.start and self.end:
+            if self.end < self.start:
+                raise ValidationError({"end": "The end can't be before the start"})
+            if (
+                self.hidden
+                and DiningList.objects.filter(
+                    date__range=(self.start, self.end)
+                ).exists()
+            ):
+                raise ValidationError(
+                    {"hidden": "There are dining lists in this period"}
+                )
+
+
 class PaymentReminderLock(models.Model):
     """Database table to prevent multiple payment reminder emails.
 
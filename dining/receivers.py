@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from dining import events, search
+from dining.cache import bump_day_version
+from dining.datesequence import invalidate_closures, reset_closure_check
+from dining.models import (
+    ClosurePeriod,
+    DiningComment,
+    DiningDayAnnouncement,
+    DiningEntry,
+    DiningList,
+    DiningListSnapshot,
+)
+from userdetails.allergens import ALLERGENS
+from userdetails.models import User
+
+# User fields that are shown on the allergy pages and kitchen manifest
+ALLERGY_FIELDS = {
+    *(a.model_field for a in ALLERGENS),
+    "other_allergy",
+    "food_preferences",
+}
+
+
+def invalidate_date(d):
+    # The version is changed after commit. If we would do it right away, a
+    # concurrent request could cache the old database state with the new version.
+    transaction.on_commit(lambda: bump_day_version(d))
+
+
+def publish_event(pk, d, event, data_func=dict):
+    """Publishes an event on the dining list and day channels after commit.
+
+    Args:
+        pk: The id of the dining list the event is about.
+        d: The date of the dining list.
+        event: The event type.
+        data_func: Called after commit to get the event data, so that it can
+            contain committed state like the number of diners.
+    """
+
+    def publish():
+        data = {"dining_list": pk, **data_func()}
+        events.publish(events.dining_list_channel(pk), event, data)
+        events.publish(events.day_channel(d), event, data)
+
+    transaction.on_commit(publish)
+
+
+def get_diner_count(pk) -> dict:
+    return {"diner_count": DiningEntry.objects.filter(dining_list=pk).count()}
+
+
+def update_search(pk):
+    """Rebuilds the search document of the dining list after commit."""
+    transaction.on_commit(lambda: search.update_documents([pk]))
+
+
+def touch_dining_list(pk, d):
+    """Updates the last modified stamp of the dining list with given id.
+
+    The date of the dining list is invalidated as well, because the data of a
+    date (e.g. the day API) includes the stamps of its dining lists.
+    """
+    DiningList.objects.filter(pk=pk).update(updated_at=timezone.now())
+    invalidate_date(d)
+
+
+def discard_snapshot(dining_list: DiningList):
+    """Deletes the snapshot of the dining list, see dining/snapshots.py."""
+    # Only dining lists that can no longer be adjusted have a snapshot
+    if not dining_list.is_adjustable():
+        DiningListSnapshot.objects.filter(dining_list=dining_list.pk).delete()
+
+
+# Set while bulk_changes() is active
+_bulk_changes = ContextVar("dining_bulk_changes", default=False)
+
+
+@contextmanager
+def bulk_changes(*dining_lists: DiningList):
+    """Context manager for changing many entries or comments of dining lists.
+
+    The entry and comment receivers are skipped within the block. Instead, the
+    dining lists are touched and their dates invalidated once at the end. This
+    prevents a few queries per changed row, e.g. when a queryset is deleted.
+    """
+    # The dining lists might get deleted within the block, which clears the pk
+    pks = [dl.pk for dl in dining_lists]
+    dates = {dl.date for dl in dining_lists}
+    token = _bulk_changes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_changes.reset(token)
+    DiningList.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+    DiningListSnapshot.objects.filter(
+        dining_list__in=[
+            pk for pk, dl in zip(pks, dining_lists) if not dl.is_adjustable()
+        ]
+    ).delete()
+    for d in dates:
+        invalidate_date(d)
+    for pk, dl in zip(pks, dining_lists):
+        update_search(pk)
+        publish_event(pk, dl.date, "info")
+
+
+@receiver(post_save, sender=DiningList)
+@receiver(post_delete, sender=DiningList)
+@receiver(post_save, sender=DiningDayAnnouncement)
+@receiver(post_delete, sender=DiningDayAnnouncement)
+def invalidate_day(sender, instance, **kwargs):
+    invalidate_date(instance.date)
+
+
+@receiver(post_save, sender=DiningList)
+def publish_dining_list(sender, instance, **kwargs):
+    publish_event(instance.pk, instance.date, "info")
+
+
+@receiver(post_delete, sender=DiningList)
+def publish_dining_list_deleted(sender, instance, **kwargs):
+    publish_event(instance.pk, instance.date, "info", lambda: {"deleted": True})
+
+
+@receiver(post_save, sender=ClosurePeriod)
+@receiver(post_delete, sender=ClosurePeriod)
+def invalidate_closure_calendar(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_closures)
+
+
+# The closure calendar version is checked once per request
+request_started.connect(reset_closure_check)
+
+
+@receiver(post_save, sender=DiningList)
+def update_dining_list_search(sender, instance, **kwargs):
+    update_search(instance.pk)
+
+
+@receiver(post_save, sender=DiningList)
+def discard_dining_list_snapshot(sender, instance, created, **kwargs):
+    if not created:
+        discard_snapshot(instance)
+
+
+@receiver(post_save, sender=DiningEntry)
+@receiver(post_delete, sender=DiningEntry)
+def invalidate_entry(sender, instance, **kwargs):
+    if _bulk_changes.get():
+        return
+    touch_dining_list(instance.dining_list_id, instance.dining_list.date)
+    discard_snapshot(instance.dining_list)
+    pk = instance.dining_list_id
+    publish_event(pk, instance.dining_list.date, "diners", lambda: get_diner_count(pk))
+
+
+@receiver(post_save, sender=DiningComment)
+@receiver(post_delete, sender=DiningComment)
+def invalidate_comment(sender, instance, **kwargs):
+    if _bulk_changes.get():
+        return
+    touch_dining_list(instance.dining_list_id, instance.dining_list.date)
+
+
+@receiver(post_save, sender=DiningComment)
+def publish_comment(sender, instance, created, **kwargs):
+    if _bulk_changes.get():
+        return
+    data = {
+        "id": instance.pk,
+        "created": created,
+        "pinned": instance.pinned_to_top,
+        "deleted": instance.deleted,
+    }
+    publish_event(
+        instance.dining_list_id, instance.dining_list.date, "comment", lambda: data
+    )
+
+
+@receiver(post_delete, sender=DiningComment)
+def decrement_comment_counts(sender, instance, **kwargs):
+    # The counters are incremented by DiningComment.save(). Comments are only
+    # deleted in bulk together with their dining list.
+    if _bulk_changes.get():
+        return
+    DiningList.objects.filter(pk=instance.dining_list_id).update(
+        comment_count=F("comment_count") - 1,
+        visible_comment_count=F("visible_comment_count")
+        - (0 if instance.deleted else 1),
+    )
+
+
+@receiver(post_save, sender=DiningComment)
+@receiver(post_delete, sender=DiningComment)
+def update_comment_search(sender, instance, **kwargs):
+    if _bulk_changes.get():
+        return
+    update_search(instance.dining_list_id)
+
+
+@receiver(m2m_changed, sender=DiningList.owners.through)
+def invalidate_owners(sender, instance, action, reverse, **kwargs):
+    if action.startswith("post_") and not reverse:
+        # (The iCalendar feeds of the old owners depend on the date version too)
+        touch_dining_list(instance.pk, instance.date)
+        discard_snapshot(instance)
+        update_search(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_allergies(sender, instance, created, update_fields, **kwargs):
+    """Invalidates the upcoming dining lists and dates the user is signed up for."""
+    if created:
+        return
+    # Skips e.g. the last_login update
+    if update_fields is not None and not ALLERGY_FIELDS.intersection(update_fields):
+        return
+    dining_lists = DiningList.objects.filter(
+        date__gte=timezone.now().date(),
+        pk__in=DiningEntry.objects.internal()
+        .filter(user=instance)
+        .values("dining_list"),
+    )
+    # The allergen summary of the dining list API depends on the stamp
+    dining_lists.update(updated_at=timezone.now())
+    rows = list(dining_lists.order_by().values_list("pk", "date"))
+    for d in {d for pk, d in rows}:
+        invalidate_date(d)
+    for pk, d in rows:
+        publish_event(pk, d, "allergens")
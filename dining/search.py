@@ -0,0 +1,208 @@
+"""Full-text search over dining lists.
+
+Each dining list has a DiningListSearch row with a plain text document that
+contains the dish, association, date, owners and comments. The document is
+rebuilt after changes (see dining/receivers.py) or using the
+rebuild_search_index management command.
+
+The full-text index is maintained by the database:
+
+* PostgreSQL: a generated tsvector column with a GIN index.
+* SQLite: an FTS5 table which is kept in sync by triggers, for development.
+
+See migration 0038_dininglistsearch. Other databases fall back to a slow
+substring search.
+
+Results are ranked and paginated using a keyset of the rank and dining list id,
+so that deep pages are as cheap as the first page. All words of the query must
+match, as prefix of a word in the document.
+"""
+
+import re
+from typing import Iterable, Optional
+
+from django.db import connection
+from django.utils.dates import MONTHS, WEEKDAYS
+
+from dining.models import DiningList, DiningListSearch
+
+# The document is truncated to this length (in characters)
+MAX_DOCUMENT_LENGTH = 100_000
+
+# Additional words of a query are ignored
+MAX_QUERY_WORDS = 10
+
+_FTS_TABLE = "dining_search_fts"
+
+
+def build_document(dining_list) -> str:
+    """Returns the text of a dining list that is searched.
+
+    This only uses fields and the owners and comments relations, so that it
+    also works with the historical models in migrations.
+    """
+    d = dining_list.date
+    association = dining_list.association
+    kinds = dict(dining_list._meta.get_field("dish_kind").choices)
+    parts = [
+        dining_list.dish,
+        kinds.get(dining_list.dish_kind, "") if dining_list.dish_kind else "",
+        association.name,
+        association.short_name or "",
+        # The date in a few notations, e.g. "2089 01 03 3 January Monday"
+        f"{d.year} {d.month:02} {d.day:02} {d.day} {MONTHS[d.month]} {WEEKDAYS[d.weekday()]}",
+    ]
+    parts += [f"{o.first_name} {o.last_name}" for o in dining_list.owners.all()]
+    parts += [c.message for c in dining_list.comments.all() if not c.deleted]
+    return "\n".join(p for p in parts if p)[:MAX_DOCUMENT_LENGTH]
+
+
+def index_dining_lists(dining_lists, search_model=DiningListSearch, batch_size=500):
+    """Creates or updates the search documents of the dining lists.
+
+    Args:
+        dining_lists: A QuerySet of the dining lists.
+        search_model: The DiningListSearch model, for usage in migrations.
+        batch_size: The number of documents that are written at once.
+
+    Returns:
+        The number of updated documents.
+    """
+    dining_lists = dining_lists.select_related("association").prefetch_related(
+        "owners", "comments"
+    )
+    count = 0
+    batch = []
+    for dining_list in dining_lists.iterator(chunk_size=batch_size):
+        batch.append(
+            search_model(dining_list=dining_list, document=build_document(dining_list))
+        )
+        if len(batch) == batch_size:
+            count += _save(search_model, batch)
+            batch = []
+    return count + _save(search_model, batch)
+
+
+def _save(search_model, documents: list) -> int:
+    return len(
+        search_model.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["dining_list"],
+            update_fields=["document"],
+        )
+    )
+
+
+def update_documents(pks: Iterable[int]):
+    """Rebuilds the search documents of the dining lists with given ids."""
+    index_dining_lists(DiningList.objects.filter(pk__in=list(pks)))
+
+
+def make_cursor(score: float, pk: int) -> str:
+    return f"{score!r}~{pk}"
+
+
+def parse_cursor(cursor: str) -> tuple[float, int]:
+    """Raises ValueError when the cursor is invalid."""
+    score, pk = cursor.split("~")
+    return float(score), int(pk)
+
+
+def get_query_words(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_WORDS]
+
+
+def _keyset_sql(cursor: Optional[tuple[float, int]], score_type="") -> tuple[str, list]:
+    """Returns the condition for the results after the cursor."""
+    if not cursor:
+        return "", []
+    score, pk = cursor
+    return (
+        f"WHERE score < %s{score_type} OR (score = %s{score_type} AND id < %s)",
+        [score, score, pk],
+    )
+
+
+def _search_postgresql(words, cursor, limit) -> list[tuple[int, float]]:
+    keyset, params = _keyset_sql(cursor, "::real")
+    sql = f"""
+        SELECT id, score FROM (
+            SELECT dining_list_id AS id, ts_rank(vector, query) AS score
+            FROM {DiningListSearch._meta.db_table}, to_tsquery('simple', %s) query
+            WHERE vector @@ query
+        ) results
+        {keyset}
+        ORDER BY score DESC, id DESC
+        LIMIT %s
+    """
+    tsquery = " & ".join(f"{w}:*" for w in words)
+    with connection.cursor() as c:
+        c.execute(sql, [tsquery, *params, limit])
+        return c.fetchall()
+
+
+def _search_sqlite(words, cursor, limit) -> list[tuple[int, float]]:
+    keyset, params = _keyset_sql(cursor)
+    # bm25() is lower for better matches
+    sql = f"""
+        SELECT id, score FROM (
+            SELECT rowid AS id, -bm25({_FTS_TABLE}) AS score
+            FROM {_FTS_TABLE}
+            WHERE {_FTS_TABLE} MATCH %s
+        )
+        {keyset}
+        ORDER BY score DESC, id DESC
+        LIMIT %s
+    """
+    match = " ".join(f'"{w}"*' for w in words)
+    with connection.cursor() as c:
+        c.execute(sql, [match, *params, limit])
+        return c.fetchall()
+
+
+def _search_fallback(words, cursor, limit) -> list[tuple[int, float]]:
+    documents = DiningListSearch.objects.all()
+    for word in words:
+        documents = documents.filter(document__icontains=word)
+    if cursor:
+        documents = documents.filter(dining_list__lt=cursor[1])
+    pks = documents.order_by("-dining_list").values_list("dining_list", flat=True)
+    return [(pk, 0.0) for pk in pks[:limit]]
+
+
+def search(
+    query: str, cursor: Optional[str] = None, limit: int = 20
+) -> tuple[list[DiningList], Optional[str]]:
+    """Returns the dining lists that match the query, best match first.
+
+    Args:
+        query: The search words.
+        cursor: The cursor returned for the previous page.
+        limit: The maximum number of results.
+
+    Returns:
+        The dining lists and the cursor for the next page, which is None when
+        there are no more results.
+
+    Raises:
+        ValueError: When the cursor is invalid.
+    """
+    words = get_query_words(query)
+    if not words:
+        return [], None
+    after = parse_cursor(cursor) if cursor else None
+    backend = {
+        "postgresql": _search_postgresql,
+        "sqlite": _search_sqlite,
+    }.get(connection.vendor, _search_fallback)
+    results = backend(words, after, limit + 1)
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = make_cursor(results[-1][1], results[-1][0])
+    dining_lists = DiningList.objects.select_related("association").in_bulk(
+        [pk for pk, _ in results]
+    )
+    return [dining_lists[pk] for pk, _ in results if pk in dining_lists], next_cursor
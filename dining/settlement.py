@@ -0,0 +1,77 @@
+"""Automatic payment of the dining cost of dining lists.
+
+When a dining list has `auto_pay` enabled, the dining cost of its entries is
+charged to the first owner after the meal has been served (see the
+settle_dining_costs management command). Settled entries are marked as paid
+and get a `settled_at` stamp. The stamp is never cleared, so an entry that is
+marked as unpaid again afterwards is not charged a second time.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from creditmanagement.models import Account, Transaction
+from dining.models import DiningEntry, DiningList
+from dining.receivers import bulk_changes
+
+
+def settle_dining_costs(dining_list: DiningList) -> int:
+    """Charges the dinner cost of all unsettled entries to the first owner.
+
+    Each entry is charged to its user, thus guests are charged to the user who
+    added them. Per user a single transaction is created for all their entries,
+    after which the entries are marked as paid and settled. Entries that are
+    already paid or settled are skipped, so it is safe to run this multiple
+    times, also concurrently.
+
+    Returns:
+        The number of entries that were settled.
+    """
+    with transaction.atomic():
+        # Lock the dining list, so that concurrent runs can't charge twice. The
+        # cost and payment settings are read under the lock, because they
+        # might have been changed after the dining list was loaded.
+        dining_list = DiningList.objects.select_for_update().get(pk=dining_list.pk)
+        if not dining_list.auto_pay or not dining_list.dining_cost:
+            return 0
+        owner = dining_list.owners.order_by("pk").first()
+        if not owner:
+            return 0
+        # The entries are locked too, because their paid state is changed
+        # without locking the dining list.
+        entries = (
+            dining_list.dining_entries.select_for_update()
+            .filter(has_paid=False, settled_at=None)
+            .values_list("pk", "user")
+        )
+        entries_per_user = {}
+        for pk, user in entries:
+            entries_per_user.setdefault(user, []).append(pk)
+        if not entries_per_user:
+            return 0
+
+        accounts = dict(
+            Account.objects.filter(user__in=[*entries_per_user, owner]).values_list(
+                "user", "pk"
+            )
+        )
+        target = accounts[owner.pk]
+        Transaction.objects.bulk_create(
+            Transaction(
+                source_id=accounts[user],
+                target_id=target,
+                amount=dining_list.dining_cost * len(pks),
+                description=f"Dinner cost for {dining_list}"
+                + (f" ({len(pks)} diners)" if len(pks) > 1 else ""),
+                created_by=owner,
+            )
+            for user, pks in entries_per_user.items()
+            # The owner does not need to pay themselves
+            if user != owner.pk
+        )
+        settled = [pk for pks in entries_per_user.values() for pk in pks]
+        with bulk_changes(dining_list):
+            DiningEntry.objects.filter(
+                pk__in=settled, has_paid=False, settled_at=None
+            ).update(has_paid=True, settled_at=timezone.now())
+    return len(settled)
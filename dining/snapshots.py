@@ -0,0 +1,112 @@
+"""Snapshots of dining lists that can no longer be adjusted.
+
+After the adjustable period the entries of a dining list are final.
+finalize_dining_lists() then stores the diner counts, costs, diner rows and
+allergy data in a DiningListSnapshot. The allergy pages, the diners page (for
+users that are not an owner) and the claimed dining lists history read these
+instead of querying the entries, users and memberships.
+
+Owners can still change the work and paid stats of a finalized dining list.
+This deletes the snapshot (see dining/receivers.py), which is recreated on the
+next run.
+"""
+
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+
+from dining.models import DiningEntry, DiningList, DiningListSnapshot
+from userdetails.models import UserMembership
+
+
+def build_entry_rows(dining_list: DiningList) -> list[dict]:
+    """Returns the rows of the diners page, see DiningListSnapshot.entries()."""
+    entries = (
+        dining_list.dining_entries.select_related("user", "created_by")
+        .prefetch_related(
+            Prefetch(
+                "user__usermembership_set",
+                queryset=UserMembership.objects.filter(is_verified=True).select_related(
+                    "association"
+                ),
+                to_attr="verified_memberships",
+            )
+        )
+        .order_by("user__first_name", "user__last_name", "external_name")
+    )
+    return [
+        {
+            "id": entry.pk,
+            "name": entry.get_name(),
+            "added_by": str(entry.created_by) if entry.is_external() else "",
+            "associations": (
+                []
+                if entry.is_external()
+                else [
+                    {
+                        "short_name": m.association.get_short_name(),
+                        "icon_url": (
+                            m.association.icon_image.url
+                            if m.association.icon_image
+                            else ""
+                        ),
+                    }
+                    for m in entry.user.verified_memberships
+                ]
+            ),
+            "has_shopped": entry.has_shopped,
+            "has_cooked": entry.has_cooked,
+            "has_cleaned": entry.has_cleaned,
+            "has_paid": entry.has_paid,
+        }
+        for entry in entries
+    ]
+
+
+def build_snapshot_data(dining_list: DiningList) -> dict:
+    """Collects the data for the snapshot of the dining list."""
+    counts = DiningEntry.objects.filter(dining_list=dining_list).aggregate(
+        diner_count=Count("pk"), paid_count=Count("pk", filter=Q(has_paid=True))
+    )
+    summary = dining_list.allergen_summary()
+    return {
+        **counts,
+        "kitchen_cost": dining_list.kitchen_cost,
+        "dining_cost": dining_list.dining_cost,
+        "entries": build_entry_rows(dining_list),
+        "allergens": {a.model_field: n for a, n in summary["allergens"] if n},
+        "other_allergies": summary["other_allergies"],
+        "food_preferences": summary["food_preferences"],
+        "diners": [
+            {**d, "allergens": [a.model_field for a in d["allergens"]]}
+            for d in dining_list.diner_allergies()
+        ],
+    }
+
+
+def finalize_dining_lists(batch_size=100) -> int:
+    """Creates the snapshots of dining lists that can no longer be adjusted.
+
+    Returns:
+        The number of created snapshots.
+    """
+    candidates = DiningList.objects.filter(
+        date__lt=timezone.now().date(), snapshot__isnull=True
+    ).order_by("date")
+    count = 0
+    batch = []
+    for dining_list in candidates.iterator(chunk_size=batch_size):
+        # (The adjustable duration differs per dining list.)
+        if dining_list.is_adjustable():
+            continue
+        batch.append(
+            DiningListSnapshot(
+                dining_list=dining_list, data=build_snapshot_data(dining_list)
+            )
+        )
+        if len(batch) == batch_size:
+            count += len(
+                DiningListSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+            )
+            batch = []
+    count += len(DiningListSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+    return count
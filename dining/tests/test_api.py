@@ -0,0 +1,93 @@
+from datetime import date, datetime
+
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from dining.models import DiningComment, DiningEntry, DiningList
+from userdetails.models import Association, User
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje", allergen_gluten=True)
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+
+    def setUp(self):
+        self.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=self.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+        )
+        self.client.force_login(self.user)
+
+    def test_day(self):
+        response = self.client.get("/api/v1/days/2089/1/1/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["dining_lists"][0]["id"], self.dining_list.pk)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_day_not_modified(self):
+        etag = self.client.get("/api/v1/days/2089/1/1/")["ETag"]
+        response = self.client.get("/api/v1/days/2089/1/1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_day_modified_after_entry(self):
+        etag = self.client.get("/api/v1/days/2089/1/1/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            DiningEntry.objects.create(
+                dining_list=self.dining_list, user=self.user, created_by=self.user
+            )
+        response = self.client.get("/api/v1/days/2089/1/1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["dining_lists"][0]["diner_count"], 1)
+
+    def test_day_modified_after_comment(self):
+        etag = self.client.get("/api/v1/days/2089/1/1/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            DiningComment.objects.create(
+                dining_list=self.dining_list, poster=self.user, message="Hi"
+            )
+        response = self.client.get("/api/v1/days/2089/1/1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_day_modified_after_owner_change(self):
+        etag = self.client.get("/api/v1/days/2089/1/1/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dining_list.owners.add(self.user)
+        response = self.client.get("/api/v1/days/2089/1/1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dining_list_modified_after_allergy_change(self):
+        DiningEntry.objects.create(
+            dining_list=self.dining_list, user=self.user, created_by=self.user
+        )
+        url = f"/api/v1/dining-lists/{self.dining_list.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.user.allergen_egg = True
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["allergens"]["egg"], 1)
+
+    def test_dining_list_allergens(self):
+        DiningEntry.objects.create(
+            dining_list=self.dining_list, user=self.user, created_by=self.user
+        )
+        response = self.client.get(f"/api/v1/dining-lists/{self.dining_list.pk}/")
+        self.assertEqual(response.json()["allergens"]["gluten"], 1)
+        self.assertEqual(response.json()["allergens"]["egg"], 0)
+
+    def test_dining_list_modified_after_comment(self):
+        url = f"/api/v1/dining-lists/{self.dining_list.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        DiningComment.objects.create(
+            dining_list=self.dining_list, poster=self.user, message="Hi"
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/v1/days/2089/1/1/").status_code, 403)
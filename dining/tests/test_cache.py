@@ -0,0 +1,25 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from dining.cache import bump_day_version, get_day_versions
+
+
+class DayVersionTestCase(TestCase):
+    def test_shared_between_processes(self):
+        """A change handled by one worker process invalidates the other workers."""
+        # Each worker process has its own instance of the configured cache
+        first = caches.create_connection("default")
+        second = caches.create_connection("default")
+        d = date(2089, 1, 1)
+        with patch("dining.cache.cache", second):
+            old = get_day_versions([d])
+        with patch("dining.cache.cache", first), patch(
+            "dining.cache._new_token", return_value="4000000000.000000"
+        ):
+            bump_day_version(d)
+        with patch("dining.cache.cache", second):
+            self.assertNotEqual(get_day_versions([d]), old)
+            self.assertEqual(get_day_versions([d]), ["4000000000.000000"])
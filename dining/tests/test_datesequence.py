@@ -1,7 +1,22 @@
 from datetime import date
 from unittest import TestCase
+from unittest.mock import patch
 
-from dining.datesequence import BaseSequencedDate, WeekdaySequencedDate
+from django.core.cache import cache, caches
+from django.test import TestCase as DjangoTestCase
+from django.urls import reverse
+
+from dining.datesequence import (
+    BaseSequencedDate,
+    ClosureCalendar,
+    ClosureCalendarSequencedDate,
+    WeekdaySequencedDate,
+    get_closure_calendar,
+    invalidate_closures,
+    reset_closure_check,
+)
+from dining.models import ClosurePeriod
+from userdetails.models import User
 
 
 class DummySequencedDate(BaseSequencedDate):
@@ -29,6 +44,15 @@ class BaseSequencedDateTestCase(TestCase):
         actual = ori.previous()
         self.assertEqual(expect, actual)
 
+    def test_range(self):
+        actual = list(
+            DummySequencedDate.range(
+                DummySequencedDate.fromordinal(3), DummySequencedDate.fromordinal(8)
+            )
+        )
+        expect = [DummySequencedDate.fromordinal(n) for n in (4, 6, 8)]
+        self.assertEqual(expect, actual)
+
 
 class WeekdaySequencedDateTestCase(TestCase):
     def test_upcoming_weekend(self):
@@ -60,3 +84,143 @@ class WeekdaySequencedDateTestCase(TestCase):
         actual = WeekdaySequencedDate.upcoming(date(2019, 4, 29), reverse=True)
         expect = WeekdaySequencedDate(2019, 4, 29)
         self.assertEqual(expect, actual)
+
+    def test_range_skips_weekend(self):
+        # Friday till Tuesday
+        actual = list(WeekdaySequencedDate.range(date(2019, 4, 26), date(2019, 4, 30)))
+        expect = [date(2019, 4, 26), date(2019, 4, 29), date(2019, 4, 30)]
+        self.assertEqual(expect, actual)
+
+
+def ordinals(*dates):
+    return [d.toordinal() for d in dates]
+
+
+class ClosureCalendarTestCase(TestCase):
+    def setUp(self):
+        self.calendar = ClosureCalendar(
+            [
+                ClosurePeriod(
+                    start=date(2024, 7, 15), end=date(2024, 7, 31), hidden=True
+                ),
+                # Adjacent to the previous period
+                ClosurePeriod(
+                    start=date(2024, 8, 1), end=date(2024, 8, 5), hidden=True
+                ),
+                ClosurePeriod(
+                    start=date(2024, 12, 25),
+                    end=date(2024, 12, 26),
+                    reason="Christmas",
+                ),
+            ]
+        )
+
+    def test_merges_adjacent_periods(self):
+        self.assertEqual(self.calendar.hidden_starts, ordinals(date(2024, 7, 15)))
+        self.assertEqual(self.calendar.hidden_ends, ordinals(date(2024, 8, 5)))
+
+    def test_skip_hidden(self):
+        d = date(2024, 7, 31).toordinal()
+        self.assertEqual(self.calendar.skip_hidden(d), date(2024, 8, 6).toordinal())
+        self.assertEqual(
+            self.calendar.skip_hidden(d, reverse=True), date(2024, 7, 14).toordinal()
+        )
+        d = date(2024, 7, 14).toordinal()
+        self.assertEqual(self.calendar.skip_hidden(d), d)
+
+    def test_closure_reason(self):
+        self.assertEqual(
+            self.calendar.closure_reason(date(2024, 12, 26).toordinal()), "Christmas"
+        )
+        self.assertIsNone(self.calendar.closure_reason(date(2024, 12, 27).toordinal()))
+
+    def test_visible(self):
+        actual = list(
+            self.calendar.visible(
+                date(2024, 7, 13).toordinal(), date(2024, 8, 7).toordinal()
+            )
+        )
+        expect = ordinals(
+            date(2024, 7, 13), date(2024, 7, 14), date(2024, 8, 6), date(2024, 8, 7)
+        )
+        self.assertEqual(expect, actual)
+
+
+class ClosureCalendarSequencedDateTestCase(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_closures()
+        ClosurePeriod.objects.create(
+            start=date(2024, 7, 15),
+            end=date(2024, 8, 5),
+            reason="Summer break",
+            hidden=True,
+        )
+        ClosurePeriod.objects.create(
+            start=date(2024, 12, 25), end=date(2024, 12, 26), reason="Christmas"
+        )
+        invalidate_closures()
+
+    def tearDown(self):
+        # The periods are rolled back, the compiled calendar is not
+        invalidate_closures()
+
+    def test_next_previous(self):
+        d = ClosureCalendarSequencedDate(2024, 7, 14)
+        self.assertEqual(d.next(), date(2024, 8, 6))
+        self.assertEqual(d.next().previous(), d)
+
+    def test_in_sequence(self):
+        self.assertFalse(ClosureCalendarSequencedDate.in_sequence(date(2024, 8, 1)))
+        self.assertTrue(ClosureCalendarSequencedDate.in_sequence(date(2024, 12, 25)))
+
+    def test_allow_dining_list_creation(self):
+        # Wednesday, but Christmas
+        d = ClosureCalendarSequencedDate(2024, 12, 25)
+        self.assertFalse(d.allow_dining_list_creation())
+        self.assertIn("Christmas", d.help_text())
+        self.assertTrue(
+            ClosureCalendarSequencedDate(2024, 12, 27).allow_dining_list_creation()
+        )
+
+    def test_invalidated_on_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ClosurePeriod.objects.create(
+                start=date(2024, 9, 2), end=date(2024, 9, 2), reason="Gone", hidden=True
+            )
+        self.assertFalse(ClosureCalendarSequencedDate.in_sequence(date(2024, 9, 2)))
+
+    def test_stale_calendar_in_other_process(self):
+        """A change handled by one worker process reloads the calendar of the others."""
+        # Each worker process has its own cache instance and compiled calendar
+        first = caches.create_connection("default")
+        second = caches.create_connection("default")
+        with patch("dining.datesequence.cache", second):
+            reset_closure_check()
+            stale = get_closure_calendar()
+        with patch("dining.datesequence.cache", first):
+            with self.captureOnCommitCallbacks(execute=True):
+                ClosurePeriod.objects.create(
+                    start=date(2024, 9, 2),
+                    end=date(2024, 9, 2),
+                    reason="Gone",
+                    hidden=True,
+                )
+        with patch("dining.datesequence.cache", second), patch(
+            "dining.datesequence._calendar", stale
+        ):
+            # The next request of the second process
+            reset_closure_check()
+            self.assertFalse(ClosureCalendarSequencedDate.in_sequence(date(2024, 9, 2)))
+
+    def test_views(self):
+        user = User.objects.create_user("ankie")
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse("day_view", kwargs={"year": 2024, "month": 8, "day": 1})
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("new_slot", kwargs={"year": 2024, "month": 12, "day": 25})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from dining import events
+from dining.models import DiningComment, DiningEntry, DiningList
+from userdetails.models import Association, User
+
+
+class EventsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_read(self):
+        events.publish("test", "a", {"x": 1})
+        events.publish("test", "b", {"x": 2})
+        self.assertEqual(
+            events.read("test", 0), [(1, "a", {"x": 1}), (2, "b", {"x": 2})]
+        )
+        self.assertEqual(events.read("test", 1), [(2, "b", {"x": 2})])
+        self.assertEqual(events.read("test", 2), [])
+
+    def test_read_expired(self):
+        events.publish("test", "a", {})
+        events.publish("test", "b", {})
+        cache.delete("dining:events:test:1")
+        self.assertEqual(events.read("test", 0), [(2, "reload", {})])
+
+    def test_read_lost_counter(self):
+        """A client that is ahead of the counter is told to reload."""
+        events.publish("test", "a", {})
+        self.assertEqual(events.read("test", 5), [(1, "reload", {})])
+
+    def test_stream_body(self):
+        events.publish("test", "a", {"x": 1})
+        self.assertEqual(
+            events.stream_body("test", 0),
+            'retry: 10000\n\nid: 1\nevent: a\ndata: {"x": 1}\n\n',
+        )
+
+    def test_stream_body_new_client(self):
+        """A new client only gets the last ID, to continue from there."""
+        events.publish("test", "a", {"x": 1})
+        self.assertEqual(events.stream_body("test"), "retry: 10000\n\nid: 1\n\n")
+
+
+class EventReceiversTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.channel = events.dining_list_channel(self.dining_list.pk)
+
+    def test_entry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DiningEntry.objects.create(
+                dining_list=self.dining_list, user=self.user, created_by=self.user
+            )
+        expect = [(1, "diners", {"dining_list": self.dining_list.pk, "diner_count": 1})]
+        self.assertEqual(events.read(self.channel, 0), expect)
+        self.assertEqual(events.read(events.day_channel(date(2089, 1, 1)), 0), expect)
+
+    def test_comment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = DiningComment.objects.create(
+                dining_list=self.dining_list, poster=self.user, message="Hi"
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.mark_deleted()
+        (_, _, created), (_, _, deleted) = events.read(self.channel, 0)
+        self.assertTrue(created["created"])
+        self.assertFalse(deleted["created"])
+        self.assertTrue(deleted["deleted"])
+
+    def test_rollback(self):
+        """Nothing is published when the transaction is rolled back."""
+        with self.captureOnCommitCallbacks(execute=False):
+            self.dining_list.save()
+        self.assertEqual(events.get_last_id(self.channel), 0)
+
+    def test_view(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dining_list.save()
+        self.client.force_login(self.user)
+        url = f"/api/v1/dining-lists/{self.dining_list.pk}/events/"
+        response = self.client.get(url, HTTP_LAST_EVENT_ID="0")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertIn("no-cache", response["Cache-Control"])
+        body = response.content.decode()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertIn("id: 1\nevent: info\n", body)
+        # The stream continues after the last event
+        response = self.client.get(url, HTTP_LAST_EVENT_ID="1")
+        self.assertNotIn("event:", response.content.decode())
+
+    def test_view_day(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/v1/days/2089/1/1/events/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_not_found(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/api/v1/dining-lists/0/events/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_view_login_required(self):
+        response = self.client.get(
+            f"/api/v1/dining-lists/{self.dining_list.pk}/events/"
+        )
+        self.assertEqual(response.status_code, 403)
@@ -1,10 +1,14 @@
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal
+from io import StringIO
 
 from dal_select2.widgets import ModelSelect2, ModelSelect2Multiple
 from django.conf import settings
-from django.core.exceptions import NON_FIELD_ERRORS
-from django.forms import ModelForm
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.exceptions import NON_FIELD_ERRORS, PermissionDenied
+from django.core.management import call_command
+from django.forms import ModelForm, ValidationError
 from django.http import HttpRequest
 from django.test import TestCase
 from django.utils.timezone import make_aware, now
@@ -19,9 +23,12 @@ from dining.forms import (
     DiningListDeleteForm,
     DiningPaymentForm,
     SendReminderForm,
+    cancel_dining_lists,
+    join_dining_lists,
 )
-from dining.models import DiningEntry, DiningList
+from dining.models import DeletedList, DiningComment, DiningEntry, DiningList
 from general.forms import ConcurrenflictFormMixin
+from general.models import QueuedMail
 from userdetails.models import Association, User, UserMembership
 from utils.testing import FormValidityMixin, TestPatchMixin, patch
 from utils.testing.patch_utils import patch_time
@@ -571,6 +578,31 @@ class TestDiningListDeleteForm(FormValidityMixin, TestCase):
             old_cancelled_transaction_count + diner_count,
         )
 
+    @patch_time()
+    def test_query_count(self):
+        """The number of queries does not depend on the number of diners."""
+        self.assertGreater(self.dining_list.dining_entries.count(), 1)
+        form = self.assertFormValid({})
+        # Most queries are the cascade deletes of the rows related to the
+        # dining list, e.g. its search document and snapshot, one per table,
+        # plus one for the ownership check.
+        with self.assertNumQueries(19):
+            form.execute(self.user)
+
+    @patch_time()
+    def test_notify_on_commit(self):
+        """Mails are only sent after the transaction is committed."""
+        form = self.assertFormValid({})
+        request = HttpRequest()
+        request.user = self.user
+        with self.captureOnCommitCallbacks() as callbacks:
+            form.execute_and_notify(request, "/")
+        self.assertEqual(len(mail.outbox), 0)
+        for callback in callbacks:
+            callback()
+        # All internal diners except the deleting user
+        self.assertEqual(len(mail.outbox), 2)
+
     def test_form_editing_time_limit(self):
         """Asserts that the form can not be used after the timelimit."""
         # The form will be locked by default because the dining list instance has a date in the past.
@@ -578,6 +610,137 @@ class TestDiningListDeleteForm(FormValidityMixin, TestCase):
         self.assertTrue(form.has_error(NON_FIELD_ERRORS, code="locked"))
 
 
+class CancelDiningListsTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", "admin@example.com")
+        self.admin.user_permissions.add(
+            Permission.objects.get(codename="delete_dininglist")
+        )
+        self.user = User.objects.create_user("noortje", "noortje@example.com")
+        kitchen = Account.objects.get(special="kitchen_cost")
+        self.dining_lists = []
+        for slug in ("q", "r"):
+            association = Association.objects.create(name=slug, slug=slug)
+            dining_list = DiningList.objects.create(
+                date=date(2089, 1, 1),
+                association=association,
+                sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+            )
+            tx = Transaction.objects.create(
+                source=self.user.account,
+                target=kitchen,
+                amount=Decimal("0.50"),
+                created_by=self.user,
+            )
+            DiningEntry.objects.create(
+                dining_list=dining_list,
+                user=self.user,
+                created_by=self.user,
+                transaction=tx,
+            )
+            self.dining_lists.append(dining_list)
+
+    def test_cancel(self):
+        cancel_dining_lists(self.dining_lists, self.admin, "Kitchen closed")
+        self.assertFalse(DiningList.objects.exists())
+        self.assertEqual(DeletedList.objects.count(), 2)
+        self.user.account.refresh_from_db()
+        self.assertEqual(self.user.account.get_balance(), Decimal("0.00"))
+        # The mail is queued instead of sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        call_command("send_queued_mail", stdout=StringIO())
+        self.assertFalse(QueuedMail.objects.exists())
+        # One mail for both dining lists
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["noortje@example.com"])
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
+        self.assertIn("Kitchen closed", mail.outbox[0].body)
+
+    def test_no_permission(self):
+        """Owning only some of the dining lists is not enough."""
+        self.dining_lists[0].owners.add(self.user)
+        with self.assertRaises(PermissionDenied):
+            cancel_dining_lists(self.dining_lists, self.user, "")
+        self.assertEqual(DiningList.objects.count(), 2)
+        self.assertFalse(QueuedMail.objects.exists())
+
+    def test_owner(self):
+        for dining_list in self.dining_lists:
+            dining_list.owners.add(self.user)
+        cancel_dining_lists(self.dining_lists, self.user, "")
+        self.assertFalse(DiningList.objects.exists())
+
+    def test_locked(self):
+        self.dining_lists[1].date = date(2000, 1, 1)
+        with self.assertRaises(ValidationError):
+            cancel_dining_lists(self.dining_lists, self.admin, "")
+        self.assertEqual(DiningList.objects.count(), 2)
+
+
+class JoinDiningListsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("noortje", "noortje@example.com")
+        self.other = User.objects.create_user("other", "other@example.com")
+        self.dining_lists = [
+            DiningList.objects.create(
+                date=date(2089, 1, day),
+                association=Association.objects.create(name=str(day), slug=str(day)),
+                sign_up_deadline=make_aware(datetime(2089, 1, day, 15, 0)),
+                max_diners=1,
+            )
+            for day in (1, 2, 3)
+        ]
+        # Make the last one full
+        DiningEntry.objects.create(
+            dining_list=self.dining_lists[2], user=self.other, created_by=self.other
+        )
+
+    def test_join(self):
+        # Cached for the process
+        Account.objects.get_special("kitchen_cost")
+        with self.assertNumQueries(9):
+            errors = join_dining_lists(self.dining_lists, self.user)
+        first, second, full = self.dining_lists
+        self.assertEqual(
+            errors, {first.pk: None, second.pk: None, full.pk: "Dining list is full"}
+        )
+        self.assertEqual(DiningEntry.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.user.account.get_balance(), Decimal("-1.00"))
+        entry = DiningEntry.objects.get(user=self.user, dining_list=first)
+        self.assertEqual(entry.transaction.amount, first.kitchen_cost)
+
+    def test_balance_near_minimum(self):
+        # The minimum balance is -1.50 and the kitchen cost 0.50
+        Transaction.objects.create(
+            source=self.user.account,
+            target=Account.objects.get_special("kitchen_cost"),
+            amount=Decimal("0.75"),
+            created_by=self.user,
+        )
+        dining_lists = [
+            DiningList.objects.create(
+                date=date(2089, 2, day),
+                association=self.dining_lists[0].association,
+                sign_up_deadline=make_aware(datetime(2089, 2, day, 15, 0)),
+            )
+            for day in (1, 2, 3)
+        ]
+        errors = join_dining_lists(dining_lists, self.user)
+        first, second, third = dining_lists
+        self.assertEqual(
+            errors,
+            {first.pk: None, second.pk: None, third.pk: "Your balance is too low"},
+        )
+        self.assertEqual(self.user.account.get_balance(), Decimal("-1.75"))
+
+    def test_already_joined(self):
+        join_dining_lists(self.dining_lists[:1], self.user)
+        errors = join_dining_lists(self.dining_lists[:1], self.user)
+        self.assertEqual(
+            errors, {self.dining_lists[0].pk: "You are already on the dining list"}
+        )
+
+
 class TestDiningInfoForm(FormValidityMixin, TestCase):
     fixtures = ["base", "dining_lists"]
     form_class = DiningInfoForm
@@ -635,6 +798,30 @@ class TestDiningInfoForm(FormValidityMixin, TestCase):
             self.dining_list.sign_up_deadline,
         )
 
+    @patch_time()
+    def test_concurrent_comment(self):
+        """A comment created while the form is open is still counted after saving."""
+        form = self.build_form(
+            {
+                "owners": [1],
+                "dish": "New dish",
+                "serve_time": time(18, 0),
+                "max_diners": 15,
+                "sign_up_deadline": datetime(2022, 4, 26, 15, 0),
+            }
+        )
+        comment = DiningComment.objects.create(
+            dining_list=self.dining_list, poster=self.user, message="Hi"
+        )
+        self.assertTrue(form.is_valid())
+        form.save()
+
+        self.dining_list.refresh_from_db()
+        self.assertEqual(self.dining_list.dish, "New dish")
+        self.assertEqual(self.dining_list.comment_count, 1)
+        self.assertEqual(self.dining_list.visible_comment_count, 1)
+        self.assertEqual(self.dining_list.last_comment_at, comment.timestamp)
+
     def test_kitchen_open_time_validity(self):
         """Asserts that the meal can't be served before the kitchen opening time."""
         dt = datetime.combine(
@@ -680,6 +867,11 @@ class TestDiningPaymentForm(FormValidityMixin, TestCase):
         )
         self.assertFormValid({})
 
+    def test_auto_pay_requires_dining_cost(self):
+        self.assertFormHasError(
+            {"auto_pay": True}, code="required", field="dining_cost"
+        )
+
 
 class TestSendReminderForm(FormValidityMixin, TestPatchMixin, TestCase):
     fixtures = ["base", "dining_lists"]
@@ -81,6 +81,16 @@ class SendReminderFormTestCase(TestCase):
             self.form.get_guest_recipients(), {self.user: ["Guest 1", "Guest 2"]}
         )
 
+    def test_recipients_single_query(self):
+        for i in range(3):
+            user = User.objects.create(username=f"{i}", email=f"{i}@localhost")
+            self.create_dining_entry(user, has_paid=False)
+            self.create_dining_entry(user, has_paid=False, guest_name="Guest")
+        with self.assertNumQueries(1):
+            users, guests = self.form.get_recipients()
+        self.assertEqual(len(users), 3)
+        self.assertEqual(len(guests), 3)
+
     def test_arbitrary(self):
         """Tests with an arbitrary dining list with all cases.
 
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+from django.core import signing
+from django.test import TestCase
+from django.utils.timezone import localdate, make_aware
+
+from dining.ical import get_feed_token
+from dining.models import DiningEntry, DiningList
+from userdetails.models import Association, User
+
+
+class FeedViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje", "noortje@example.com")
+        cls.other = User.objects.create_user("other", "other@example.com")
+        association = Association.objects.create(name="Quadrivium", slug="q")
+        knights = Association.objects.create(name="Knights", slug="k")
+        cls.date = localdate() + timedelta(days=2)
+        deadline = make_aware(datetime(cls.date.year, cls.date.month, cls.date.day))
+
+        cls.joined = DiningList.objects.create(
+            date=cls.date,
+            association=association,
+            sign_up_deadline=deadline,
+            dish="Pasta, with pesto",
+        )
+        DiningEntry.objects.create(
+            dining_list=cls.joined, user=cls.user, created_by=cls.user
+        )
+        cls.owned = DiningList.objects.create(
+            date=cls.date, association=knights, sign_up_deadline=deadline
+        )
+        cls.owned.owners.add(cls.user)
+        cls.url = f"/calendar/{get_feed_token(cls.user)}.ics"
+
+    def test_feed(self):
+        # Checking the token and loading the dining lists
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        content = response.content.decode()
+        self.assertEqual(content.count("BEGIN:VEVENT"), 2)
+        self.assertIn("SUMMARY:Dining Quadrivium: Pasta\\, with pesto\r\n", content)
+        self.assertIn(f"UID:dining-list-{self.owned.pk}@testserver", content)
+
+    def test_guest_entries_not_included(self):
+        DiningEntry.objects.create(
+            dining_list=self.owned,
+            user=self.other,
+            created_by=self.other,
+            external_name="Guest",
+        )
+        url = f"/calendar/{get_feed_token(self.other)}.ics"
+        self.assertNotIn("BEGIN:VEVENT", self.client.get(url).content.decode())
+
+    def test_invalid_token(self):
+        response = self.client.get(f"/calendar/{self.user.pk}:invalid.ics")
+        self.assertEqual(response.status_code, 404)
+
+    def test_revoked_token(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(self.user)
+        self.client.post("/accounts/settings/calendar/reset/")
+        self.client.logout()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 404)
+        self.user.refresh_from_db()
+        response = self.client.get(f"/calendar/{get_feed_token(self.user)}.ics")
+        self.assertEqual(response.status_code, 200)
+
+    def test_inactive_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_token_without_version(self):
+        token = signing.Signer(salt="dining.ical").sign(str(self.user.pk))
+        response = self.client.get(f"/calendar/{token}.ics")
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        # Only the token is checked
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_entry_change(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            DiningEntry.objects.filter(dining_list=self.joined).delete()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().count("BEGIN:VEVENT"), 1)
+
+    def test_not_modified_after_other_change(self):
+        """Changes outside the user's feed keep the feed unchanged."""
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            other_list = DiningList.objects.create(
+                date=self.date,
+                association=Association.objects.create(name="Other", slug="o"),
+                sign_up_deadline=self.joined.sign_up_deadline,
+            )
+            DiningEntry.objects.create(
+                dining_list=other_list, user=self.other, created_by=self.other
+            )
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified_after_list_change(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.owned.dish = "Soup"
+        self.owned.save()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Soup", response.content.decode())
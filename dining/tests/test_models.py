@@ -1,12 +1,20 @@
 from datetime import date, datetime
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.timezone import make_aware
 
-from dining.models import DiningEntry, DiningList
+from dining.models import (
+    DiningComment,
+    DiningCommentVisitTracker,
+    DiningEntry,
+    DiningList,
+)
 from userdetails.models import Association, User
 
 
@@ -66,6 +74,53 @@ class DiningListTestCase(TestCase):
     #     self.assertTrue(self.dining_list.is_owner(self.user))
 
 
+class DiningListAllergenSummaryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+        )
+        users = [
+            User.objects.create_user(
+                "ankie", "ankie@example.com", allergen_gluten=True, other_allergy="Kiwi"
+            ),
+            User.objects.create_user(
+                "bart",
+                "bart@example.com",
+                allergen_gluten=True,
+                allergen_egg=True,
+                other_allergy="Kiwi",
+            ),
+            User.objects.create_user(
+                "cor", "cor@example.com", food_preferences="Vegan"
+            ),
+        ]
+        for u in users:
+            DiningEntry.objects.create(
+                dining_list=cls.dining_list, user=u, created_by=u
+            )
+        # External entries are not included
+        DiningEntry.objects.create(
+            dining_list=cls.dining_list,
+            user=users[0],
+            created_by=users[0],
+            external_name="Guest",
+        )
+
+    def test_summary(self):
+        with self.assertNumQueries(2):
+            summary = self.dining_list.allergen_summary()
+        counts = {a.model_field: count for a, count in summary["allergens"]}
+        self.assertEqual(counts["allergen_gluten"], 2)
+        self.assertEqual(counts["allergen_egg"], 1)
+        self.assertEqual(counts["allergen_fish"], 0)
+        self.assertEqual(summary["other_allergies"], ["Kiwi"])
+        self.assertEqual(summary["food_preferences"], ["Vegan"])
+
+
 class DiningListCleanTestCase(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -120,3 +175,177 @@ class DiningEntryTestCase(TestCase):
             created_by=self.user,
         )
         entry.full_clean()  # No ValidationError
+
+
+class DiningCommentCountTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("noortje")
+        self.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=Association.objects.create(name="Quadrivium"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+        )
+
+    def comment(self):
+        return DiningComment.objects.create(
+            dining_list=self.dining_list, poster=self.user, message="Hi"
+        )
+
+    def assert_counts(self, total, visible):
+        dining_list = DiningList.objects.get(pk=self.dining_list.pk)
+        self.assertEqual(dining_list.comment_count, total)
+        self.assertEqual(dining_list.visible_comment_count, visible)
+        return dining_list
+
+    def test_create(self):
+        self.comment()
+        comment = self.comment()
+        dining_list = self.assert_counts(2, 2)
+        self.assertEqual(dining_list.last_comment_at, comment.timestamp)
+        self.assertTrue(dining_list.recently_commented())
+
+    def test_mark_deleted(self):
+        comment = self.comment()
+        comment.mark_deleted()
+        # Deleting twice has no effect
+        comment.mark_deleted()
+        self.assert_counts(1, 0)
+
+    def test_save_stale_dining_list(self):
+        """Saving a dining list does not overwrite the counters."""
+        self.comment()
+        self.dining_list.dish = "Pasta"
+        self.dining_list.save()
+        self.assert_counts(1, 1)
+        self.assertEqual(DiningList.objects.get(pk=self.dining_list.pk).dish, "Pasta")
+
+    def test_save_counters_explicitly(self):
+        self.dining_list.comment_count = 5
+        self.dining_list.save(update_fields=["comment_count"])
+        self.assert_counts(5, 0)
+
+    def test_delete(self):
+        visible = self.comment()
+        deleted = self.comment()
+        deleted.mark_deleted()
+        visible.delete()
+        self.assert_counts(1, 0)
+        deleted.delete()
+        self.assert_counts(0, 0)
+
+    def test_update_comment_counts(self):
+        self.comment().mark_deleted()
+        DiningList.objects.update(comment_count=5, last_comment_at=None)
+        DiningList.objects.update_comment_counts()
+        dining_list = self.assert_counts(1, 0)
+        self.assertIsNotNone(dining_list.last_comment_at)
+
+
+class DiningCommentVisitTrackerTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        # The buffer needs redis, but its logic works with any cache
+        patcher = patch.object(
+            DiningCommentVisitTracker, "is_buffered", return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, update=False):
+        return DiningCommentVisitTracker.get_latest_visit(
+            self.dining_list, self.user, update=update
+        )
+
+    def test_no_visit(self):
+        self.assertIsNone(self.get())
+
+    def test_visit_is_buffered(self):
+        first = self.get(update=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(), first)
+        self.assertFalse(
+            [q for q in queries if "dining_diningcommentvisittracker" in q["sql"]]
+        )
+        self.assertFalse(DiningCommentVisitTracker.objects.exists())
+
+    def test_visit_is_written_without_buffer(self):
+        DiningCommentVisitTracker.is_buffered.return_value = False
+        with patch("dining.models.cache") as mock_cache, self.assertNumQueries(2):
+            first = self.get(update=True)
+        # The cache is not used at all
+        self.assertFalse(mock_cache.method_calls)
+        self.assertEqual(DiningCommentVisitTracker.objects.get().timestamp, first)
+        self.assertEqual(self.get(update=True), first)
+        self.assertEqual(DiningCommentVisitTracker.objects.count(), 1)
+
+    def test_returns_previous_visit(self):
+        first = self.get(update=True)
+        self.assertEqual(self.get(update=True), first)
+        self.assertGreater(self.get(), first)
+
+    def test_flush(self):
+        self.get(update=True)
+        self.get(update=True)
+        latest = self.get()
+        self.assertEqual(DiningCommentVisitTracker.flush_buffer(), 1)
+        self.assertEqual(DiningCommentVisitTracker.objects.get().timestamp, latest)
+        # Updates the existing row
+        self.get(update=True)
+        self.assertEqual(DiningCommentVisitTracker.flush_buffer(), 1)
+        self.assertEqual(DiningCommentVisitTracker.objects.count(), 1)
+        # Nothing left to flush
+        self.assertEqual(DiningCommentVisitTracker.flush_buffer(), 0)
+
+    def test_flush_during_concurrent_visit(self):
+        # A visit that has incremented the counter, but not stored its key yet
+        cache.add("dining:visits:counter", 0, None)
+        n = cache.incr("dining:visits:counter")
+        self.get(update=True)
+        self.assertEqual(DiningCommentVisitTracker.flush_buffer(), 1)
+        other = User.objects.create_user("other", "other@example.com")
+        cache.set(
+            f"dining:visits:pending:{n}",
+            (self.dining_list.pk, other.pk, timezone.now()),
+            None,
+        )
+        DiningCommentVisitTracker.flush_buffer()
+        self.assertTrue(DiningCommentVisitTracker.objects.filter(user=other).exists())
+
+    def test_read_from_database(self):
+        visit = DiningCommentVisitTracker.objects.create(
+            user=self.user, dining_list=self.dining_list
+        )
+        self.assertEqual(self.get(), visit.timestamp)
+
+
+class IsBufferedTestCase(TestCase):
+    def test_only_redis(self):
+        for backend, expected in [
+            ("django.core.cache.backends.redis.RedisCache", True),
+            ("django.core.cache.backends.locmem.LocMemCache", False),
+            ("django.core.cache.backends.db.DatabaseCache", False),
+            ("django.core.cache.backends.filebased.FileBasedCache", False),
+            ("django.core.cache.backends.memcached.PyMemcacheCache", False),
+        ]:
+            caches = {"default": {"BACKEND": backend}}
+            with self.subTest(backend), override_settings(
+                BUFFER_COMMENT_VISITS=True, CACHES=caches
+            ):
+                self.assertIs(DiningCommentVisitTracker.is_buffered(), expected)
+
+    @override_settings(
+        BUFFER_COMMENT_VISITS=False,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}},
+    )
+    def test_disabled(self):
+        self.assertFalse(DiningCommentVisitTracker.is_buffered())
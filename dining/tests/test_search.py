@@ -0,0 +1,110 @@
+from datetime import date, datetime
+
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from dining.models import DiningComment, DiningList
+from dining.search import search
+from userdetails.models import Association, User
+
+
+class SearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "noortje", "noortje@example.com", first_name="Noortje", last_name="Jansen"
+        )
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+
+    def create_dining_list(self, d: date, dish: str) -> DiningList:
+        with self.captureOnCommitCallbacks(execute=True):
+            return DiningList.objects.create(
+                date=d,
+                association=self.association,
+                sign_up_deadline=make_aware(datetime(d.year, d.month, d.day, 15)),
+                dish=dish,
+            )
+
+    def test_dish_and_date(self):
+        lasagna = self.create_dining_list(date(2089, 3, 14), "Lasagna")
+        self.create_dining_list(date(2089, 4, 14), "Lasagna")
+        self.create_dining_list(date(2089, 3, 15), "Curry")
+        self.assertEqual(search("lasagna march")[0], [lasagna])
+        # Prefix
+        self.assertEqual(search("lasag 2089 03")[0], [lasagna])
+        self.assertEqual(search("quadrivium lasagna")[0][-1].dish, "Lasagna")
+
+    def test_owners_and_comments(self):
+        dining_list = self.create_dining_list(date(2089, 3, 14), "Pasta")
+        with self.captureOnCommitCallbacks(execute=True):
+            dining_list.owners.add(self.user)
+        self.assertEqual(search("noortje jansen")[0], [dining_list])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = DiningComment.objects.create(
+                dining_list=dining_list, poster=self.user, message="Bring a plate!"
+            )
+        self.assertEqual(search("plate")[0], [dining_list])
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.mark_deleted()
+        self.assertEqual(search("plate")[0], [])
+
+    def test_hard_deleted_comment(self):
+        dining_list = self.create_dining_list(date(2089, 3, 14), "Pasta")
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = DiningComment.objects.create(
+                dining_list=dining_list, poster=self.user, message="Bring a plate!"
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.delete()
+        self.assertEqual(search("plate")[0], [])
+
+    def test_deleted_dining_list_with_comment(self):
+        dining_list = self.create_dining_list(date(2089, 3, 14), "Pizza")
+        DiningComment.objects.create(
+            dining_list=dining_list, poster=self.user, message="Bring a plate!"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            dining_list.delete()
+        self.assertEqual(search("pizza")[0], [])
+
+    def test_ranking(self):
+        once = self.create_dining_list(date(2089, 3, 14), "Soup")
+        twice = self.create_dining_list(date(2089, 3, 15), "Soup and soup")
+        self.assertEqual(search("soup")[0], [twice, once])
+
+    def test_keyset_pagination(self):
+        dining_lists = {
+            self.create_dining_list(date(2089, 3, day), "Pizza") for day in range(1, 8)
+        }
+        results, cursor = search("pizza", limit=3)
+        pages = [results]
+        while cursor:
+            results, cursor = search("pizza", cursor, limit=3)
+            pages.append(results)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual({dl for page in pages for dl in page}, dining_lists)
+
+    def test_deleted_dining_list(self):
+        dining_list = self.create_dining_list(date(2089, 3, 14), "Pizza")
+        dining_list.delete()
+        self.assertEqual(search("pizza")[0], [])
+
+    def test_special_characters(self):
+        self.create_dining_list(date(2089, 3, 14), "Pizza")
+        self.assertEqual(search('"pizza* OR (NEAR')[0], [])
+        self.assertEqual(search("!!!"), ([], None))
+
+
+class SearchViewTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("noortje"))
+
+    def test_search(self):
+        response = self.client.get("/search/?q=lasagna")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "No dining lists found")
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/search/?q=lasagna&after=x")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,67 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from creditmanagement.models import Transaction
+from dining.models import DiningEntry, DiningList
+from dining.settlement import settle_dining_costs
+from userdetails.models import Association, User
+
+
+class SettleDiningCostsTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com")
+        self.user = User.objects.create_user("noortje", "noortje@example.com")
+        self.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 1),
+            association=Association.objects.create(name="Quadrivium"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 1, 15, 0)),
+            dining_cost=Decimal("3.00"),
+            auto_pay=True,
+        )
+        self.dining_list.owners.add(self.owner)
+        for external_name in ("", "Guest"):
+            DiningEntry.objects.create(
+                dining_list=self.dining_list,
+                user=self.user,
+                created_by=self.user,
+                external_name=external_name,
+            )
+        DiningEntry.objects.create(
+            dining_list=self.dining_list, user=self.owner, created_by=self.owner
+        )
+
+    def test_settle(self):
+        self.assertEqual(settle_dining_costs(self.dining_list), 3)
+        # The guest is charged to the user who added them
+        self.assertEqual(self.user.account.get_balance(), Decimal("-6.00"))
+        self.assertEqual(self.owner.account.get_balance(), Decimal("6.00"))
+        self.assertFalse(self.dining_list.dining_entries.filter(has_paid=False))
+
+    def test_idempotent(self):
+        settle_dining_costs(self.dining_list)
+        self.assertEqual(settle_dining_costs(self.dining_list), 0)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_not_auto_pay(self):
+        self.dining_list.auto_pay = False
+        self.dining_list.save()
+        self.assertEqual(settle_dining_costs(self.dining_list), 0)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_changed_after_load(self):
+        DiningList.objects.filter(pk=self.dining_list.pk).update(
+            dining_cost=Decimal("4.00")
+        )
+        # The dining list instance still has the old dining cost
+        settle_dining_costs(self.dining_list)
+        self.assertEqual(self.user.account.get_balance(), Decimal("-8.00"))
+
+    def test_marked_unpaid_after_settling(self):
+        settle_dining_costs(self.dining_list)
+        self.dining_list.dining_entries.update(has_paid=False)
+        self.assertEqual(settle_dining_costs(self.dining_list), 0)
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertFalse(self.dining_list.dining_entries.filter(settled_at=None))
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta
+
+from django.test import TestCase
+from django.utils.timezone import make_aware
+
+from dining.models import DiningEntry, DiningList, DiningListSnapshot
+from dining.snapshots import finalize_dining_lists
+from userdetails.models import Association, User
+
+
+class FinalizeDiningListsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "noortje", first_name="Noortje", allergen_gluten=True
+        )
+        association = Association.objects.create(name="Quadrivium", slug="q")
+        self.old = DiningList.objects.create(
+            date=date(2020, 1, 1),
+            association=association,
+            sign_up_deadline=make_aware(datetime(2020, 1, 1, 15, 0)),
+        )
+        self.entry = DiningEntry.objects.create(
+            dining_list=self.old, user=self.user, created_by=self.user, has_paid=True
+        )
+        DiningEntry.objects.create(
+            dining_list=self.old,
+            user=self.user,
+            created_by=self.user,
+            external_name="Guest",
+        )
+        # Can still be adjusted
+        DiningList.objects.create(
+            date=date(2020, 1, 2),
+            association=association,
+            sign_up_deadline=make_aware(datetime(2020, 1, 2, 15, 0)),
+            adjustable_duration=timedelta(days=365 * 100),
+        )
+
+    def test_finalize(self):
+        self.assertEqual(finalize_dining_lists(), 1)
+        data = DiningListSnapshot.objects.get(dining_list=self.old).data
+        self.assertEqual(data["diner_count"], 2)
+        self.assertEqual(data["paid_count"], 1)
+        self.assertEqual(data["allergens"], {"allergen_gluten": 1})
+        self.assertEqual(data["diners"][0]["name"], "Noortje")
+        self.assertEqual(data["kitchen_cost"], "0.50")
+        self.assertIsNone(data["dining_cost"])
+        self.assertEqual(
+            [(e["name"], e["added_by"], e["has_paid"]) for e in data["entries"]],
+            [("Noortje", "", True), ("Guest", "Noortje", False)],
+        )
+        # Running again has no effect
+        self.assertEqual(finalize_dining_lists(), 0)
+
+    def test_discard_on_change(self):
+        finalize_dining_lists()
+        self.entry.has_cooked = True
+        self.entry.save()
+        self.assertFalse(DiningListSnapshot.objects.exists())
+
+    def test_allergy_view(self):
+        finalize_dining_lists()
+        # Changes after finalization are not visible
+        User.objects.filter(pk=self.user.pk).update(allergen_gluten=False)
+        self.client.force_login(self.user)
+        response = self.client.get("/2020/1/1/q/allergy/")
+        self.assertContains(response, "Noortje")
+
+    def test_diners_view(self):
+        finalize_dining_lists()
+        User.objects.filter(pk=self.user.pk).update(first_name="Changed")
+        self.client.force_login(self.user)
+        with self.assertNumQueries(8):
+            response = self.client.get("/2020/1/1/q/list/")
+        # The page is rendered from the snapshot
+        self.assertContains(response, "added by Noortje")
+        self.assertNotContains(response, "added by Changed")
+
+    def test_diners_view_owner(self):
+        """Owners get the live entries, because they can still edit the stats."""
+        finalize_dining_lists()
+        self.old.owners.add(self.user)
+        User.objects.filter(pk=self.user.pk).update(first_name="Changed")
+        self.client.force_login(self.user)
+        response = self.client.get("/2020/1/1/q/list/")
+        self.assertContains(response, "added by Changed")
@@ -0,0 +1,520 @@
+import re
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from creditmanagement.models import Account
+from dining.datesequence import get_closure_calendar, reset_closure_check
+from dining.models import (
+    DiningComment,
+    DiningCommentVisitTracker,
+    DiningEntry,
+    DiningList,
+)
+from userdetails.models import Association, User, UserMembership
+
+
+class EntryAddViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+            limit_signups_to_association_only=True,
+        )
+        UserMembership.objects.create(
+            related_user=cls.user, association=cls.association, is_verified=True
+        )
+
+    def test_sign_up_queries(self):
+        self.client.force_login(self.user)
+        # Cached for the process
+        Account.objects.get_special("kitchen_cost")
+        reset_closure_check()
+        get_closure_calendar()
+        # Session and user, dining list, user field, validation data, balance,
+        # foreign key and duplicate entry validation, then the transaction and
+        # entry insert and dining list update in a savepoint.
+        with self.assertNumQueries(13):
+            self.client.post("/2089/1/3/q/entry/add/", {"user": self.user.pk})
+        entry = DiningEntry.objects.get()
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.transaction.amount, self.dining_list.kitchen_cost)
+
+
+class JoinDiningListsViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=Association.objects.create(name="Quadrivium", slug="q"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_json(self):
+        response = self.client.post(
+            "/join/",
+            {"dining_list": [self.dining_list.pk, 0]},
+            HTTP_ACCEPT="application/json",
+        )
+        self.assertEqual(
+            response.json(),
+            {"results": [{"id": self.dining_list.pk, "joined": True, "error": None}]},
+        )
+
+    def test_redirect(self):
+        response = self.client.post(
+            "/join/?next=/2089/1/3/week/", {"dining_list": self.dining_list.pk}
+        )
+        self.assertRedirects(response, "/2089/1/3/week/")
+        self.assertTrue(DiningEntry.objects.filter(user=self.user).exists())
+
+    def test_invalid(self):
+        response = self.client.post("/join/", {"dining_list": "x"})
+        self.assertEqual(response.status_code, 400)
+
+
+class FragmentResponseTestCase(TestCase):
+    xhr = {"X-Requested-With": "XMLHttpRequest"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=Association.objects.create(name="Quadrivium", slug="q"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_join_and_leave(self):
+        response = self.client.post(
+            "/2089/1/3/q/entry/add/", {"user": self.user.pk}, headers=self.xhr
+        )
+        self.assertContains(response, "You are on this list")
+        self.assertContains(response, "Sign out")
+        entry = DiningEntry.objects.get()
+
+        response = self.client.post(
+            f"/entries/{entry.pk}/delete/?next=/2089/1/3/q/", headers=self.xhr
+        )
+        self.assertContains(response, "You are not on the dining list")
+        self.assertFalse(DiningEntry.objects.exists())
+
+    def test_join_error(self):
+        self.dining_list.sign_up_deadline = make_aware(datetime(2000, 1, 1))
+        self.dining_list.save()
+        response = self.client.post(
+            "/2089/1/3/q/entry/add/", {"user": self.user.pk}, headers=self.xhr
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, "alert-danger", status_code=400)
+
+    def test_redirect_without_header(self):
+        response = self.client.post("/2089/1/3/q/entry/add/", {"user": self.user.pk})
+        self.assertRedirects(response, "/2089/1/3/q/")
+
+    def test_comment(self):
+        response = self.client.post(
+            "/2089/1/3/q/", {"message": "Hello there"}, headers=self.xhr
+        )
+        comment = DiningComment.objects.get()
+        self.assertContains(response, f'data-comment="{comment.pk}"')
+        self.assertContains(response, "Hello there")
+        self.assertNotContains(response, "New")
+        # The full page uses the same snippets
+        response = self.client.get("/2089/1/3/q/")
+        self.assertContains(response, f'data-comment="{comment.pk}"')
+        self.assertContains(response, 'id="membership"')
+
+        response = self.client.post(
+            "/2089/1/3/q/",
+            {"comment_action": "delete", "pk": comment.pk},
+            headers=self.xhr,
+        )
+        self.assertContains(response, "Comment deleted")
+
+    def test_invalid_comment(self):
+        response = self.client.post("/2089/1/3/q/", {"message": ""}, headers=self.xhr)
+        self.assertEqual(response.status_code, 400)
+
+
+class DayViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+
+    def setUp(self):
+        self.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=self.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        self.client.force_login(self.user)
+
+    def get_content(self) -> str:
+        response = self.client.get("/2089/1/3/")
+        self.assertEqual(response.status_code, 200)
+        # Collapse whitespace
+        return re.sub(r"\s+", " ", response.content.decode())
+
+    def test_card_updated_after_entry(self):
+        self.assertIn(">0</span> diners", self.get_content())
+        DiningEntry.objects.create(
+            dining_list=self.dining_list, user=self.user, created_by=self.user
+        )
+        content = self.get_content()
+        self.assertIn(">1</span> diner<", content)
+        self.assertIn("You are signed up", content)
+
+    def test_card_updated_after_comment(self):
+        self.assertIn("0 comments", self.get_content())
+        DiningComment.objects.create(
+            dining_list=self.dining_list, poster=self.user, message="Hi"
+        )
+        content = self.get_content()
+        self.assertIn("1 comment ", content)
+        self.assertIn('<span class="text-info">*</span>', content)
+
+
+class SlotAllergyViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "noortje", first_name="Noortje", allergen_egg=True, food_preferences="Vegan"
+        )
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        DiningEntry.objects.create(
+            dining_list=cls.dining_list, user=cls.user, created_by=cls.user
+        )
+
+    def test_allergies(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/2089/1/3/q/allergy/")
+        self.assertEqual(
+            response.context["allergies"][0]["allergens"][0].model_field,
+            "allergen_egg",
+        )
+        self.assertContains(response, "Noortje")
+        self.assertContains(response, "Vegan")
+
+
+class ManifestViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            "noortje",
+            "noortje@example.com",
+            allergen_egg=True,
+            other_allergy="Kiwi",
+        )
+        cls.association = Association.objects.create(name="Quadrivium", slug="q")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=cls.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        DiningEntry.objects.create(
+            dining_list=cls.dining_list, user=cls.user, created_by=cls.user
+        )
+        DiningEntry.objects.create(
+            dining_list=cls.dining_list,
+            user=cls.user,
+            created_by=cls.user,
+            external_name="Guest",
+        )
+
+    def setUp(self):
+        # Cached manifests of other tests might have the same day versions
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_manifest(self):
+        response = self.client.get("/2089/1/3/manifest/")
+        [(day, [row], totals)] = response.context["days"]
+        self.assertEqual(day, date(2089, 1, 3))
+        self.assertEqual(row["diner_count"], 2)
+        self.assertEqual(row["guest_count"], 1)
+        self.assertIn(
+            ("allergen_egg", 1), [(a.model_field, n) for a, n in row["allergens"]]
+        )
+        self.assertEqual(row["other_allergies"], ["Kiwi"])
+        self.assertEqual(totals["diner_count"], 2)
+
+    def test_cached_until_entry_changes(self):
+        self.client.get("/2089/1/5/manifest/week/")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/2089/1/5/manifest/week/")
+        self.assertFalse([q for q in queries if "dining_diningentry" in q["sql"]])
+        with self.captureOnCommitCallbacks(execute=True):
+            DiningEntry.objects.filter(external_name="Guest").delete()
+        response = self.client.get("/2089/1/5/manifest/week/")
+        self.assertEqual(response.context["days"][0][2]["diner_count"], 1)
+
+    def test_allergy_change_invalidates(self):
+        self.client.get("/2089/1/3/manifest/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.other_allergy = "Mango"
+            self.user.save()
+        response = self.client.get("/2089/1/3/manifest/")
+        self.assertEqual(
+            response.context["days"][0][1][0]["other_allergies"], ["Mango"]
+        )
+
+    def test_csv(self):
+        response = self.client.get("/2089/1/3/manifest/?format=csv")
+        lines = response.content.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("2089-01-03,Quadrivium,"))
+        self.assertTrue(lines[1].endswith(",Kiwi,"))
+
+
+class CommentThreadTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=Association.objects.create(name="Quadrivium", slug="q"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        # Some comments have the same timestamp
+        timestamp = make_aware(datetime(2089, 1, 1, 12, 0))
+        cls.comments = [
+            DiningComment.objects.create(
+                dining_list=cls.dining_list,
+                poster=cls.user,
+                message=f"Comment {i}",
+                timestamp=timestamp + timedelta(minutes=i // 2),
+            )
+            for i in range(25)
+        ]
+        cls.pinned = cls.comments[0]
+        cls.pinned.pinned_to_top = True
+        cls.pinned.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_latest_page(self):
+        response = self.client.get("/2089/1/3/q/")
+        self.assertEqual(list(response.context["pinned_comments"]), [self.pinned])
+        self.assertEqual(response.context["comments"], self.comments[5:])
+        self.assertEqual(
+            response.context["older_cursor"], self.comments[5].get_cursor()
+        )
+
+    def test_older_page(self):
+        cursor = self.comments[5].get_cursor()
+        response = self.client.get(f"/2089/1/3/q/comments/?before={cursor}")
+        self.assertEqual(response.context["comments"], self.comments[1:5])
+        self.assertIsNone(response.context["older_cursor"])
+        # Also without JavaScript
+        response = self.client.get(f"/2089/1/3/q/?before={cursor}")
+        self.assertEqual(response.context["comments"], self.comments[1:5])
+
+    def test_new_comments(self):
+        cursor = self.comments[20].get_cursor()
+        response = self.client.get(f"/2089/1/3/q/comments/?after={cursor}")
+        self.assertEqual(response.context["comments"], self.comments[21:])
+        self.assertContains(response, "Comment 24")
+
+    def test_changed_comments(self):
+        with patch.object(DiningComment, "CHANGE_MARGIN", timedelta(0)):
+            changed = DiningComment.get_change_cursor()
+        self.comments[3].mark_deleted()
+        new = DiningComment.objects.create(
+            dining_list=self.dining_list,
+            poster=self.user,
+            message="New",
+            timestamp=make_aware(datetime(2089, 1, 2, 12, 0)),
+        )
+        cursor = self.comments[24].get_cursor()
+        response = self.client.get(
+            f"/2089/1/3/q/comments/?after={cursor}&changed={changed}"
+        )
+        self.assertEqual(response.context["comments"], [new])
+        # The new comment is not returned twice
+        self.assertEqual(response.context["changed_comments"], [self.comments[3]])
+        self.assertContains(response, "data-changed-comments")
+        self.assertNotEqual(response.context["change_cursor"], changed)
+
+    def test_changed_comments_invalid_cursor(self):
+        cursor = self.comments[24].get_cursor()
+        response = self.client.get(f"/2089/1/3/q/comments/?after={cursor}&changed=x")
+        self.assertEqual(response.status_code, 400)
+
+    def test_visit_only_with_new_comments(self):
+        """Loading new comments in the background only counts as a visit if there are any."""
+        visits = DiningCommentVisitTracker.objects.filter(
+            user=self.user, dining_list=self.dining_list
+        )
+        cursor = self.comments[24].get_cursor()
+        self.client.get(f"/2089/1/3/q/comments/?after={cursor}")
+        self.assertFalse(visits.exists())
+        cursor = self.comments[23].get_cursor()
+        self.client.get(f"/2089/1/3/q/comments/?after={cursor}")
+        self.assertTrue(visits.exists())
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/2089/1/3/q/comments/?after=x")
+        self.assertEqual(response.status_code, 400)
+        # Beyond the maximum datetime
+        response = self.client.get("/2089/1/3/q/comments/?after=253402300800000000-1")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/2089/1/3/q/comments/")
+        self.assertEqual(response.status_code, 400)
+
+
+class SlotStatsViewTestCase(TestCase):
+    url = "/2089/1/3/q/list/stats/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("noortje", "noortje@example.com")
+        cls.dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=Association.objects.create(name="Quadrivium", slug="q"),
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        cls.dining_list.owners.add(cls.user)
+        cls.entries = [
+            DiningEntry.objects.create(
+                dining_list=cls.dining_list,
+                user=cls.user,
+                created_by=cls.user,
+                external_name=name,
+            )
+            for name in ("", "Guest")
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, changes):
+        return self.client.post(
+            self.url, {"changes": changes}, content_type="application/json"
+        )
+
+    def test_update(self):
+        first, second = self.entries
+        response = self.post(
+            [
+                {"entry": first.pk, "field": "paid", "value": True},
+                {"entry": first.pk, "field": "cooked", "value": True},
+                {"entry": second.pk, "field": "paid", "value": True},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["entries"]), 2)
+        first.refresh_from_db()
+        self.assertTrue(first.has_paid and first.has_cooked)
+        self.assertFalse(first.has_shopped)
+        second.refresh_from_db()
+        self.assertTrue(second.has_paid)
+
+    def test_other_dining_list(self):
+        other = DiningList.objects.create(
+            date=date(2089, 1, 4),
+            association=self.dining_list.association,
+            sign_up_deadline=make_aware(datetime(2089, 1, 4, 15, 0)),
+        )
+        entry = DiningEntry.objects.create(
+            dining_list=other, user=self.user, created_by=self.user
+        )
+        response = self.post([{"entry": entry.pk, "field": "paid", "value": True}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_field(self):
+        response = self.post(
+            [{"entry": self.entries[0].pk, "field": "user", "value": True}]
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_value(self):
+        for value in ("false", 0, None):
+            response = self.post(
+                [{"entry": self.entries[0].pk, "field": "paid", "value": value}]
+            )
+            self.assertEqual(response.status_code, 400)
+        self.entries[0].refresh_from_db()
+        self.assertFalse(self.entries[0].has_paid)
+
+    def test_not_owner(self):
+        self.client.force_login(User.objects.create_user("other", "other@example.com"))
+        response = self.post(
+            [{"entry": self.entries[0].pk, "field": "paid", "value": True}]
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class DailyDinersCSVViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            "noortje", "noortje@example.com", first_name="Noortje"
+        )
+        cls.associations = [
+            Association.objects.create(name="Quadrivium", slug="q"),
+            Association.objects.create(name="Knights", slug="k"),
+        ]
+        UserMembership.objects.create(
+            related_user=cls.user, association=cls.associations[1], is_verified=True
+        )
+        dining_list = DiningList.objects.create(
+            date=date(2089, 1, 3),
+            association=cls.associations[0],
+            sign_up_deadline=make_aware(datetime(2089, 1, 3, 15, 0)),
+        )
+        DiningEntry.objects.create(
+            dining_list=dining_list, user=cls.user, created_by=cls.user
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_csv(self):
+        with self.assertNumQueries(4):  # Includes session and user
+            response = self.client.get("/csv/?from=2089-01-01&to=2089-01-31")
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            content.splitlines(), ["Name,Joined,Quadrivium,Knights", "Noortje,1,0,1"]
+        )
+
+    def test_legacy_date_format(self):
+        response = self.client.get("/csv/?from=01/01/89&to=31/01/89")
+        # This is 1989
+        self.assertNotIn(b"Noortje", b"".join(response.streaming_content))
+        response = self.client.get("/csv/?from=01/01/68&to=31/01/68")
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_period(self):
+        self.assertEqual(self.client.get("/csv/?to=2089-13-01").status_code, 400)
+        response = self.client.get("/csv/?from=2089-02-01&to=2089-01-01")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/csv/?from=2080-01-01&to=2089-01-01")
+        self.assertEqual(response.status_code, 400)
+
+    def test_forbidden(self):
+        self.client.force_login(User.objects.create_user("other"))
+        self.assertEqual(self.client.get("/csv/").status_code, 403)
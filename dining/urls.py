@@ -1,24 +1,76 @@
 from django.urls import include, path
 
-from dining import views
+from dining import api, ical, views
 
 urlpatterns = [
     path("", views.index, name="index"),
     path("csv/", views.DailyDinersCSVView.as_view(), name="diners_csv"),
+    path("join/", views.JoinDiningListsView.as_view(), name="join_dining_lists"),
+    path("search/", views.SearchView.as_view(), name="search"),
+    path("calendar/<str:token>.ics", ical.feed_view, name="ical_feed"),
+    path(
+        "api/v1/",
+        include(
+            [
+                path(
+                    "days/<int:year>/<int:month>/<int:day>/",
+                    api.day_view,
+                    name="api_day",
+                ),
+                path(
+                    "days/<int:year>/<int:month>/<int:day>/events/",
+                    api.day_events_view,
+                    name="api_day_events",
+                ),
+                path(
+                    "dining-lists/<int:pk>/",
+                    api.dining_list_view,
+                    name="api_dining_list",
+                ),
+                path(
+                    "dining-lists/<int:pk>/events/",
+                    api.dining_list_events_view,
+                    name="api_dining_list_events",
+                ),
+            ]
+        ),
+    ),
     path(
         "<int:year>/<int:month>/<int:day>/",
         include(
             [
                 path("", views.DayView.as_view(), name="day_view"),
                 path("add/", views.NewSlotView.as_view(), name="new_slot"),
+                path("week/", views.OverviewView.as_view(), name="week_view"),
+                path("manifest/", views.ManifestView.as_view(), name="manifest"),
+                path(
+                    "manifest/week/",
+                    views.ManifestView.as_view(span="week"),
+                    name="manifest_week",
+                ),
+                path(
+                    "month/",
+                    views.OverviewView.as_view(span="month"),
+                    name="month_view",
+                ),
                 path(
                     "<slug:identifier>/",
                     include(
                         [
                             path("", views.SlotInfoView.as_view(), name="slot_details"),
+                            path(
+                                "comments/",
+                                views.SlotCommentsView.as_view(),
+                                name="slot_comments",
+                            ),
                             path(
                                 "list/", views.SlotListView.as_view(), name="slot_list"
                             ),
+                            path(
+                                "list/stats/",
+                                views.SlotStatsView.as_view(),
+                                name="slot_stats",
+                            ),
                             path(
                                 "allergy/",
                                 views.SlotAllergyView.as_view(),
@@ -1,24 +1,32 @@
 import csv
-from datetime import date, datetime
+import json
+from datetime import date, datetime, timedelta
+from typing import Optional
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.core.exceptions import NON_FIELD_ERRORS, BadRequest, PermissionDenied
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Exists, OuterRef, Q
 from django.http import (
     Http404,
     HttpResponse,
-    HttpResponseForbidden,
+    HttpResponseBadRequest,
     HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
 )
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.generic import FormView, TemplateView, View
 from django.views.generic.detail import SingleObjectMixin
 
+from creditmanagement.csv import Echo
+from dining.cache import make_days_key
 from dining.datesequence import sequenced_date
 from dining.forms import (
     CreateSlotForm,
@@ -30,6 +38,7 @@ from dining.forms import (
     DiningListDeleteForm,
     DiningPaymentForm,
     SendReminderForm,
+    join_dining_lists,
 )
 from dining.models import (
     DiningComment,
@@ -38,10 +47,29 @@ from dining.models import (
     DiningEntry,
     DiningList,
 )
+from dining.receivers import discard_snapshot, touch_dining_list
+from dining.search import search
 from general.mail_control import send_templated_mail
 from userdetails.allergens import ALLERGENS
-from userdetails.models import Association, User
-from userdetails.templatetags.allergens import get_allergens
+from userdetails.models import Association, User, UserMembership
+
+
+def is_fragment_request(request) -> bool:
+    """Returns whether a fragment of HTML should be returned instead of a redirect.
+
+    The header is set by the progressive enhancement in dining.js.
+    """
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+
+def render_membership(request, dining_list: DiningList, status=200):
+    """Renders the sign up state of the user as fragment, including messages."""
+    return render(
+        request,
+        "dining_lists/snippet_slot_membership.html",
+        {"dining_list": dining_list, "fragment": True},
+        status=status,
+    )
 
 
 def index(request):
@@ -99,87 +127,439 @@ class DayView(LoginRequiredMixin, DayMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Most of each dining list card is a cached template fragment, only the
+        # user specific state needs to be queried on each request.
+        dining_lists = DiningList.objects.filter(date=self.date).annotate(
+            joined=Exists(
+                DiningEntry.objects.internal().filter(
+                    dining_list=OuterRef("pk"), user=self.request.user
+                )
+            ),
+        )
         context.update(
             {
-                "dining_lists": DiningList.objects.filter(date=self.date),
+                "dining_lists": dining_lists,
                 "announcements": DiningDayAnnouncement.objects.filter(date=self.date),
             }
         )
         return context
 
 
-class DailyDinersCSVView(LoginRequiredMixin, View):
-    """Returns a CSV file with all diners of that day."""
+class DateRangeMixin(DayMixin):
+    """Adds a range of dates around the request date."""
 
-    def get(self, request, *args, **kwargs):
-        # Only superusers can access this page
-        if not request.user.is_superuser:
-            return HttpResponseForbidden
+    span = "week"  # Either "day", "week" or "month"
 
-        # Get the end date
-        date_end = request.GET.get("to", None)
-        if date_end:
-            date_end = datetime.strptime(date_end, "%d/%m/%y")
-        else:
-            date_end = timezone.now()
+    def get_range(self) -> tuple[date, date]:
+        """Returns the first and last date of the range that is displayed."""
+        if self.span == "day":
+            return self.date, self.date
+        if self.span == "month":
+            start = date(self.date.year, self.date.month, 1)
+            next_month = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+            return start, next_month - timedelta(days=1)
+        start = date.fromordinal(self.date.toordinal() - self.date.weekday())
+        return start, start + timedelta(days=6)
 
-        # Filter on a start date
-        date_start = request.GET.get("from", None)
-        if date_start:
-            date_start = datetime.strptime(date_start, "%d/%m/%y")
-        else:
-            date_start = date_end
-
-        # Count all dining entries in the given period
-        entry_count = Count(
-            "diningentry",
-            filter=(
-                Q(diningentry__dining_list__date__lte=date_end)
-                & Q(diningentry__dining_list__date__gte=date_start)
-            ),
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, end = self.get_range()
+        context.update(
+            {
+                "span": self.span,
+                "range_start": start,
+                "range_end": end,
+                "previous_date": sequenced_date.upcoming(
+                    start - timedelta(days=1), reverse=True
+                ),
+                "next_date": sequenced_date.upcoming(end + timedelta(days=1)),
+            }
+        )
+        return context
+
+
+class OverviewView(LoginRequiredMixin, DateRangeMixin, TemplateView):
+    """Shows the dining lists in the week or month of a given date.
+
+    All data for the range is fetched using two queries. The result is cached
+    per user until something changes on one of the dates.
+    """
+
+    template_name = "dining_lists/dining_overview.html"
+
+    def get_days(self, start: date, end: date) -> list[tuple]:
+        """Fetches the data for the given range.
+
+        Returns:
+            A list of tuples (date, dining lists, announcements, free slots) for
+            each date in the sequence. The dining lists are annotated with
+            `diner_count` and `joined` (whether the current user is on it).
+        """
+        dining_lists = (
+            DiningList.objects.filter(date__range=(start, end))
+            .select_related("association")
+            .annotate(
+                diner_count=Count("dining_entries"),
+                joined=Exists(
+                    DiningEntry.objects.internal().filter(
+                        dining_list=OuterRef("pk"), user=self.request.user
+                    )
+                ),
+            )
+            .order_by("serve_time", "association__name")
         )
+        announcements = DiningDayAnnouncement.objects.filter(date__range=(start, end))
+
+        # Group by date
+        lists_per_day = {}
+        for dining_list in dining_lists:
+            lists_per_day.setdefault(dining_list.date, []).append(dining_list)
+        announcements_per_day = {}
+        for announcement in announcements:
+            announcements_per_day.setdefault(announcement.date, []).append(announcement)
+
+        days = []
+        for d in sequenced_date.range(start, end):
+            day_lists = lists_per_day.get(d, [])
+            day_announcements = announcements_per_day.get(d, [])
+            # This is the same as DiningListManager.available_slots()
+            free_slots = (
+                settings.MAX_SLOT_NUMBER
+                - len(day_lists)
+                - sum(a.slots_occupy for a in day_announcements)
+            )
+            days.append((d, day_lists, day_announcements, free_slots))
+        return days
 
-        # Annotate the counts to the user
-        users = User.objects.annotate(diningentry_count=entry_count)
-        users = users.filter(diningentry_count__gt=0)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, end = self.get_range()
+
+        all_dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        key = make_days_key(
+            "dining:overview",
+            all_dates,
+            self.request.user.pk,
+            sequenced_date.cache_version(),
+        )
+        days = cache.get(key)
+        if days is None:
+            days = self.get_days(start, end)
+            cache.set(key, days, 60 * 60 * 24)
+
+        context["days"] = days
+        return context
+
+
+class ManifestView(LoginRequiredMixin, DateRangeMixin, TemplateView):
+    """Shows the headcount and allergies of all dining lists on a day or week.
+
+    This is meant for the kitchen and can be printed or downloaded as CSV using
+    `?format=csv`. The data is fetched using two queries and cached until an
+    entry on one of the dates changes.
+    """
+
+    template_name = "dining_lists/manifest.html"
+    span = "day"
+
+    def get_manifest(self, start: date, end: date) -> list[dict]:
+        """Returns the headcount, allergen counts and allergies per dining list.
+
+        Only internal diners have allergy information, guests are counted
+        separately.
+        """
+        internal = Q(dining_entries__external_name="")
+        dining_lists = (
+            DiningList.objects.filter(date__range=(start, end))
+            .select_related("association")
+            .annotate(
+                diner_count=Count("dining_entries"),
+                guest_count=Count("dining_entries", filter=~internal),
+                **{
+                    f"count_{a.model_field}": Count(
+                        "dining_entries",
+                        filter=internal
+                        & Q(**{f"dining_entries__user__{a.model_field}": True}),
+                    )
+                    for a in ALLERGENS
+                },
+            )
+            .order_by("date", "serve_time", "association__name")
+        )
+        texts = (
+            DiningEntry.objects.internal()
+            .filter(dining_list__date__range=(start, end))
+            .exclude(user__other_allergy="", user__food_preferences="")
+            .values_list("dining_list", "user__other_allergy", "user__food_preferences")
+        )
+        other_allergies = {}
+        food_preferences = {}
+        for pk, other_allergy, food_preference in texts:
+            if other_allergy:
+                other_allergies.setdefault(pk, []).append(other_allergy)
+            if food_preference:
+                food_preferences.setdefault(pk, []).append(food_preference)
+
+        return [
+            {
+                "date": dl.date,
+                "association": dl.association.get_short_name(),
+                "dish": dl.dish,
+                "serve_time": dl.serve_time,
+                "url": dl.get_absolute_url(),
+                "diner_count": dl.diner_count,
+                "guest_count": dl.guest_count,
+                "allergens": [
+                    (a, getattr(dl, f"count_{a.model_field}")) for a in ALLERGENS
+                ],
+                "other_allergies": sorted(other_allergies.get(dl.pk, [])),
+                "food_preferences": sorted(food_preferences.get(dl.pk, [])),
+            }
+            for dl in dining_lists
+        ]
 
-        # Get the related membership objects for speed optimisation
-        users.select_related("usermembership")
+    def get_cached_manifest(self) -> list[dict]:
+        start, end = self.get_range()
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        key = make_days_key("dining:manifest", dates)
+        manifest = cache.get(key)
+        if manifest is None:
+            manifest = self.get_manifest(start, end)
+            cache.set(key, manifest, 60 * 60 * 24)
+        return manifest
 
-        # Get all associations
-        associations = Association.objects.all()
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("format") == "csv":
+            return self.csv_response()
+        return super().get(request, *args, **kwargs)
 
-        # Create the CSV file
-        # Set up
+    def csv_response(self):
+        start, end = self.get_range()
         response = HttpResponse(content_type="text/csv")
         response["Content-Disposition"] = (
-            'attachment; filename="association_members.csv"'
+            f'attachment; filename="manifest-{start.isoformat()}.csv"'
         )
-        csv_writer = csv.writer(response)
+        writer = csv.writer(response)
+        writer.writerow(
+            [
+                "Date",
+                "Association",
+                "Dish",
+                "Serve time",
+                "Diners",
+                "Guests",
+                *(a.name_en for a in ALLERGENS),
+                "Other allergies",
+                "Food preferences",
+            ]
+        )
+        for row in self.get_cached_manifest():
+            writer.writerow(
+                [
+                    row["date"].isoformat(),
+                    row["association"],
+                    row["dish"],
+                    row["serve_time"].strftime("%H:%M"),
+                    row["diner_count"],
+                    row["guest_count"],
+                    *(count for _, count in row["allergens"]),
+                    "; ".join(row["other_allergies"]),
+                    "; ".join(row["food_preferences"]),
+                ]
+            )
+        return response
 
-        # Write header
-        header = ["Name", "Joined"]
-        for association in associations:
-            header += [association.name]
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        manifest = self.get_cached_manifest()
+
+        # Group by date, with totals
+        days = {}
+        for row in manifest:
+            days.setdefault(row["date"], []).append(row)
+        totals = {
+            d: {
+                "diner_count": sum(r["diner_count"] for r in rows),
+                "guest_count": sum(r["guest_count"] for r in rows),
+                "allergens": [
+                    sum(r["allergens"][i][1] for r in rows)
+                    for i in range(len(ALLERGENS))
+                ],
+            }
+            for d, rows in days.items()
+        }
+        context.update(
+            {
+                "allergens": ALLERGENS,
+                "days": [(d, rows, totals[d]) for d, rows in days.items()],
+            }
+        )
+        return context
 
-        csv_writer.writerow(header)
 
-        # Write content
-        for user in users:
-            user_info = [user.get_full_name(), user.diningentry_count]
+class SearchView(LoginRequiredMixin, TemplateView):
+    """Full-text search over the dining lists, see dining/search.py.
 
-            # Get all associated memberships
-            memberships = []
-            for association in associations:
-                if user.is_verified_member_of(association):
-                    memberships.append(1)
-                else:
-                    memberships.append(0)
+    The query is given by the `q` parameter, the next page by `after`.
+    """
 
-            csv_writer.writerow(user_info + memberships)
+    template_name = "dining_lists/search.html"
+    results_per_page = 20
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        try:
+            results, next_cursor = search(
+                query, self.request.GET.get("after"), limit=self.results_per_page
+            )
+        except ValueError:
+            raise BadRequest("Invalid cursor")
+        context.update(
+            {
+                "query": query,
+                "results": results,
+                "next_cursor": next_cursor,
+            }
+        )
+        return context
+
+
+class JoinDiningListsView(LoginRequiredMixin, View):
+    """Signs the current user up for several dining lists at once.
+
+    The dining list ids are given by the `dining_list` POST parameter. Responds
+    with the result per dining list as JSON when requested (Accept header),
+    otherwise redirects to `next` with a message per dining list.
+    """
+
+    # The maximum number of dining lists in one request
+    max_dining_lists = 50
+
+    def get_dining_lists(self) -> list[DiningList]:
+        try:
+            pks = {int(pk) for pk in self.request.POST.getlist("dining_list")}
+        except ValueError:
+            raise BadRequest("Invalid dining list id")
+        if not pks or len(pks) > self.max_dining_lists:
+            raise BadRequest("Invalid number of dining lists")
+        return list(
+            DiningList.objects.filter(pk__in=pks)
+            .select_related("association")
+            .order_by("date", "serve_time")
+        )
+
+    def post(self, request, *args, **kwargs):
+        dining_lists = self.get_dining_lists()
+        errors = join_dining_lists(dining_lists, request.user)
+
+        if not request.accepts("text/html"):
+            return JsonResponse(
+                {
+                    "results": [
+                        {
+                            "id": dl.pk,
+                            "joined": errors[dl.pk] is None,
+                            "error": errors[dl.pk],
+                        }
+                        for dl in dining_lists
+                    ]
+                }
+            )
+
+        for dining_list in dining_lists:
+            error = errors[dining_list.pk]
+            if error:
+                messages.error(request, f"{dining_list}: {error}")
+            else:
+                messages.success(request, f"You are signed up for {dining_list}")
+        next_url = request.GET.get("next")
+        if url_has_allowed_host_and_scheme(next_url, request.get_host()):
+            return HttpResponseRedirect(next_url)
+        return redirect("index")
 
-        # Return the CSV file
-        return response
+
+class DailyDinersCSVView(LoginRequiredMixin, View):
+    """Returns a CSV file with the number of dining entries per user in a period.
+
+    The period is given by the `from` and `to` query parameters, which are ISO
+    dates (yyyy-mm-dd). The old dd/mm/yy format is also accepted. Both default
+    to today.
+    """
+
+    # The maximum length of the period
+    max_period = timedelta(days=366)
+
+    @staticmethod
+    def parse_date(value: str) -> date:
+        """Parses an ISO or dd/mm/yy date, raises ValueError when invalid."""
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return datetime.strptime(value, "%d/%m/%y").date()
+
+    def get_period(self) -> tuple[date, date]:
+        try:
+            date_end = self.request.GET.get("to")
+            date_end = self.parse_date(date_end) if date_end else timezone.localdate()
+            date_start = self.request.GET.get("from")
+            date_start = self.parse_date(date_start) if date_start else date_end
+        except ValueError:
+            raise BadRequest("Invalid date")
+        if date_start > date_end or date_end - date_start > self.max_period:
+            raise BadRequest("Invalid period")
+        return date_start, date_end
+
+    def get(self, request, *args, **kwargs):
+        # Only superusers can access this page
+        if not request.user.is_superuser:
+            raise PermissionDenied
+
+        date_start, date_end = self.get_period()
+        associations = list(Association.objects.order_by("pk"))
+
+        # A single query with the entry count and a column per association
+        # which is True when the user is a verified member.
+        users = (
+            User.objects.annotate(
+                diningentry_count=Count(
+                    "diningentry",
+                    filter=Q(
+                        diningentry__dining_list__date__range=(date_start, date_end)
+                    ),
+                )
+            )
+            .filter(diningentry_count__gt=0)
+            .annotate(
+                **{
+                    f"member_{a.pk}": Exists(
+                        UserMembership.objects.filter(
+                            related_user=OuterRef("pk"), association=a, is_verified=True
+                        )
+                    )
+                    for a in associations
+                }
+            )
+            .only("first_name", "last_name")
+            .order_by("pk")
+        )
+
+        def rows():
+            writer = csv.writer(Echo())
+            yield writer.writerow(["Name", "Joined"] + [a.name for a in associations])
+            for user in users.iterator():
+                yield writer.writerow(
+                    [user.get_full_name(), user.diningentry_count]
+                    + [int(getattr(user, f"member_{a.pk}")) for a in associations]
+                )
+
+        return StreamingHttpResponse(
+            rows(),
+            content_type="text/csv",
+            headers={
+                "Content-Disposition": 'attachment; filename="association_members.csv"'
+            },
+        )
 
 
 class NewSlotView(LoginRequiredMixin, DayMixin, TemplateView):
@@ -240,7 +620,9 @@ class DiningListMixin(DayMixin):
         # Needs initialized date
         self.init_date()
         self.dining_list = get_object_or_404(
-            DiningList, date=self.date, association__slug=self.kwargs["identifier"]
+            DiningList.objects.select_related("association", "snapshot"),
+            date=self.date,
+            association__slug=self.kwargs["identifier"],
         )
 
     def dispatch(self, request, *args, **kwargs):
@@ -258,19 +640,24 @@ class UpdateSlotViewTrackerMixin:
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Get the amount of messages
-        context["comments_total"] = self.dining_list.comments.count()
-        # Get the amount of unread messages
+        # Usually comes from the cache, see DiningCommentVisitTracker
         view_time = DiningCommentVisitTracker.get_latest_visit(
             user=self.request.user, dining_list=self.dining_list
         )
-        if view_time is None:
-            context["comments_unread"] = context["comments_total"]
+        # The total is stored on the dining list, the unread messages only need
+        # to be counted when there are comments after the last visit.
+        total = self.dining_list.visible_comment_count
+        last_comment_at = self.dining_list.last_comment_at
+        if not view_time:
+            unread = total
+        elif not last_comment_at or last_comment_at < view_time:
+            unread = 0
         else:
-            context["comments_unread"] = self.dining_list.comments.filter(
-                timestamp__gte=view_time
+            unread = self.dining_list.comments.filter(
+                deleted=False, timestamp__gte=view_time
             ).count()
-
+        context["comments_total"] = total
+        context["comments_unread"] = unread
         return context
 
 
@@ -352,6 +739,10 @@ class EntryAddView(LoginRequiredMixin, DiningListMixin, TemplateView):
                         ),
                     )
 
+        if is_fragment_request(request):
+            return render_membership(
+                request, self.dining_list, status=200 if form.is_valid() else 400
+            )
         # Always redirect to the dining list page
         return redirect(self.dining_list)
 
@@ -399,6 +790,11 @@ class EntryDeleteView(LoginRequiredMixin, SingleObjectMixin, View):
             for error in form.non_field_errors():
                 messages.error(request, error)
 
+        if is_fragment_request(request):
+            return render_membership(
+                request, entry.dining_list, status=200 if form.is_valid() else 400
+            )
+
         # Go to next
         next_url = request.GET.get("next")
         if url_has_allowed_host_and_scheme(next_url, request.get_host()):
@@ -420,12 +816,20 @@ class SlotListView(SlotMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        can_edit_stats = self.can_edit_stats()
+        # Owners get the live entries, which they can still edit
+        snapshot = None if can_edit_stats else self.dining_list.get_snapshot()
         context.update(
             {
-                "entries": self.dining_list.dining_entries.order_by(
-                    "user__first_name", "user__last_name", "external_name"
+                "entries": (
+                    None
+                    if snapshot
+                    else self.dining_list.dining_entries.order_by(
+                        "user__first_name", "user__last_name", "external_name"
+                    )
                 ),
-                "can_edit_stats": self.can_edit_stats(),
+                "snapshot": snapshot,
+                "can_edit_stats": can_edit_stats,
             }
         )
         return context
@@ -456,8 +860,115 @@ class SlotListView(SlotMixin, TemplateView):
         return HttpResponseRedirect(self.reverse("slot_list"))
 
 
+class SlotStatsView(LoginRequiredMixin, DiningListMixin, View):
+    """Updates the work and paid stats of many entries at once.
+
+    The request body is JSON of the form `{"changes": [{"entry": <id>, "field":
+    <stat>, "value": <bool>}, ...]}`, with stat one of `shopped`, `cooked`,
+    `cleaned` or `paid`. Responds with the new stats of the changed entries.
+    """
+
+    fields = {
+        "shopped": "has_shopped",
+        "cooked": "has_cooked",
+        "cleaned": "has_cleaned",
+        "paid": "has_paid",
+    }
+
+    def get_changes(self) -> list[tuple[int, str, bool]]:
+        try:
+            changes = [
+                (int(c["entry"]), self.fields[c["field"]], c["value"])
+                for c in json.loads(self.request.body)["changes"]
+            ]
+        except (ValueError, TypeError, KeyError):
+            raise BadRequest("Invalid changes")
+        if not changes:
+            raise BadRequest("No changes")
+        # Only JSON booleans, e.g. the string "false" would otherwise be true
+        if not all(isinstance(value, bool) for _, _, value in changes):
+            raise BadRequest("Invalid value")
+        return changes
+
+    def post(self, request, *args, **kwargs):
+        # Same permission as SlotListView.can_edit_stats()
+        if not self.dining_list.is_owner(request.user):
+            raise PermissionDenied
+        changes = self.get_changes()
+
+        # Only entries of this dining list can be changed
+        entries = self.dining_list.dining_entries.in_bulk({pk for pk, _, _ in changes})
+        if len(entries) < len({pk for pk, _, _ in changes}):
+            raise BadRequest("Unknown entry")
+        for pk, field, value in changes:
+            setattr(entries[pk], field, value)
+        DiningEntry.objects.bulk_update(
+            entries.values(), {field for _, field, _ in changes}
+        )
+        # Bulk update does not send signals
+        touch_dining_list(self.dining_list.pk, self.dining_list.date)
+        discard_snapshot(self.dining_list)
+
+        return JsonResponse(
+            {
+                "entries": [
+                    {"id": e.pk, **{k: getattr(e, f) for k, f in self.fields.items()}}
+                    for e in entries.values()
+                ]
+            }
+        )
+
+
+class CommentThreadMixin:
+    """Pagination of the comments of a dining list.
+
+    Pinned comments are always shown. The other comments are shown in pages,
+    starting with the latest. Pages are fetched using keyset pagination on the
+    timestamp and id, see DiningCommentQuerySet.
+    """
+
+    # The number of comments in a page, not counting the pinned comments
+    comments_per_page = 20
+
+    def get_comments(self):
+        return self.dining_list.comments.filter(pinned_to_top=False).select_related(
+            "poster"
+        )
+
+    def get_comment_page(self, before: Optional[str] = None):
+        """Returns a page of comments, oldest first.
+
+        Args:
+            before: Cursor of the comment after the page. When None, the latest
+                page is returned.
+
+        Returns:
+            A tuple with the comments and the cursor for the older page, which
+            is None when there are no older comments.
+        """
+        comments = self.get_comments()
+        try:
+            comments = (
+                comments.before(before)
+                if before
+                else comments.order_by("-timestamp", "-pk")
+            )
+            comments = list(comments[: self.comments_per_page + 1])
+        except ValueError:
+            raise BadRequest("Invalid cursor")
+        older_cursor = None
+        if len(comments) > self.comments_per_page:
+            comments = comments[: self.comments_per_page]
+            older_cursor = comments[-1].get_cursor()
+        return comments[::-1], older_cursor
+
+
 class SlotInfoView(
-    LoginRequiredMixin, DiningListMixin, UpdateSlotViewTrackerMixin, FormView
+    LoginRequiredMixin,
+    DiningListMixin,
+    UpdateSlotViewTrackerMixin,
+    CommentThreadMixin,
+    FormView,
 ):
     template_name = "dining_lists/dining_slot_info.html"
     form_class = DiningCommentForm
@@ -479,38 +990,63 @@ class SlotInfoView(
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Collect all allergens
-        entries = list(
-            self.dining_list.internal_dining_entries().select_related("user")
-        )
-        allergens = [
-            a for a in ALLERGENS if any(getattr(e.user, a.model_field) for e in entries)
-        ]
-        # We wrap it in a set first to remove duplicates
-        other_allergies = list(
-            set(e.user.other_allergy for e in entries if e.user.other_allergy)
-        )
-        sorted(other_allergies)
-
+        snapshot = self.dining_list.get_snapshot()
+        if snapshot:
+            summary = snapshot.allergen_summary()
+            diner_count = snapshot.data["diner_count"]
+        else:
+            summary = self.dining_list.allergen_summary()
+            diner_count = self.dining_list.dining_entries.count()
+        before = self.request.GET.get("before")
+        comments, older_cursor = self.get_comment_page(before)
         context.update(
             {
-                "comments": self.dining_list.comments.select_related("poster").order_by(
-                    "-pinned_to_top", "timestamp"
-                ),
+                "diner_count": diner_count,
+                "pinned_comments": self.dining_list.comments.filter(pinned_to_top=True)
+                .select_related("poster")
+                .order_by("timestamp", "pk"),
+                "comments": comments,
+                "older_cursor": older_cursor,
+                "before": before,
+                # Where loading new comments starts, see dining_comments.js
+                "comments_cursor": comments[-1].get_cursor() if comments else "0-0",
+                "change_cursor": DiningComment.get_change_cursor(),
                 "last_visited": DiningCommentVisitTracker.get_latest_visit(
                     user=self.request.user, dining_list=self.dining_list, update=True
                 ),
-                "allergens": allergens,
-                "other_allergies": other_allergies,
+                "allergens": [a for a, count in summary["allergens"] if count],
+                "other_allergies": summary["other_allergies"],
                 "is_owner": self.dining_list.is_owner(self.request.user),
             }
         )
         return context
 
+    def render_comment(self, comment: DiningComment):
+        """Renders a single comment as fragment."""
+        return render(
+            self.request,
+            "dining_lists/snippet_comment.html",
+            {
+                "comment": comment,
+                "dining_list": self.dining_list,
+                "is_owner": self.dining_list.is_owner(self.request.user),
+                # The comment is not new for the poster
+                "last_visited": comment.timestamp,
+            },
+        )
+
     def form_valid(self, form):
-        form.save()
+        comment = form.save()
+        if is_fragment_request(self.request):
+            return self.render_comment(comment)
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        if is_fragment_request(self.request):
+            # The page is submitted normally to show the errors, see dining.js
+            return HttpResponseBadRequest()
+        return super().form_invalid(form)
+
     def post(self, request, *args, **kwargs):
         """This method handles comment actions."""
         comment_action = request.POST.get("comment_action")
@@ -529,25 +1065,95 @@ class SlotInfoView(
                 comment.save()
             else:
                 raise BadRequest
+            if is_fragment_request(request):
+                return self.render_comment(comment)
             return redirect(self.dining_list)
         else:
             return super().post(request, *args, **kwargs)
 
 
+class SlotCommentsView(
+    LoginRequiredMixin, DiningListMixin, CommentThreadMixin, TemplateView
+):
+    """Returns comments of the info page as fragment, see dining_comments.js.
+
+    With `?before=<cursor>` the page of comments before the cursor is returned.
+    With `?after=<cursor>` the comments posted after the cursor are returned,
+    which is used to load new comments. Adding `&changed=<change cursor>` also
+    returns the other comments that were changed since, e.g. pinned or
+    deleted, together with a new change cursor.
+    """
+
+    template_name = "dining_lists/snippet_comment_page.html"
+
+    # The maximum number of new or changed comments that are returned
+    max_new_comments = 100
+
+    def get_changed_comments(self, changed: str, new_comments: list):
+        """Returns the comments changed since the change cursor, except the new ones."""
+        return list(
+            self.dining_list.comments.changed_since(changed)
+            .exclude(pk__in=[c.pk for c in new_comments])
+            .select_related("poster")
+            .order_by("updated_at")[: self.max_new_comments]
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        before = self.request.GET.get("before")
+        after = self.request.GET.get("after")
+        changed = self.request.GET.get("changed")
+        change_cursor = changed_comments = None
+        if before:
+            comments, older_cursor = self.get_comment_page(before)
+        elif after:
+            change_cursor = DiningComment.get_change_cursor()
+            try:
+                comments = list(
+                    self.get_comments().after(after)[: self.max_new_comments]
+                )
+                if changed:
+                    changed_comments = self.get_changed_comments(changed, comments)
+            except ValueError:
+                raise BadRequest("Invalid cursor")
+            older_cursor = None
+        else:
+            raise BadRequest("Missing cursor")
+        context.update(
+            {
+                "comments": comments,
+                "older_cursor": older_cursor,
+                "changed_comments": changed_comments,
+                "change_cursor": change_cursor,
+                # New comments are seen now. Background loads without new
+                # comments don't count as a visit.
+                "last_visited": DiningCommentVisitTracker.get_latest_visit(
+                    user=self.request.user,
+                    dining_list=self.dining_list,
+                    update=bool(after and comments),
+                ),
+                "is_owner": self.dining_list.is_owner(self.request.user),
+            }
+        )
+        return context
+
+
 class SlotAllergyView(SlotMixin, TemplateView):
     template_name = "dining_lists/dining_slot_allergy.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        users = list(
-            User.objects.filter(
-                diningentry__in=self.dining_list.internal_dining_entries()
-            ).order_by("first_name", "last_name")
-        )
+        snapshot = self.dining_list.get_snapshot()
+        if snapshot:
+            diners = snapshot.diner_allergies()
+        else:
+            diners = self.dining_list.diner_allergies()
         context.update(
             {
-                "allergies": [u for u in users if u.other_allergy or get_allergens(u)],
-                "preferences": [u for u in users if u.food_preferences],
+                "allergies": [
+                    d for d in diners if d["other_allergy"] or d["allergens"]
+                ],
+                "preferences": [d for d in diners if d["food_preferences"]],
             }
         )
         return context
@@ -3,9 +3,11 @@ from typing import List
 from django.contrib.sites.shortcuts import get_current_site
 from django.core import mail
 from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import transaction
 from django.http import HttpRequest
 from django.template.loader import render_to_string
 
+from general.models import QueuedMail
 from userdetails.models import User
 
 """
@@ -63,6 +65,57 @@ def construct_templated_mail(
     return messages
 
 
+def send_on_commit(messages: List[EmailMessage]):
+    """Sends the messages when the current transaction is committed.
+
+    Rendering should be done beforehand, so that only the (slow) sending
+    happens after the commit. Nothing is sent when the transaction is rolled
+    back.
+    """
+    transaction.on_commit(lambda: mail.get_connection().send_messages(messages))
+
+
+def queue_mail(messages: List[EmailMessage]):
+    """Queues the messages, to be sent by the send_queued_mail command.
+
+    This keeps the (slow) sending out of the request. The queue is part of the
+    current transaction, so nothing is sent when it is rolled back.
+    """
+    QueuedMail.objects.bulk_create(
+        QueuedMail(
+            from_email=message.from_email,
+            to=message.to,
+            subject=message.subject,
+            body=message.body,
+            html_body=next(
+                (c for c, mimetype in message.alternatives if mimetype == "text/html"),
+                "",
+            ),
+        )
+        for message in messages
+    )
+
+
+def send_queued_mail(batch_size: int = 100) -> int:
+    """Sends queued mails over a single connection and returns the count.
+
+    Each batch is locked while it is sent, so that concurrent runs skip it
+    instead of sending the mails twice.
+    """
+    count = 0
+    with mail.get_connection() as connection:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    QueuedMail.objects.select_for_update(skip_locked=True)[:batch_size]
+                )
+                if not batch:
+                    return count
+                connection.send_messages([queued.to_message() for queued in batch])
+                QueuedMail.objects.filter(pk__in=[q.pk for q in batch]).delete()
+            count += len(batch)
+
+
 # Deprecated
 def send_templated_mail(
     template_dir: str, recipients, context: dict = None, request=None
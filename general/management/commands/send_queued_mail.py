@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from general.mail_control import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = "Sends the queued mails. Should be run often, e.g. every minute."
+
+    def handle(self, *args, **options):
+        count = send_queued_mail()
+        self.stdout.write(f"Sent {count} mail(s)")
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("general", "0003_remove_siteupdate_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pagevisittracker",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("general", "0004_alter_pagevisittracker_timestamp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueuedMail",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("from_email", models.CharField(max_length=254)),
+                ("to", models.JSONField()),
+                ("subject", models.CharField(max_length=998)),
+                ("body", models.TextField()),
+                ("html_body", models.TextField(blank=True)),
+            ],
+            options={
+                "ordering": ("pk",),
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
 from django.utils import timezone
 
@@ -20,7 +21,9 @@ class SiteUpdate(models.Model):
 
 class AbstractVisitTracker(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, because that would overwrite the timestamp of buffered
+    # visits when they are bulk created (see DiningCommentVisitTracker).
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         abstract = True
@@ -66,3 +69,35 @@ class PageVisitTracker(AbstractVisitTracker):
             latest_visit_obj.timestamp = timezone.now()
             latest_visit_obj.save()
         return timestamp
+
+
+class QueuedMail(models.Model):
+    """A mail waiting to be sent by the send_queued_mail management command.
+
+    Use mail_control.queue_mail() to add mails. Queued mails are part of the
+    current transaction, so nothing is sent when it is rolled back.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ("pk",)
+
+    def __str__(self):
+        return self.subject
+
+    def to_message(self) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+        )
+        if self.html_body:
+            message.attach_alternative(self.html_body, "text/html")
+        return message
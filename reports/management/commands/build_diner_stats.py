@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from reports.models import DailyDinerStats
+from reports.rollups import build_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolls up the diner statistics of the days on which the dining lists can "
+        "no longer be adjusted. Should be run daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Removes all existing statistics and rolls up again from the start.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            DailyDinerStats.objects.all().delete()
+        count = build_rollups()
+        self.stdout.write(f"Created {count} row(s)")
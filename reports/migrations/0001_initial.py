@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-19 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("userdetails", "0027_invalidemail"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyDinerStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("dining_list_count", models.IntegerField(default=0)),
+                ("total_diners", models.IntegerField(default=0)),
+                ("association_diners", models.IntegerField(default=0)),
+                ("outside_diners", models.IntegerField(default=0)),
+                ("guests", models.IntegerField(default=0)),
+                ("not_weighted_usage", models.IntegerField(default=0)),
+                ("weighted_usage", models.FloatField(default=0.0)),
+                ("shop", models.IntegerField(default=0, verbose_name="shopped")),
+                ("cook", models.IntegerField(default=0, verbose_name="cooked")),
+                ("clean", models.IntegerField(default=0, verbose_name="cleaned")),
+                (
+                    "association",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="userdetails.association",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily diner stats",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "association"), name="unique_daily_diner_stats"
+                    )
+                ],
+            },
+        ),
+    ]
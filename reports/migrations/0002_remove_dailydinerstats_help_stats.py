@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="dailydinerstats",
+            name="clean",
+        ),
+        migrations.RemoveField(
+            model_name="dailydinerstats",
+            name="cook",
+        ),
+        migrations.RemoveField(
+            model_name="dailydinerstats",
+            name="shop",
+        ),
+    ]
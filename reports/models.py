@@ -0,0 +1,49 @@
+from django.db import models
+from django.db.models import Max
+
+from userdetails.models import Association
+
+
+class DailyDinerStatsManager(models.Manager):
+    def rolled_up_until(self):
+        """Returns the last date that has been rolled up, or None."""
+        return self.aggregate(Max("date"))["date__max"]
+
+
+class DailyDinerStats(models.Model):
+    """Diner statistics for an association on a single day.
+
+    These are rolled up from the dining lists by the build_diner_stats command,
+    once the dining lists of the day can no longer be adjusted. The counts use
+    the default report options, i.e. only verified memberships are counted and
+    guests are not included in the kitchen usage.
+
+    The list and diner counts are for the dining lists of the association. The
+    kitchen usage is for the members of the association.
+
+    The help stats are not rolled up, because owners can still change them.
+    """
+
+    date = models.DateField()
+    association = models.ForeignKey(Association, on_delete=models.CASCADE)
+
+    dining_list_count = models.IntegerField(default=0)
+    total_diners = models.IntegerField(default=0)
+    association_diners = models.IntegerField(default=0)
+    outside_diners = models.IntegerField(default=0)
+    guests = models.IntegerField(default=0)
+    not_weighted_usage = models.IntegerField(default=0)
+    weighted_usage = models.FloatField(default=0.0)
+
+    objects = DailyDinerStatsManager()
+
+    class Meta:
+        verbose_name_plural = "daily diner stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "association"], name="unique_daily_diner_stats"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.association}"
@@ -261,7 +261,6 @@ GROUP BY
 """
 
 
-# CURRENTLY NOT USED!
 def count_help_stats(dining_lists: QuerySet) -> QuerySet:
     """Counts help stats per association."""
     return (
@@ -0,0 +1,126 @@
+"""Builds the daily diner statistics, see DailyDinerStats."""
+
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils.timezone import localdate
+
+from dining.models import DiningList
+from reports import queries
+from reports.models import DailyDinerStats
+
+# The metrics that are stored in DailyDinerStats.
+#
+# The help stats (shop, cook and clean) are not stored, because owners can
+# still change them after the dining list is no longer adjustable. They are
+# always counted live, see count_help_stats().
+METRICS = [
+    "dining_list_count",
+    "total_diners",
+    "association_diners",
+    "outside_diners",
+    "guests",
+    "not_weighted_usage",
+    "weighted_usage",
+]
+
+
+def compute_live_metrics(
+    dining_lists, verified_only=True, include_guests=False, help_stats=True
+) -> dict[int, dict]:
+    """Computes the report metrics using the (slow) queries on the dining lists.
+
+    Args:
+        dining_lists: A DiningList QuerySet.
+        verified_only: Count only verified memberships.
+        include_guests: Include guests in the kitchen usage.
+        help_stats: Include the shop, cook and clean counts.
+
+    Returns:
+        A dictionary from association id to a dictionary with the metrics. Only
+        associations that have a non-zero metric are included.
+    """
+    metrics = {}
+
+    def merge(association, values):
+        metrics.setdefault(association, {}).update(values)
+
+    for e in dining_lists.values("association").annotate(dining_list_count=Count("id")):
+        merge(e.pop("association"), e)
+    for e in queries.diner_counts(dining_lists, verified_only=verified_only):
+        merge(e.pop("association"), e)
+    for e in queries.kitchen_usage(
+        dining_lists, verified_only=verified_only, include_guests=include_guests
+    ):
+        merge(
+            e["membership_association"],
+            {
+                "not_weighted_usage": e["not_weighted_usage"],
+                "weighted_usage": e["weighted_usage"],
+            },
+        )
+    if help_stats:
+        for association, values in count_help_stats(dining_lists).items():
+            merge(association, values)
+    return metrics
+
+
+def count_help_stats(dining_lists) -> dict[int, dict]:
+    """Returns the shop, cook and clean counts per association."""
+    return {
+        e.pop("dining_list__association"): e
+        for e in queries.count_help_stats(dining_lists)
+    }
+
+
+def get_final_date(today: date = None):
+    """Returns the last date for which none of the dining lists are adjustable.
+
+    Dates up to and including the returned date can be rolled up.
+    """
+    if today is None:
+        today = localdate()
+    start = DailyDinerStats.objects.rolled_up_until()
+    # Dining lists that might be adjustable
+    dining_lists = DiningList.objects.filter(date__lt=today).order_by("date")
+    if start:
+        dining_lists = dining_lists.filter(date__gt=start)
+    for dining_list in dining_lists.only("date", "adjustable_duration"):
+        if dining_list.is_adjustable():
+            return dining_list.date - timedelta(days=1)
+    return today - timedelta(days=1)
+
+
+def build_rollups(end: date = None) -> int:
+    """Rolls up all dates after the last rolled up date until the given date.
+
+    Args:
+        end: Last date to roll up, defaults to get_final_date().
+
+    Returns:
+        The number of rows that were created.
+    """
+    if end is None:
+        end = get_final_date()
+    start = DailyDinerStats.objects.rolled_up_until()
+
+    dining_lists = DiningList.objects.filter(date__lte=end)
+    if start:
+        dining_lists = dining_lists.filter(date__gt=start)
+    dates = dining_lists.order_by("date").values_list("date", flat=True).distinct()
+
+    count = 0
+    for d in dates:
+        metrics = compute_live_metrics(
+            DiningList.objects.filter(date=d), help_stats=False
+        )
+        # Each day is created in a separate transaction, so that the job can be
+        # interrupted and continued later.
+        with transaction.atomic():
+            DailyDinerStats.objects.bulk_create(
+                DailyDinerStats(date=d, association_id=association, **values)
+                for association, values in metrics.items()
+            )
+        count += len(metrics)
+    return count
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+
+from django.test import RequestFactory, TestCase
+from django.utils.timezone import make_aware
+
+from dining.models import DiningEntry, DiningList
+from reports.models import DailyDinerStats
+from reports.period import AllTimePeriod
+from reports.rollups import build_rollups
+from reports.views import DinersView
+from userdetails.models import Association, User, UserMembership
+
+
+class RollupTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.associations = [
+            Association.objects.create(name="Quadrivium", slug="q"),
+            Association.objects.create(name="Knights", slug="k"),
+        ]
+        users = [
+            User.objects.create_user(f"user{i}", f"user{i}@example.com")
+            for i in range(3)
+        ]
+        UserMembership.objects.create(
+            related_user=users[0], association=cls.associations[0], is_verified=True
+        )
+        UserMembership.objects.create(
+            related_user=users[1], association=cls.associations[0], is_verified=True
+        )
+        UserMembership.objects.create(
+            related_user=users[1], association=cls.associations[1], is_verified=True
+        )
+        for day in (1, 2, 3):
+            for association in cls.associations:
+                dining_list = DiningList.objects.create(
+                    date=date(2020, 1, day),
+                    association=association,
+                    sign_up_deadline=make_aware(datetime(2020, 1, day, 12, 0)),
+                )
+                for u in users:
+                    DiningEntry.objects.create(
+                        dining_list=dining_list, user=u, created_by=u, has_cooked=True
+                    )
+                DiningEntry.objects.create(
+                    dining_list=dining_list,
+                    user=users[0],
+                    created_by=users[0],
+                    external_name="Guest",
+                )
+
+    def get_report(self, **params):
+        view = DinersView()
+        view.request = RequestFactory().get("/", params)
+        view.period = AllTimePeriod()
+        return view.get_report()
+
+    def test_build(self):
+        self.assertEqual(build_rollups(date(2020, 1, 2)), 4)
+        self.assertEqual(DailyDinerStats.objects.rolled_up_until(), date(2020, 1, 2))
+        stats = DailyDinerStats.objects.get(
+            date=date(2020, 1, 1), association=self.associations[0]
+        )
+        self.assertEqual(stats.dining_list_count, 1)
+        self.assertEqual(stats.total_diners, 4)
+        self.assertEqual(stats.association_diners, 2)
+        self.assertEqual(stats.outside_diners, 1)
+        self.assertEqual(stats.guests, 1)
+        # Incremental
+        self.assertEqual(build_rollups(date(2020, 1, 2)), 0)
+        self.assertEqual(build_rollups(), 2)
+
+    def test_help_stats_changed_after_rollup(self):
+        build_rollups()
+        DiningEntry.objects.filter(dining_list__date=date(2020, 1, 1)).update(
+            has_cleaned=True
+        )
+        report = dict(self.get_report())
+        self.assertEqual(report[self.associations[0]]["clean"], 4)
+        self.assertEqual(report[self.associations[0]]["cook"], 9)
+
+    def test_report_equal_to_live(self):
+        live = self.get_report()
+        build_rollups(date(2020, 1, 2))
+        self.assertEqual(self.get_report(), live)
+        build_rollups()
+        self.assertEqual(self.get_report(), live)
@@ -1,15 +1,18 @@
 from decimal import Decimal
+from itertools import chain
 from urllib.parse import urlencode
 
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.core.exceptions import BadRequest
-from django.db.models import Case, Count, Q, Sum, When
+from django.db.models import Case, Q, Sum, When
 from django.utils.timezone import localdate, now
 from django.views.generic import DetailView, TemplateView
 
 from creditmanagement.models import Account, Transaction
 from reports import queries
+from reports.models import DailyDinerStats
 from reports.period import Period
+from reports.rollups import METRICS, compute_live_metrics, count_help_stats
 from userdetails.models import Association, UserMembership
 
 
@@ -402,36 +405,66 @@ class DinersView(ReportAccessMixin, PeriodMixin, TemplateView):
 
     template_name = "reports/diners.html"
 
+    def get_rolled_up(self, dining_lists):
+        """Returns the rolled up stats of the period and the remaining dining lists.
+
+        Returns:
+            A tuple of the stats per association and the QuerySet of the
+            dining lists that are not rolled up.
+        """
+        rolled_up_until = DailyDinerStats.objects.rolled_up_until()
+        if not rolled_up_until:
+            return [], dining_lists
+        stats = (
+            DailyDinerStats.objects.filter(
+                date__gte=localdate(self.period.start()),
+                date__lt=localdate(self.period.end()),
+                date__lte=rolled_up_until,
+            )
+            .values("association")
+            .annotate(**{m: Sum(m) for m in METRICS})
+        )
+        return stats, dining_lists.filter(date__gt=rolled_up_until)
+
     def get_report(self):
         """Get diner report.
 
         Returns:
             A list with tuple (association, {metric: value}).
         """
-        # This method queries all individual metrics and merges them together.
         qs = self.period.get_dining_lists()
         verified_only = "all_members" not in self.request.GET
         include_guests = "include_guests" in self.request.GET
 
         report = {a.pk: {"object": a} for a in Association.objects.all()}
 
-        # Count number of dining lists per association
-        for e in qs.values("association").annotate(dining_list_count=Count("id")):
-            report[e["association"]].update(e)
-
-        # Merge diner counts
-        for e in queries.diner_counts(qs, verified_only=verified_only):
-            report[e["association"]].update(e)
-        # Merge kitchen usage
-        for e in queries.kitchen_usage(
-            qs, verified_only=verified_only, include_guests=include_guests
-        ):
-            report[e["membership_association"]].update(
-                {
-                    "not_weighted_usage": e["not_weighted_usage"],
-                    "weighted_usage": round(e["weighted_usage"], 1),
-                }
-            )
+        def add(association, metrics):
+            for k, v in metrics.items():
+                report[association][k] = report[association].get(k, 0) + v
+
+        # The help stats are never rolled up, see reports/rollups.py
+        help_stats = count_help_stats(qs)
+
+        if verified_only and not include_guests:
+            # The days that are rolled up are only available for the default
+            # options. Other options, or days that are not rolled up yet, are
+            # queried live.
+            stats, qs = self.get_rolled_up(qs)
+            for e in stats:
+                add(e.pop("association"), e)
+
+        live = compute_live_metrics(
+            qs,
+            verified_only=verified_only,
+            include_guests=include_guests,
+            help_stats=False,
+        )
+        for association, metrics in chain(help_stats.items(), live.items()):
+            add(association, metrics)
+
+        for e in report.values():
+            if "weighted_usage" in e:
+                e["weighted_usage"] = round(e["weighted_usage"], 1)
 
         # Compute kitchen usage percentages
         total_not_weighted = sum(
@@ -439,7 +472,7 @@ class DinersView(ReportAccessMixin, PeriodMixin, TemplateView):
         )
         total_weighted = sum((e.get("weighted_usage", 0) for e in report.values()))
         for e in report.values():
-            if "not_weighted_usage" in e:
+            if e.get("not_weighted_usage"):
                 e["not_weighted_percentage"] = round(
                     (e["not_weighted_usage"] / total_not_weighted) * 100
                 )
@@ -451,10 +484,6 @@ class DinersView(ReportAccessMixin, PeriodMixin, TemplateView):
         # joined, owned = queries.dining_members_count(qs, verified_only=verified_only)
         # for e in chain(joined, owned):
         #     report[e["association"]].update(e)
-        #
-        # # Help stats
-        # for e in queries.count_help_stats(qs):
-        #     report[e["dining_list__association"]].update(e)
 
         # Compute summary/totals
         totals = {
@@ -469,6 +498,9 @@ class DinersView(ReportAccessMixin, PeriodMixin, TemplateView):
             "guests": sum(e.get("guests", 0) for e in report.values()),
             "not_weighted_usage": total_not_weighted,
             "weighted_usage": round(total_weighted, 1),
+            "shop": sum(e.get("shop", 0) for e in report.values()),
+            "cook": sum(e.get("cook", 0) for e in report.values()),
+            "clean": sum(e.get("clean", 0) for e in report.values()),
         }
 
         # Convert to list and sort
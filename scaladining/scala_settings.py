@@ -26,3 +26,6 @@ TRANSACTION_PENDING_DURATION = timedelta(days=2)
 # Membership change settings
 DURATION_AFTER_MEMBERSHIP_CONFIRMATION = timedelta(days=30)
 DURATION_AFTER_MEMBERSHIP_REJECTION = timedelta(days=30)
+
+# The sequence of dates that is shown in the calendar, see dining/datesequence.py
+DATE_SEQUENCE = "dining.datesequence.ClosureCalendarSequencedDate"
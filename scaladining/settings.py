@@ -3,6 +3,7 @@
 import os
 from email.utils import getaddresses
 
+from django.core.exceptions import ImproperlyConfigured
 from environs import Env
 
 # Include Scala settings
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
     "dining.apps.DiningConfig",
     "creditmanagement.apps.CreditManagementConfig",
     "general.apps.GeneralConfig",
+    "reports.apps.ReportsConfig",
     "scaladining.apps.MyAdminConfig",
     "allauth.account",  # This needs to be before userdetails due to admin.site.unregister
     "userdetails.apps.UserDetailsConfig",
@@ -69,6 +71,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "userdetails.state.UserStateMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -117,6 +120,27 @@ if not DATABASES["default"].get("PASSWORD"):
         "DINING_DATABASE_PASSWORD_FILE", default=""
     )
 
+# See https://github.com/epicserve/django-cache-url
+#
+# The cache must be shared by all worker processes, because it holds the
+# versions that invalidate cached data (see dining/cache.py). Production uses
+# redis, which keeps cache lookups out of the database. The per-process
+# locmem:// cache is only allowed for development. A db:// cache works too,
+# after `manage.py createcachetable`, but then each lookup is a SQL query.
+CACHES = {
+    "default": env.dj_cache_url(
+        "DINING_CACHE_URL", default="locmem://" if DEBUG else "redis://localhost:6379/0"
+    )
+}
+if not DEBUG and CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+    raise ImproperlyConfigured("The locmem cache is not shared between workers")
+
+# Buffer comment page visits in the cache instead of writing each visit to the
+# database (see DiningCommentVisitTracker). Only has effect with the redis
+# cache, which must not evict keys (maxmemory-policy noeviction). The other
+# backends evict or cull entries, which would lose visits.
+BUFFER_COMMENT_VISITS = env.bool("DINING_BUFFER_COMMENT_VISITS", default=False)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
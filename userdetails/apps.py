@@ -5,6 +5,7 @@ class UserDetailsConfig(AppConfig):
     name = "userdetails"
 
     def ready(self):
-        # Import to register the receivers in this module
+        # Import to register the receivers and system checks in these modules
         # noinspection PyUnresolvedReferences
+        import userdetails.checks  # noqa F401
         import userdetails.externalaccounts  # noqa F401
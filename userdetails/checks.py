@@ -0,0 +1,45 @@
+"""System checks for the people search (see userdetails/search.py)."""
+
+from django.core import checks
+from django.db import connections
+
+SEARCH_TRIGGERS = [
+    "userdetails_user_search_insert",
+    "userdetails_user_search_delete",
+    "userdetails_user_search_update",
+]
+
+
+@checks.register(checks.Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """Checks that the triggers which keep the SQLite search table in sync exist.
+
+    SQLite drops the triggers when a migration rebuilds the user table (e.g. for
+    AddField). Such a migration must recreate them.
+    """
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        if connection.vendor != "sqlite":
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT type, name FROM sqlite_master WHERE name LIKE %s",
+                ["userdetails_user_search_%"],
+            )
+            found = cursor.fetchall()
+        if not found:
+            # The search migration has not run yet
+            continue
+        missing = set(SEARCH_TRIGGERS) - {name for t, name in found if t == "trigger"}
+        if missing:
+            errors.append(
+                checks.Warning(
+                    "Triggers of the people search are missing: "
+                    + ", ".join(sorted(missing)),
+                    hint="Recreate them in the migration that rebuilds the user "
+                    "table, like 0029_user_ical_feed_version does.",
+                    id="userdetails.W001",
+                )
+            )
+    return errors
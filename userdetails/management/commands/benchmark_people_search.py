@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from userdetails.models import User, normalize_name
+from userdetails.search import MAX_RESULTS, search_users
+
+FIRST_NAMES = [
+    "Noortje",
+    "Sem",
+    "Lotte",
+    "Daan",
+    "Fleur",
+    "Bram",
+    "Sanne",
+    "Jesse",
+    "Zoë",
+    "Thijs",
+    "Anouk",
+    "Maël",
+]
+LAST_NAMES = [
+    "de Vries",
+    "Jansen",
+    "Bakker",
+    "Visser",
+    "Smit",
+    "Meijer",
+    "van den Berg",
+    "Mulder",
+    "Kok",
+    "Dijkstra",
+]
+# Typing "jansen" and "noortje de" letter by letter, and a rare name
+QUERIES = [
+    "j",
+    "ja",
+    "jan",
+    "jans",
+    "janse",
+    "jansen",
+    "noortje de",
+    "zoe",
+    "tester123",
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the people search latency on a synthetic set of users. The "
+        "users are created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50_000)
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs of each query."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        try:
+            with transaction.atomic():
+                self.create_users(options["users"])
+                self.run_queries(options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def create_users(self, count):
+        prefix = uuid.uuid4().hex[:8]
+        t = time.perf_counter()
+        users = []
+        for i in range(count):
+            first_name = random.choice(FIRST_NAMES)
+            last_name = f"{random.choice(LAST_NAMES)} Tester{i}"
+            users.append(
+                User(
+                    username=f"benchmark-{prefix}-{i}",
+                    email=f"benchmark-{prefix}-{i}@example.com",
+                    first_name=first_name,
+                    last_name=last_name,
+                    # (bulk_create doesn't call save())
+                    search_name=normalize_name(f"{first_name} {last_name}"),
+                )
+            )
+        User.objects.bulk_create(users, batch_size=1000)
+        duration = time.perf_counter() - t
+        self.stdout.write(
+            f"Created {count} users in {duration:.1f}s ({connection.vendor})"
+        )
+
+    def run_queries(self, repeat):
+        self.stdout.write(
+            f"{'query':<12} {'results':>7} {'median':>9} {'p95':>9} {'cached':>9}"
+        )
+        for query in QUERIES:
+            durations = []
+            for _ in range(repeat):
+                t = time.perf_counter()
+                results = list(search_users(query)[:MAX_RESULTS])
+                durations.append((time.perf_counter() - t) * 1000)
+            p95 = statistics.quantiles(durations, n=20)[-1]
+
+            # The latency of a cache hit, see search_people()
+            cache.set("benchmark", results, 30)
+            t = time.perf_counter()
+            cache.get("benchmark")
+            cached = (time.perf_counter() - t) * 1000
+            cache.delete("benchmark")
+
+            self.stdout.write(
+                f"{query:<12} {len(results):>7} {statistics.median(durations):>7.2f}ms "
+                f"{p95:>7.2f}ms {cached:>7.2f}ms"
+            )
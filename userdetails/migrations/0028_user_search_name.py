@@ -0,0 +1,102 @@
+# Generated by Django 5.1.5 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+# See userdetails/search.py
+POSTGRESQL_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX userdetails_user_search_name_trgm
+    ON userdetails_user USING GIN (search_name gin_trgm_ops)
+    """,
+]
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX userdetails_user_search_name_trgm",
+]
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE userdetails_user_search_fts USING fts5(
+        search_name,
+        content='userdetails_user',
+        content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER userdetails_user_search_insert AFTER INSERT ON userdetails_user BEGIN
+        INSERT INTO userdetails_user_search_fts(rowid, search_name)
+        VALUES (new.id, new.search_name);
+    END
+    """,
+    """
+    CREATE TRIGGER userdetails_user_search_delete AFTER DELETE ON userdetails_user BEGIN
+        INSERT INTO userdetails_user_search_fts(userdetails_user_search_fts, rowid, search_name)
+        VALUES ('delete', old.id, old.search_name);
+    END
+    """,
+    # Only when the name changes, not e.g. on every login
+    """
+    CREATE TRIGGER userdetails_user_search_update AFTER UPDATE OF search_name
+    ON userdetails_user BEGIN
+        INSERT INTO userdetails_user_search_fts(userdetails_user_search_fts, rowid, search_name)
+        VALUES ('delete', old.id, old.search_name);
+        INSERT INTO userdetails_user_search_fts(rowid, search_name)
+        VALUES (new.id, new.search_name);
+    END
+    """,
+    "INSERT INTO userdetails_user_search_fts(userdetails_user_search_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER userdetails_user_search_update",
+    "DROP TRIGGER userdetails_user_search_delete",
+    "DROP TRIGGER userdetails_user_search_insert",
+    "DROP TABLE userdetails_user_search_fts",
+]
+
+
+def fill_search_names(apps, schema_editor):
+    from userdetails.models import normalize_name
+
+    User = apps.get_model("userdetails", "User")
+    users = list(User.objects.only("first_name", "last_name"))
+    for user in users:
+        user.search_name = normalize_name(f"{user.first_name} {user.last_name}")
+    User.objects.bulk_update(users, ["search_name"], batch_size=1000)
+
+
+def create_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sql = {"postgresql": POSTGRESQL_SQL, "sqlite": SQLITE_SQL}.get(vendor, [])
+    for statement in sql:
+        schema_editor.execute(statement)
+
+
+def drop_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sql = {"postgresql": POSTGRESQL_REVERSE_SQL, "sqlite": SQLITE_REVERSE_SQL}.get(
+        vendor, []
+    )
+    for statement in sql:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userdetails", "0027_invalidemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="search_name",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=301
+            ),
+        ),
+        migrations.RunPython(
+            fill_search_names, reverse_code=migrations.RunPython.noop, elidable=True
+        ),
+        migrations.RunPython(create_trigram_index, reverse_code=drop_trigram_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-19 02:11
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+search_migration = import_module("userdetails.migrations.0028_user_search_name")
+
+
+def recreate_search_triggers(apps, schema_editor):
+    """Recreates the SQLite search table, see 0028_user_search_name.
+
+    On SQLite, adding or removing the column rebuilds the user table, which
+    drops its triggers.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for trigger in ("insert", "delete", "update"):
+        schema_editor.execute(
+            f"DROP TRIGGER IF EXISTS userdetails_user_search_{trigger}"
+        )
+    schema_editor.execute("DROP TABLE IF EXISTS userdetails_user_search_fts")
+    for statement in search_migration.SQLITE_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("userdetails", "0028_user_search_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, reverse_code=recreate_search_triggers
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="ical_feed_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            recreate_search_triggers, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -1,3 +1,5 @@
+import unicodedata
+
 from allauth.socialaccount.models import SocialApp
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group, GroupManager
@@ -10,6 +12,13 @@ from django.utils import timezone
 from django.utils.functional import cached_property
 
 
+def normalize_name(name: str) -> str:
+    """Normalizes a name for searching: lowercase, no diacritics, single spaces."""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())
+
+
 class UserManager(DjangoUserManager):
     def get_by_natural_key(self, username):
         # See https://docs.djangoproject.com/en/4.1/topics/serialization/#natural-keys
@@ -60,8 +69,30 @@ class User(AbstractUser):
         help_text="Vegetarian, vegan or other food preferences.",
     )
 
+    # The normalized full name, used by the people search (see userdetails/search.py)
+    search_name = models.CharField(
+        max_length=301, default="", editable=False, db_index=True
+    )
+
+    # Part of the calendar feed token, incremented to revoke the token (see
+    # dining/ical.py)
+    ical_feed_version = models.PositiveIntegerField(default=0, editable=False)
+
     objects = UserManager()
 
+    # The UserState of the logged-in user, set by UserStateMiddleware. The
+    # methods below return the loaded values when it is present.
+    state = None
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(f"{self.first_name} {self.last_name}")
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"first_name", "last_name"} & set(
+            update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
+
     def clean(self):
         # By default, Django uses case-sensitive usernames. This means that
         # users 'asdf' and 'Asdf' are considered different users. The allauth
@@ -103,11 +134,15 @@ class User(AbstractUser):
 
     def boards(self):
         """Returns all associations of which this member has board access."""
+        if self.state is not None:
+            return self.state.boards
         return Association.objects.filter(user=self).all()
 
     @cached_property
     def requires_action(self):
         """Whether some action is required by the user."""
+        if self.state is not None:
+            return self.state.requires_action
         for board in self.boards():
             if board.requires_action:
                 return True
@@ -127,6 +162,8 @@ class User(AbstractUser):
 
     @cached_property
     def has_invalid_email(self) -> bool:
+        if self.state is not None:
+            return self.state.has_invalid_email
         return InvalidEmail.objects.filter(email=self.email).exists()
 
     def has_any_perm(self):
@@ -134,6 +171,8 @@ class User(AbstractUser):
 
         We don't use nor check for user permissions.
         """
+        if self.state is not None:
+            return self.state.has_any_perm
         return self.groups.filter(permissions__isnull=False).exists()
 
     def has_admin_site_access(self):
@@ -150,6 +189,8 @@ class User(AbstractUser):
         associations, can view all transactions, and can create any arbitrary
         transaction.
         """
+        if self.state is not None:
+            return self.state.has_site_stats_access
         return True in (b.has_site_stats_access for b in self.boards())
 
     has_site_stats_access.boolean = True
@@ -166,6 +207,8 @@ class User(AbstractUser):
 
         For this to hold, the association membership must be verified.
         """
+        if self.state is not None:
+            return self.state.has_min_balance_exception
         exceptions = [
             membership.association.has_min_exception
             for membership in self.get_verified_memberships()
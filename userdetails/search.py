@@ -0,0 +1,82 @@
+"""Search of people by name, for the user pickers (see PeopleAutocompleteView).
+
+Users have a `search_name` column with the normalized full name, which is
+indexed for substring matching by the database:
+
+* PostgreSQL: a pg_trgm GIN index, which is used for LIKE '%...%' queries.
+* SQLite: an FTS5 table with the trigram tokenizer, kept in sync by triggers.
+
+See migration 0028_user_search_name. Trigrams need at least 3 characters, so
+shorter queries only match the start of the name (LIKE 'ja%'), which uses the
+`varchar_pattern_ops` index that Django adds for `search_name` on PostgreSQL.
+Other databases fall back to a scan.
+
+Results are ranked: a match at the start of the name first, then at the start
+of a word, then anywhere. The number of results is limited and they are
+cached shortly, because the picker sends a query on every keystroke.
+"""
+
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, QuerySet, When
+from django.db.models.expressions import RawSQL
+
+from userdetails.models import User, normalize_name
+
+# The maximum number of results
+MAX_RESULTS = 20
+
+# Seconds that results are cached
+CACHE_TIMEOUT = 30
+
+# Queries shorter than this only match the start of the name
+MIN_TRIGRAM_LENGTH = 3
+
+_FTS_TABLE = "userdetails_user_search_fts"
+
+
+def _filter_name(users: QuerySet, q: str) -> QuerySet:
+    if len(q) < MIN_TRIGRAM_LENGTH:
+        return users.filter(search_name__startswith=q)
+    if connection.vendor == "sqlite":
+        phrase = '"{}"'.format(q.replace('"', '""'))
+        return users.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {_FTS_TABLE} WHERE {_FTS_TABLE} MATCH %s",
+                [phrase],
+            )
+        )
+    return users.filter(search_name__contains=q)
+
+
+def search_users(query: str) -> QuerySet:
+    """Returns the active users matching the query, best match first."""
+    q = normalize_name(query)
+    users = User.objects.filter(is_active=True)
+    if not q:
+        return users.order_by("search_name", "pk")
+    rank = Case(
+        When(search_name__startswith=q, then=0),
+        When(search_name__contains=f" {q}", then=1),
+        default=2,
+        output_field=IntegerField(),
+    )
+    return (
+        _filter_name(users, q).annotate(rank=rank).order_by("rank", "search_name", "pk")
+    )
+
+
+def search_people(query: str) -> list[tuple[int, str]]:
+    """Returns the id and full name of the best matching users (cached).
+
+    Name changes show up after at most CACHE_TIMEOUT seconds.
+    """
+    key = "people:search:" + md5(normalize_name(query).encode()).hexdigest()
+    results = cache.get(key)
+    if results is None:
+        users = search_users(query).only("first_name", "last_name")[:MAX_RESULTS]
+        results = [(u.pk, u.get_full_name()) for u in users]
+        cache.set(key, results, CACHE_TIMEOUT)
+    return results
@@ -0,0 +1,139 @@
+"""The state of the logged-in user that is shown on every page.
+
+The navigation bar and banners in base.html show the balance and several
+flags of the user. Computed one by one these take about ten queries. A
+UserState loads them all in two queries when the first value is used.
+
+UserStateMiddleware attaches a UserState to `request.user.state`. The User
+methods return the loaded values when the state is present. The values are
+loaded once per request, changes made later in the same request are not
+reflected.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.models import Group
+from django.db.models import Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from creditmanagement.models import Account, Transaction
+from userdetails.models import Association, InvalidEmail, User, UserMembership
+
+
+def _sum_amount(transactions, group_by: str):
+    """Returns the sum of the amounts of the transactions as subquery expression."""
+    amount = Transaction._meta.get_field("amount")
+    return Coalesce(
+        Subquery(
+            transactions.order_by()
+            .values(group_by)
+            .annotate(total=Sum("amount"))
+            .values("total")
+        ),
+        Value(Decimal("0.00")),
+        output_field=amount,
+    )
+
+
+class UserState:
+    """Lazily loaded balance and flags of a user."""
+
+    def __init__(self, user: User):
+        self.user = user
+
+    @cached_property
+    def _loaded(self) -> User:
+        """Loads the user with account and flags in a single query."""
+        loaded = (
+            User.objects.select_related("account")
+            .annotate(
+                balance_increase=_sum_amount(
+                    Transaction.objects.filter(target=OuterRef("account")), "target"
+                ),
+                balance_reduction=_sum_amount(
+                    Transaction.objects.filter(source=OuterRef("account")), "source"
+                ),
+                min_balance_exception=Exists(
+                    UserMembership.objects.filter(
+                        related_user=OuterRef("pk"),
+                        is_verified=True,
+                        association__has_min_exception=True,
+                    )
+                ),
+                invalid_email=Exists(
+                    InvalidEmail.objects.filter(email=OuterRef("email"))
+                ),
+                any_perm=Exists(
+                    Group.objects.filter(user=OuterRef("pk"), permissions__isnull=False)
+                ),
+            )
+            .get(pk=self.user.pk)
+        )
+        # Reuse the account and balance for user.account.balance
+        account = loaded.account
+        account.__dict__["balance"] = loaded.balance_increase - loaded.balance_reduction
+        Account.user.field.remote_field.set_cached_value(self.user, account)
+        return loaded
+
+    @property
+    def balance(self) -> Decimal:
+        return self._loaded.account.balance
+
+    @property
+    def has_min_balance_exception(self) -> bool:
+        return self._loaded.min_balance_exception
+
+    @property
+    def has_invalid_email(self) -> bool:
+        return self._loaded.invalid_email
+
+    @property
+    def has_any_perm(self) -> bool:
+        return self._loaded.any_perm
+
+    @cached_property
+    def boards(self) -> list[Association]:
+        """The associations of which the user is board member (second query)."""
+        boards = list(
+            Association.objects.filter(user=self.user).annotate(
+                new_member_requests=Exists(
+                    UserMembership.objects.filter(
+                        association=OuterRef("pk"), verified_on__isnull=True
+                    )
+                )
+            )
+        )
+        for board in boards:
+            # See Association.requires_action
+            board.__dict__["requires_action"] = board.new_member_requests
+        return boards
+
+    @property
+    def requires_action(self) -> bool:
+        return any(board.requires_action for board in self.boards)
+
+    @property
+    def has_site_stats_access(self) -> bool:
+        return any(board.has_site_stats_access for board in self.boards)
+
+
+def attach_user_state(user):
+    if user.is_authenticated:
+        user.state = UserState(user)
+    return user
+
+
+class UserStateMiddleware:
+    """Attaches a UserState to `request.user.state` for logged-in users.
+
+    Must come after AuthenticationMiddleware. The user is still loaded lazily.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: attach_user_state(get_user(request)))
+        return self.get_response(request)
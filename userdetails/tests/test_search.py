@@ -0,0 +1,107 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from userdetails.checks import check_search_triggers
+from userdetails.models import User
+from userdetails.search import search_people, search_users
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        names = [
+            ("Piet", "Jansen"),
+            ("Jan", "de Vries"),
+            ("Zoë", "Bakker"),
+            ("Noortje", "Janssen"),
+        ]
+        self.users = {}
+        for first_name, last_name in names:
+            self.users[first_name] = User.objects.create_user(
+                first_name.lower(),
+                email=f"{first_name.lower()}@example.com",
+                first_name=first_name,
+                last_name=last_name,
+            )
+
+    def test_search_name(self):
+        self.assertEqual(self.users["Zoë"].search_name, "zoe bakker")
+
+    def test_search_name_updated(self):
+        user = self.users["Piet"]
+        user.last_name = "Klaassen"
+        user.save(update_fields=["last_name"])
+        user.refresh_from_db()
+        self.assertEqual(user.search_name, "piet klaassen")
+
+    def test_search_renamed(self):
+        """The search index is kept in sync when a name changes."""
+        user = self.users["Piet"]
+        user.last_name = "Klaassen"
+        user.save()
+        self.assertEqual([u.first_name for u in search_users("aass")], ["Piet"])
+        self.assertEqual(search_users("jansen").count(), 0)
+
+    def test_ranking(self):
+        # Start of the name, then start of a word, then anywhere
+        self.assertEqual(
+            [u.first_name for u in search_users("jan")],
+            ["Jan", "Noortje", "Piet"],
+        )
+
+    def test_substring(self):
+        self.assertEqual([u.first_name for u in search_users("SSEN")], ["Noortje"])
+
+    def test_diacritics(self):
+        self.assertEqual([u.first_name for u in search_users("zoe")], ["Zoë"])
+
+    def test_short_query_matches_start(self):
+        self.assertEqual([u.first_name for u in search_users("ja")], ["Jan"])
+
+    def test_short_query_wildcard(self):
+        """LIKE wildcards in the query are matched literally."""
+        self.assertEqual(search_users("_").count(), 0)
+
+    def test_inactive(self):
+        self.users["Jan"].is_active = False
+        self.users["Jan"].save()
+        self.assertNotIn("Jan", [u.first_name for u in search_users("jan")])
+
+    def test_cached(self):
+        self.assertEqual(len(search_people("jan")), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(search_people("Jan ")), 3)
+
+    def test_view(self):
+        self.client.force_login(self.users["Piet"])
+        response = self.client.get(reverse("people_autocomplete"), {"q": "vries"})
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {
+                        "id": str(self.users["Jan"].pk),
+                        "text": "Jan de Vries",
+                        "selected_text": "Jan de Vries",
+                    }
+                ],
+                "pagination": {"more": False},
+            },
+        )
+
+
+@skipUnless(connection.vendor == "sqlite", "The triggers only exist on SQLite")
+class SearchTriggersTestCase(TestCase):
+    def test_check(self):
+        self.assertEqual(check_search_triggers(None, databases=["default"]), [])
+
+    def test_check_missing(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER userdetails_user_search_update")
+        errors = check_search_triggers(None, databases=["default"])
+        self.assertEqual([e.id for e in errors], ["userdetails.W001"])
+        self.assertIn("userdetails_user_search_update", errors[0].msg)
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from django.urls import reverse
+
+from creditmanagement.models import Account, Transaction
+from userdetails.models import Association, InvalidEmail, User, UserMembership
+from userdetails.state import UserState
+
+
+class UserStateTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("ankie", email="ankie@example.com")
+        cls.association = Association.objects.create(
+            name="Quadrivium",
+            slug="quadrivium",
+            has_min_exception=True,
+            has_site_stats_access=True,
+        )
+        cls.association.user_set.add(cls.user)
+        UserMembership.objects.create(
+            related_user=cls.user, association=cls.association, is_verified=True
+        )
+        other = User.objects.create_user("noortje", email="noortje@example.com")
+        UserMembership.objects.create(related_user=other, association=cls.association)
+        account = Account.objects.get(user=cls.user)
+        Transaction.objects.create(
+            source=account,
+            target=cls.association.account,
+            amount=Decimal("8.30"),
+            created_by=cls.user,
+        )
+        Transaction.objects.create(
+            source=cls.association.account,
+            target=account,
+            amount=Decimal("1.25"),
+            created_by=cls.user,
+        )
+        InvalidEmail.objects.create(email="ankie@example.com")
+        cls.association.permissions.add(Permission.objects.first())
+
+    def test_values(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.state = UserState(user)
+        self.assertEqual(user.state.balance, Decimal("-7.05"))
+        self.assertTrue(user.state.has_min_balance_exception)
+        self.assertTrue(user.state.has_invalid_email)
+        self.assertTrue(user.state.has_any_perm)
+        self.assertEqual(user.state.boards, [self.association])
+        self.assertTrue(user.state.requires_action)
+        self.assertTrue(user.state.has_site_stats_access)
+
+    def test_user_methods_reuse_state(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.state = UserState(user)
+        with self.assertNumQueries(2):
+            self.assertTrue(user.has_min_balance_exception())
+            # The account is loaded along with the state
+            self.assertEqual(user.account.balance, Decimal("-7.05"))
+            self.assertTrue(user.has_invalid_email)
+            self.assertTrue(user.has_admin_site_access())
+            self.assertTrue(user.requires_action)
+            self.assertTrue(user.has_site_stats_access())
+            self.assertTrue(user.is_board_of(self.association))
+            self.assertTrue(user.boards()[0].requires_action)
+
+    def test_empty(self):
+        user = User.objects.create_user("sem", email="sem@example.com")
+        user.state = UserState(user)
+        self.assertEqual(user.state.balance, Decimal("0.00"))
+        self.assertFalse(user.state.has_min_balance_exception)
+        self.assertFalse(user.state.has_invalid_email)
+        self.assertFalse(user.state.has_any_perm)
+        self.assertFalse(user.state.requires_action)
+
+    def test_middleware(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("settings_account"))
+        state = response.wsgi_request.user.state
+        self.assertIsInstance(state, UserState)
+        self.assertEqual(state.balance, Decimal("-7.05"))
@@ -20,7 +20,7 @@ from userdetails.views_association import (
     SiteCreditView,
     SiteTransactionView,
 )
-from userdetails.views_user_settings import SettingsProfileView
+from userdetails.views_user_settings import CalendarResetView, SettingsProfileView
 
 urlpatterns = [
     path(
@@ -110,6 +110,11 @@ urlpatterns = [
         ),
     ),
     path("settings/", SettingsProfileView.as_view(), name="settings_account"),
+    path(
+        "settings/calendar/reset/",
+        CalendarResetView.as_view(),
+        name="settings_calendar_reset",
+    ),
     # Override allauth login and sign up page with our registration page
     path("login/", LoginView.as_view(), name="account_login"),
     path("signup/", RegisterView.as_view(), name="account_signup"),
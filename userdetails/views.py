@@ -1,9 +1,7 @@
-from dal_select2.views import Select2QuerySetView
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Value
-from django.db.models.functions import Concat
-from django.http import HttpResponse
+from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.views import View
@@ -12,7 +10,7 @@ from django.views.generic import FormView, ListView
 
 from dining.models import DiningEntry, DiningList
 from userdetails.forms import RegisterUserForm
-from userdetails.models import User
+from userdetails.search import search_people
 
 
 class RegisterView(FormView):
@@ -35,6 +33,7 @@ class DiningJoinHistoryView(LoginRequiredMixin, ListView):
         return (
             DiningEntry.objects.internal()
             .filter(user=self.request.user)
+            .select_related("dining_list__association")
             .order_by("-dining_list__date")
         )
 
@@ -44,24 +43,53 @@ class DiningClaimHistoryView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        return DiningList.objects.filter(owners=self.request.user).order_by("-date")
-
+        return (
+            DiningList.objects.filter(owners=self.request.user)
+            .select_related("association", "snapshot")
+            .order_by("-date")
+        )
 
-class PeopleAutocompleteView(LoginRequiredMixin, Select2QuerySetView):
-    # django-autocomplete-light does infinite scrolling by default, but doesn't seem to trigger when paginate_by has a
-    # lower value (e.g. 5)
-    # paginate_by = 10
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # The counts come from the snapshot, only the dining lists that are not
+        # finalized yet need to be counted.
+        live = [dl for dl in context["object_list"] if not dl.get_snapshot()]
+        counts = {
+            row["pk"]: row
+            for row in DiningList.objects.filter(pk__in=[dl.pk for dl in live])
+            .annotate(
+                diner_count=Count("dining_entries"),
+                paid_count=Count(
+                    "dining_entries", filter=Q(dining_entries__has_paid=True)
+                ),
+            )
+            .values("pk", "diner_count", "paid_count")
+        }
+        for dining_list in context["object_list"]:
+            snapshot = dining_list.get_snapshot()
+            data = snapshot.data if snapshot else counts[dining_list.pk]
+            dining_list.diner_count = data["diner_count"]
+            dining_list.paid_count = data["paid_count"]
+        return context
+
+
+class PeopleAutocompleteView(LoginRequiredMixin, View):
+    """Select2 results for the user pickers, see userdetails/search.py.
+
+    There is no pagination, only the best matches are returned.
+    """
 
-    def get_queryset(self):
-        qs = User.objects.filter(is_active=True)
-        if self.q:
-            qs = qs.annotate(
-                full_name=Concat("first_name", Value(" "), "last_name")
-            ).filter(full_name__icontains=self.q)
-        return qs
-
-    def get_result_label(self, result):
-        return result.get_full_name()
+    def get(self, request):
+        results = search_people(request.GET.get("q", ""))
+        return JsonResponse(
+            {
+                "results": [
+                    {"id": str(pk), "text": name, "selected_text": name}
+                    for pk, name in results
+                ],
+                "pagination": {"more": False},
+            }
+        )
 
 
 @method_decorator(csrf_exempt, name="dispatch")
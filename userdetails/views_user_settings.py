@@ -1,9 +1,13 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
+from django.db.models import F
 from django.shortcuts import redirect
+from django.views import View
 from django.views.generic import TemplateView
 
+from dining.ical import get_feed_url
 from userdetails.forms import AssociationLinkForm, UserForm
+from userdetails.models import User
 
 
 class SettingsProfileView(LoginRequiredMixin, TemplateView):
@@ -15,6 +19,7 @@ class SettingsProfileView(LoginRequiredMixin, TemplateView):
             {
                 "form": UserForm(instance=self.request.user),
                 "association_links_form": AssociationLinkForm(self.request.user),
+                "calendar_url": get_feed_url(self.request, self.request.user),
             }
         )
         return context
@@ -38,3 +43,13 @@ class SettingsProfileView(LoginRequiredMixin, TemplateView):
             }
         )
         return self.render_to_response(context)
+
+
+class CalendarResetView(LoginRequiredMixin, View):
+    """Revokes the calendar feed URL of the user, which gives them a new one."""
+
+    def post(self, request, *args, **kwargs):
+        User.objects.filter(pk=request.user.pk).update(
+            ical_feed_version=F("ical_feed_version") + 1
+        )
+        return redirect("settings_account")